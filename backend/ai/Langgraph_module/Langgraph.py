@@ -2,7 +2,6 @@
 """Langgraph configuration for the support agent workflow."""
 import os
 import config
-import operator
 import uuid
 from typing import TypedDict, Annotated, List, Dict, Optional, Any
 from langchain_core.messages import BaseMessage, AIMessage, HumanMessage
@@ -10,16 +9,43 @@ from langchain_google_genai import GoogleGenerativeAI
 
 # from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
-from utils.helpers import format_history_for_prompt, format_full_history_for_summary
+from langgraph.config import get_config
+from utils.helpers import (
+    MAX_HISTORY_TURNS,
+    format_history_for_prompt,
+    format_full_history_for_summary,
+)
+from ai.batch_runner import is_batch_thread
+from ai.bulk_approvals import applied_update_result
+from database.approvals_index import approvals_index
+from database.turn_log import turn_log
+from utils.deadline import (
+    OUT_OF_TIME_ANSWER,
+    agent_run_config,
+    budget_nearly_spent,
+    limit_agent_time,
+    partial_answer,
+    remaining_seconds,
+    stopped_early,
+)
 
 
 # 1. Define the state "clipboard" that moves through the graph.
+def keep_recent_turns(
+    current: Optional[List[Dict[str, Any]]], new: Optional[List[Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """Reducer for `history`: appends the new turns and keeps the prompt window."""
+    return ((current or []) + (new or []))[-MAX_HISTORY_TURNS:]
+
 class AgentState(TypedDict):
     query: str
     user_id: str
     language: str
-    # History will be kept in the DB's dictionary format.
-    history: Annotated[List[Dict[str, str]], operator.add]
+    # The most recent turns, in the DB's dictionary format. The full
+    # conversation is in the turn log (database/turn_log.py).
+    history: Annotated[List[Dict[str, Any]], keep_recent_turns]
+    # Seq of the newest turn written to the turn log for this thread.
+    history_seq: Optional[int]
     # The summary is generated only on escalation.
     escalation_summary: str
     # A list of all new responses to be sent to the user in this turn.
@@ -34,22 +60,79 @@ class AgentState(TypedDict):
     human_approval_response: Optional[str]  # Human's decision message
 
 
+def current_thread_id(state: AgentState) -> str:
+    """The thread being run (chat threads are keyed by user_id, batch items are not)."""
+    try:
+        return str(get_config()["configurable"]["thread_id"])
+    except (RuntimeError, KeyError):
+        return str(state["user_id"])
+
+
+def record_turn(state: AgentState, turn_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Appends a finished turn to the turn log and returns the state update
+    for it: the turn for the recent window and the new log cursor.
+    """
+    thread_id = current_thread_id(state)
+    cursor = state.get("history_seq")
+    turns = [turn_data]
+    try:
+        if cursor is None and state.get("history") and not turn_log.last_seq(thread_id):
+            # Thread checkpointed before the turn log existed: log its history once.
+            turns = state["history"] + turns
+            cursor = 0
+        seq = turn_log.append(thread_id, turns, after_seq=cursor)
+    except Exception as e:
+        print(f"⚠️ [WARNING] Could not append turn to the turn log: {e}")
+        return {"history": [turn_data]}
+    return {"history": [turn_data], "history_seq": seq}
+
+
+def load_full_history(state: AgentState) -> List[Dict[str, Any]]:
+    """The whole conversation, read from the turn log up to the state's cursor."""
+    try:
+        history = turn_log.turns(current_thread_id(state))
+    except Exception as e:
+        print(f"⚠️ [WARNING] Could not read the turn log: {e}")
+        history = []
+    cursor = state.get("history_seq")
+    if cursor is not None:
+        history = history[:cursor]
+    # Fall back to the recent window if the log is missing turns.
+    return history if len(history) >= len(state.get("history", [])) else state["history"]
+
+
 # 2. Define the individual nodes (functions) for the graph.
 
 
 def l1_node(state: AgentState, agent_executor):
     """Runs the L1 agent."""
     print("---EXECUTING L1 NODE---")
+    if budget_nearly_spent(config.DEADLINE_STEP_RESERVE_SECONDS):
+        print("---DEADLINE: L1 skipped, budget spent---")
+        output = OUT_OF_TIME_ANSWER
+        turn_data = {"input": state["query"], "output": output, "is_level2_session": False}
+        return {
+            **record_turn(state, turn_data),
+            "new_responses": [output],
+            "is_level2_session": False,
+            "routing_decision": "END",
+        }
+
     history_text = format_history_for_prompt(state["history"])
-    response = agent_executor.invoke(
+    response = limit_agent_time(agent_executor).invoke(
         {
             "input": state["query"],
             "user_id": state["user_id"],
             "language": state["language"],
             "chat_history": history_text,
-        }
+        },
+        config=agent_run_config(),
     )
     output = response.get("output", "")
+    if stopped_early(output):
+        print("---DEADLINE: L1 stopped early, sending partial answer---")
+        output = partial_answer(response.get("intermediate_steps"))
 
     # Create the full turn dictionary, including the Level2 status.
     # We now explicitly save that this turn was handled by L1.
@@ -64,7 +147,7 @@ def l1_node(state: AgentState, agent_executor):
         print("---L1 DECISION: END---")
 
     return {
-        "history": [turn_data],
+        **record_turn(state, turn_data),
         "new_responses": [output],
         "is_level2_session": False,
         "routing_decision": decision,
@@ -74,7 +157,8 @@ def l1_node(state: AgentState, agent_executor):
 def summarize_for_level2_node(state: AgentState):
     """Summarizes the conversation for a clean handoff to Level2."""
     print("---EXECUTING SUMMARY NODE---")
-    history_text = format_full_history_for_summary(state["history"])
+    # Only the recent turns travel with the state; the summary needs them all.
+    history_text = format_full_history_for_summary(load_full_history(state))
     summary_prompt = f"""
     Concisely summarize the following support conversation for a Level2 agent.
     The summary must be in this language: {state['language']}.
@@ -88,7 +172,27 @@ def summarize_for_level2_node(state: AgentState):
     {history_text}
 
     Briefing Note:"""
-    llm = ChatOpenAI(model="gpt-4o", openai_api_key=os.getenv("OPENAI_API_KEY_HR"))
+    remaining = remaining_seconds()
+    if remaining is not None and remaining < 2 * config.DEADLINE_STEP_RESERVE_SECONDS:
+        # Not enough time for a summary and the Level2 agent: hand over the
+        # latest turns as they are.
+        print("---DEADLINE: summary skipped, passing recent history---")
+        return {
+            "escalation_summary": history_text[-2000:],
+            "new_responses": state.get("new_responses", []),
+        }
+    timeout = config.LLM_REQUEST_TIMEOUT
+    max_retries = config.LLM_MAX_RETRIES
+    if remaining is not None:
+        timeout = min(timeout, remaining)
+        if remaining < 3 * config.DEADLINE_STEP_RESERVE_SECONDS:
+            max_retries = 0  # A retry could not finish in time.
+    llm = ChatOpenAI(
+        model="gpt-4o",
+        openai_api_key=os.getenv("OPENAI_API_KEY_HR"),
+        timeout=timeout,
+        max_retries=max_retries,
+    )
     summary = llm.invoke(summary_prompt)
     return {
         "escalation_summary": summary,
@@ -100,17 +204,25 @@ def level2_node(state: AgentState, agent_executor):
     """Runs the Level2 agent."""
     print("---EXECUTING Level2 NODE---")
     history_text = format_history_for_prompt(state["history"])
-    response = agent_executor.invoke(
-        {
-            "input": state["query"],
-            "user_id": state["user_id"],
-            "language": state["language"],
-            "chat_history": history_text,
-            "escalation_summary": state.get(
-                "escalation_summary", "No summary was provided."
-            ),
-        }
-    )
+    if budget_nearly_spent(config.DEADLINE_STEP_RESERVE_SECONDS):
+        print("---DEADLINE: Level2 skipped, budget spent---")
+        response = {"output": OUT_OF_TIME_ANSWER}
+    else:
+        response = limit_agent_time(agent_executor).invoke(
+            {
+                "input": state["query"],
+                "user_id": state["user_id"],
+                "language": state["language"],
+                "chat_history": history_text,
+                "escalation_summary": state.get(
+                    "escalation_summary", "No summary was provided."
+                ),
+            },
+            config=agent_run_config(),
+        )
+        if stopped_early(response.get("output", "")):
+            print("---DEADLINE: Level2 stopped early, sending partial answer---")
+            response["output"] = partial_answer(response.get("intermediate_steps"))
 
     # For Human-in-the-Loop processing, we need to check for tool calls
     # NEW: Check intermediate steps for tool calls
@@ -162,6 +274,14 @@ def level2_node(state: AgentState, agent_executor):
                 # Get existing pending list or create new one
                 pending_list = state.get("pending_approvals", [])
                 pending_list.append(approval_request)
+                if is_batch_thread(current_thread_id(state)):
+                    # Evaluation runs never raise a real approval request.
+                    print("---BATCH RUN: approval request not recorded---")
+                else:
+                    try:
+                        approvals_index.record_request(approval_request)
+                    except Exception as e:
+                        print(f"⚠️ [WARNING] Could not index approval request: {e}")
 
                 return {
                     "pending_approvals": pending_list,
@@ -186,7 +306,7 @@ def level2_node(state: AgentState, agent_executor):
     }
 
     return {
-        "history": [turn_data],
+        **record_turn(state, turn_data),
         "new_responses": current_responses,
         "is_level2_session": True,
         "escalation_summary": "",  # Clear the summary
@@ -229,24 +349,34 @@ def human_approval_node(state: AgentState):
         from database.postgre import update_user_data
 
         try:
-            result = update_user_data(
-                request_to_process["user_id"], request_to_process["details"]
-            )
+            # A bulk decision may already have written this update.
+            result = applied_update_result(request_to_process["timestamp"])
+            if result is None:
+                result = update_user_data(
+                    request_to_process["user_id"], request_to_process["details"]
+                )
             print(f"---DATABASE UPDATE RESULT: {result}---")
             approved_list.append(request_to_process)
+            decided_status = "approved"
             response_message = "Update successful."
         except Exception as e:
             print(f"---ERROR DURING DB UPDATE: {e}---")
             declined_list.append(request_to_process)
+            decided_status = "declined"
             response_message = f"DB update failed: {e}"
     else:
         print("---DECISION: DECLINED.---")
         declined_list.append(request_to_process)
+        decided_status = "declined"
         response_message = "Update request was declined by the administrator."
 
     print(
         f"---FINAL LISTS---\nPending: {pending_list}\nApproved: {approved_list}\nDeclined: {declined_list}"
     )
+    try:
+        approvals_index.record_decision(request_to_process, decided_status, response_message)
+    except Exception as e:
+        print(f"⚠️ [WARNING] Could not index approval decision: {e}")
 
     # Reset status and return updated lists
     return {
@@ -12,14 +12,63 @@ from .Langgraph import (
 )
 
 
+# When checkpoints are written during a run:
+#   "sync"  - after every step, before the next step starts;
+#   "async" - after every step, in the background while the next step runs
+#             (LangGraph's default);
+#   "exit"  - once, when the run ends, pauses for human approval or fails.
+# In every mode the checkpoint is saved before invoke/stream returns, so
+# the interrupt before human_approval is always persisted.
+DURABILITY_MODES = ("sync", "async", "exit")
+
+
+class DurableGraph:
+    """
+    A compiled graph whose runs use a fixed durability mode. LangGraph only
+    takes the mode per call, so it is added to every invoke/stream here;
+    everything else is passed through to the compiled graph.
+    """
+
+    def __init__(self, graph: Any, durability: str):
+        self.graph = graph
+        self.durability = durability
+
+    def invoke(self, input: Any, config: Optional[Dict] = None, **kwargs: Any) -> Any:
+        kwargs.setdefault("durability", self.durability)
+        return self.graph.invoke(input, config, **kwargs)
+
+    def stream(self, input: Any, config: Optional[Dict] = None, **kwargs: Any) -> Any:
+        kwargs.setdefault("durability", self.durability)
+        return self.graph.stream(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[Dict] = None, **kwargs: Any) -> Any:
+        kwargs.setdefault("durability", self.durability)
+        return await self.graph.ainvoke(input, config, **kwargs)
+
+    def astream(self, input: Any, config: Optional[Dict] = None, **kwargs: Any) -> Any:
+        kwargs.setdefault("durability", self.durability)
+        return self.graph.astream(input, config, **kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.graph, name)
+
+
 def compile_graph(
     l1_agent_executor: Any,
     level2_agent_executor: Any,
     memory: Optional[Any] = None,
+    durability: Optional[str] = None,
 ) -> Any:
     """
-    Assembles and compiles the LangGraph workflow.
+    Assembles and compiles the LangGraph workflow. With a checkpointer,
+    `durability` (one of DURABILITY_MODES) sets when its runs write
+    checkpoints; None keeps LangGraph's default.
     """
+    if durability is not None and durability not in DURABILITY_MODES:
+        raise ValueError(
+            f"Unknown durability mode '{durability}' (use one of {', '.join(DURABILITY_MODES)})"
+        )
+
     workflow = StateGraph(AgentState)
 
     # Add all the nodes to the graph
@@ -70,4 +119,7 @@ def compile_graph(
 
     # When compiling, tell LangGraph to interrupt BEFORE the human_approval node
     # This ensures the graph pauses and waits for an external action.
-    return workflow.compile(checkpointer=memory, interrupt_before=["human_approval"])
+    graph = workflow.compile(checkpointer=memory, interrupt_before=["human_approval"])
+    if memory is not None and durability is not None:
+        return DurableGraph(graph, durability)
+    return graph
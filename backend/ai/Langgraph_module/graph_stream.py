@@ -0,0 +1,155 @@
+# ai/Langgraph_module/graph_stream.py
+"""Server-Sent Events streaming for the compiled support graph.
+
+Runs the graph with LangGraph's streaming API and turns node progress,
+tool calls and LLM tokens into (event, payload) pairs the chat endpoint
+can push to the browser while the L1/L2 agents are still working.
+"""
+import json
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langgraph.config import get_stream_writer
+
+# ReAct agents think out loud before answering; only the text after this
+# marker is meant for the user, so tokens before it are not streamed.
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class StreamEventsHandler(BaseCallbackHandler):
+    """
+    Callback handler that forwards LLM tokens and tool calls to the graph's
+    "custom" stream. It is attached to the top-level config so every agent,
+    LLM and tool run inside the graph inherits it.
+    """
+
+    # Run inline so the handler executes inside the node's context,
+    # where LangGraph's stream writer is available.
+    run_inline = True
+
+    def __init__(self):
+        # Per-LLM-run state: owning node, scratchpad buffer and whether the
+        # final answer has started streaming.
+        self._llm_runs: Dict[UUID, Dict[str, Any]] = {}
+
+    def _write(self, payload: Dict[str, Any]):
+        try:
+            get_stream_writer()(payload)
+        except Exception:
+            # Outside of a graph run there is nowhere to stream to.
+            pass
+
+    def _track_llm(self, run_id: UUID, metadata: Optional[Dict[str, Any]]):
+        self._llm_runs[run_id] = {
+            "node": (metadata or {}).get("langgraph_node", ""),
+            "buffer": "",
+            "streaming": False,
+            "emitted": False,
+        }
+
+    def on_llm_start(self, serialized, prompts, *, run_id, metadata=None, **kwargs):
+        self._track_llm(run_id, metadata)
+
+    def on_chat_model_start(
+        self, serialized, messages, *, run_id, metadata=None, **kwargs
+    ):
+        self._track_llm(run_id, metadata)
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        llm_run = self._llm_runs.get(run_id)
+        if llm_run is None:
+            return
+
+        # Buffer the scratchpad until the agent starts its final answer.
+        if not llm_run["streaming"]:
+            buffer = llm_run["buffer"] + token
+            marker_at = buffer.find(FINAL_ANSWER_MARKER)
+            if marker_at == -1:
+                llm_run["buffer"] = buffer
+                return
+            llm_run["streaming"] = True
+            llm_run["buffer"] = ""
+            token = buffer[marker_at + len(FINAL_ANSWER_MARKER) :]
+
+        # Drop the whitespace between the marker and the first word.
+        if not llm_run["emitted"]:
+            token = token.lstrip()
+        if token:
+            llm_run["emitted"] = True
+            self._write({"event": "token", "node": llm_run["node"], "text": token})
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._llm_runs.pop(run_id, None)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._llm_runs.pop(run_id, None)
+
+    def on_tool_start(
+        self, serialized, input_str, *, run_id, metadata=None, **kwargs
+    ):
+        self._write(
+            {
+                "event": "tool_start",
+                "node": (metadata or {}).get("langgraph_node", ""),
+                "tool": (serialized or {}).get("name", kwargs.get("name", "")),
+            }
+        )
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._write({"event": "tool_end", "tool": kwargs.get("name", "")})
+
+
+def stream_graph(
+    app_graph: Any, inputs: Optional[Dict[str, Any]], config: Dict[str, Any]
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streams one graph run as (event, payload) pairs.
+
+    Yields "node_start", "node_end", "tool_start", "tool_end", "token" and
+    "interrupt" events
+    while the graph runs, and a final "done" event carrying the final state
+    together with the time-to-first-token and total duration in milliseconds.
+    """
+    started_at = time.perf_counter()
+    first_token_ms = None
+    final_state: Dict[str, Any] = {}
+
+    run_config = dict(config)
+    run_config["callbacks"] = list(config.get("callbacks") or []) + [
+        StreamEventsHandler()
+    ]
+
+    for mode, chunk in app_graph.stream(
+        inputs, config=run_config, stream_mode=["tasks", "updates", "custom", "values"]
+    ):
+        if mode == "values":
+            final_state = chunk
+        elif mode == "tasks":
+            if "result" in chunk:
+                yield "node_end", {"node": chunk["name"]}
+            else:
+                yield "node_start", {"node": chunk["name"]}
+        elif mode == "updates":
+            if "__interrupt__" in chunk:
+                yield "interrupt", {"node": "human_approval"}
+        elif mode == "custom":
+            payload = dict(chunk)
+            event = payload.pop("event", "custom")
+            if event == "token" and first_token_ms is None:
+                first_token_ms = round((time.perf_counter() - started_at) * 1000, 1)
+                print(f"---STREAM: TIME TO FIRST TOKEN {first_token_ms} ms---")
+                payload["ttft_ms"] = first_token_ms
+            yield event, payload
+
+    yield "done", {
+        "state": final_state,
+        "ttft_ms": first_token_ms,
+        "total_ms": round((time.perf_counter() - started_at) * 1000, 1),
+    }
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Formats a single Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -7,9 +7,11 @@ import traceback
 from typing import Dict, Any
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.prompts import PromptTemplate
+from langchain_core.runnables import ConfigurableField
 from langchain_google_genai import GoogleGenerativeAI
 from langchain_groq import ChatGroq
 from ai.tools import create_tools
+from utils.deadline import LLM_MAX_RETRIES_FIELD, LLM_TIMEOUT_FIELD
 
 
 def create_l1_agent_executor(support_chain):
@@ -22,7 +24,12 @@ def create_l1_agent_executor(support_chain):
         model="gemini-2.0-flash",
         google_api_key=config.GOOGLE_API_KEY,
         temperature=0.6,
-        max_retries=3,
+        max_retries=config.LLM_MAX_RETRIES,
+        timeout=config.LLM_REQUEST_TIMEOUT,
+    ).configurable_fields(
+        # Lowered per call as the request deadline approaches (utils/deadline.py).
+        max_retries=ConfigurableField(id=LLM_MAX_RETRIES_FIELD),
+        timeout=ConfigurableField(id=LLM_TIMEOUT_FIELD),
     )
     # llm = ChatGroq(
     #     model="llama3-70b-8192",
@@ -81,7 +88,12 @@ Thought:{agent_scratchpad}
 
     agent = create_react_agent(llm, tools, prompt)
     return AgentExecutor(
-        agent=agent, tools=tools, verbose=True, handle_parsing_errors=True
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        handle_parsing_errors=True,
+        # Tool results are used for a partial answer if the deadline hits.
+        return_intermediate_steps=True,
     ).with_config(
         {"run_name": "L1 Agent"}
     )  # Pass the stream to the agent executor
@@ -12,8 +12,10 @@ from langchain_google_genai import GoogleGenerativeAI
 # from langchain_groq import ChatGroq
 from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
+from langchain_core.runnables import ConfigurableField
 
 from ai.tools import create_tools
+from utils.deadline import LLM_MAX_RETRIES_FIELD, LLM_TIMEOUT_FIELD
 
 
 def create_level2_agent_executor(support_chain):
@@ -48,7 +50,12 @@ def create_level2_agent_executor(support_chain):
         model="gpt-4o",
         openai_api_key=os.getenv("OPENAI_API_KEY_HR"),
         temperature=0.6,
-        max_retries=3,
+        max_retries=config.LLM_MAX_RETRIES,
+        request_timeout=config.LLM_REQUEST_TIMEOUT,
+    ).configurable_fields(
+        # Lowered per call as the request deadline approaches (utils/deadline.py).
+        max_retries=ConfigurableField(id=LLM_MAX_RETRIES_FIELD),
+        request_timeout=ConfigurableField(id=LLM_TIMEOUT_FIELD),
     )
 
     level2_prompt_string = """
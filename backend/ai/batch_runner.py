@@ -0,0 +1,356 @@
+# ai/batch_runner.py
+"""Batch runs of canned questions through the support graph.
+
+Used by `POST /api/chat/batch` to replay many (user_id, query) items after
+prompt changes. Each item runs on its own throwaway thread_id, so items
+never see each other's state or a real user's conversation, and at most
+`concurrency` items of a batch are in flight on the shared graph executor.
+Batch runs are for evaluation only, yet their items name real users. An
+update request they make is not recorded as a pending approval for the
+real user, and the ticket and email tools return a simulated result
+instead of calling JIRA or Gmail (see `is_dry_run`).
+Results are yielded as items finish, with per-item latency and tool-call
+counts, followed by a summary.
+
+Run as a script to send a file of items to a running server and save the
+NDJSON results:
+
+    python -m ai.batch_runner items.jsonl --url http://localhost:8001 --out results.ndjson
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from database.turn_log import turn_log
+from utils.deadline import with_deadline
+from utils.graph_executor import QueueFullError
+
+BATCH_THREAD_PREFIX = "batch-"
+
+# Keys starting with "__" are passed down the run but not saved in
+# checkpoint metadata. Set on every batch item's run.
+DRY_RUN_KEY = "__dry_run"
+
+
+def is_batch_thread(thread_id: str) -> bool:
+    return str(thread_id).startswith(BATCH_THREAD_PREFIX)
+
+
+def is_dry_run() -> bool:
+    """
+    True inside a batch item's graph run: tools with side effects outside
+    the graph must only simulate them. Batch thread ids count too, so a
+    resumed batch thread stays a dry run.
+    """
+    from langgraph.config import get_config
+
+    try:
+        configurable = get_config().get("configurable") or {}
+    except RuntimeError:
+        # Called outside of a graph run.
+        return False
+    return bool(configurable.get(DRY_RUN_KEY)) or is_batch_thread(
+        configurable.get("thread_id", "")
+    )
+
+
+class ToolCallCounter(BaseCallbackHandler):
+    """Counts the tool and LLM calls made during one graph run."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.tools = Counter()
+        self.llm_calls = 0
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        name = (serialized or {}).get("name", kwargs.get("name", "")) or "unknown"
+        with self._lock:
+            self.tools[name] += 1
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        with self._lock:
+            self.llm_calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        with self._lock:
+            self.llm_calls += 1
+
+
+def run_item(
+    app_graph: Any, item: Dict[str, Any], thread_id: str, deadline: float
+) -> Dict[str, Any]:
+    """Runs one batch item on its own thread and returns its result record."""
+    counter = ToolCallCounter()
+    config = with_deadline(
+        {"configurable": {"thread_id": thread_id, DRY_RUN_KEY: True}, "callbacks": [counter]},
+        deadline,
+    )
+    inputs = {
+        "query": item["query"],
+        "user_id": item["user_id"],
+        "language": item.get("language", "en"),
+        "new_responses": [],
+    }
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"thread_id": thread_id}
+    try:
+        final_state = app_graph.invoke(inputs, config=config)
+        result.update(
+            {
+                "status": "ok",
+                "responses": final_state.get("new_responses", []),
+                "is_l2": final_state.get("is_level2_session", False),
+            }
+        )
+    except Exception as e:
+        result.update({"status": "error", "error": str(e)[:500]})
+    result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    result["tool_calls"] = sum(counter.tools.values())
+    result["tools"] = dict(counter.tools)
+    result["llm_calls"] = counter.llm_calls
+    return result
+
+
+def validate_items(items: Any, max_items: int) -> List[Dict[str, Any]]:
+    """Checks a batch payload; raises ValueError with a client-facing message."""
+    if not isinstance(items, list) or not items:
+        raise ValueError("'items' must be a non-empty list.")
+    if len(items) > max_items:
+        raise ValueError(f"A batch may contain at most {max_items} items.")
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("query") or not item.get("user_id"):
+            raise ValueError(f"Item {index} is missing 'query' or 'user_id'.")
+    return items
+
+
+def run_batch(
+    app_graph: Any,
+    graph_executor: Any,
+    items: List[Dict[str, Any]],
+    concurrency: int,
+    item_timeout: float,
+    keep_threads: bool = False,
+    batch_id: Optional[str] = None,
+    admit: Optional[Callable[[Dict[str, Any]], int]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Runs `items` with at most `concurrency` in flight and yields one record
+    per item as it finishes (in completion order, tagged with its index),
+    then a summary record. Closing the generator stops submitting new items.
+
+    `admit(item)` is called once before each item is submitted and returns
+    0 to let it run or the seconds to wait before asking again (the rate
+    limiter); items are admitted in order.
+    """
+    batch_id = batch_id or uuid.uuid4().hex[:12]
+    started = time.perf_counter()
+    pending = list(enumerate(items))
+    pending.reverse()
+    in_flight = {}
+    results = []
+    admitted = set()
+
+    def record(index, item, result):
+        entry = {
+            "type": "item",
+            "batch_id": batch_id,
+            "index": index,
+            "id": item.get("id"),
+            "user_id": item["user_id"],
+            "query": item["query"],
+            **result,
+        }
+        results.append(entry)
+        return entry
+
+    def cleanup(thread_id):
+        if keep_threads:
+            return
+        try:
+            app_graph.checkpointer.delete_thread(thread_id)
+            turn_log.clear(thread_id)
+        except Exception as e:
+            print(f"⚠️ [WARNING] Could not delete batch thread {thread_id}: {e}")
+
+    def cleanup_when_done(future, thread_id):
+        # A running graph cannot be interrupted; its thread is deleted once
+        # it finishes, or straight away if it was still queued.
+        future.add_done_callback(lambda _: cleanup(thread_id))
+
+    try:
+        while pending or in_flight:
+            # Top up to `concurrency` items; the shared executor may still refuse.
+            while pending and len(in_flight) < concurrency:
+                index, item = pending[-1]
+                if admit is not None and index not in admitted:
+                    retry_after = admit(item)
+                    if retry_after:
+                        if not in_flight:
+                            time.sleep(min(retry_after, 5))
+                        break
+                    admitted.add(index)
+                thread_id = f"{BATCH_THREAD_PREFIX}{batch_id}-{index}"
+                deadline = time.monotonic() + item_timeout
+                try:
+                    future = graph_executor.submit(
+                        run_item, app_graph, item, thread_id, deadline, deadline=deadline
+                    )
+                except QueueFullError as e:
+                    if not in_flight:
+                        time.sleep(min(e.retry_after, 5))
+                    break
+                pending.pop()
+                in_flight[future] = (index, item, thread_id, deadline)
+
+            if not in_flight:
+                continue
+
+            next_deadline = min(entry[3] for entry in in_flight.values())
+            done, _ = wait(
+                list(in_flight),
+                timeout=max(next_deadline - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED,
+            )
+            now = time.monotonic()
+            for future in list(in_flight):
+                index, item, thread_id, deadline = in_flight[future]
+                if future in done:
+                    del in_flight[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        # Raised by the executor, e.g. the deadline passed in its queue.
+                        result = {
+                            "thread_id": thread_id,
+                            "status": "error",
+                            "error": str(e)[:500],
+                        }
+                    cleanup(thread_id)
+                    yield record(index, item, result)
+                elif now >= deadline:
+                    # Stop waiting for it; it is cleaned up when it finishes.
+                    del in_flight[future]
+                    future.cancel()
+                    cleanup_when_done(future, thread_id)
+                    yield record(
+                        index,
+                        item,
+                        {
+                            "thread_id": thread_id,
+                            "status": "error",
+                            "error": f"Item did not finish within {item_timeout:g}s.",
+                        },
+                    )
+    finally:
+        # Items still in flight when the generator is closed (client gone).
+        for future, (_, _, thread_id, _) in in_flight.items():
+            future.cancel()
+            cleanup_when_done(future, thread_id)
+
+    yield summarize(batch_id, results, time.perf_counter() - started)
+
+
+def summarize(batch_id: str, results: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(r["latency_ms"] for r in results if "latency_ms" in r)
+
+    def pick(q):
+        if not latencies:
+            return None
+        return latencies[min(int(q * len(latencies)), len(latencies) - 1)]
+
+    tools = Counter()
+    for r in results:
+        tools.update(r.get("tools", {}))
+    return {
+        "type": "summary",
+        "batch_id": batch_id,
+        "items": len(results),
+        "ok": sum(1 for r in results if r["status"] == "ok"),
+        "errors": sum(1 for r in results if r["status"] != "ok"),
+        "escalated_to_l2": sum(1 for r in results if r.get("is_l2")),
+        "total_ms": round(elapsed * 1000, 1),
+        "latency_ms": {
+            "avg": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            "p50": pick(0.50),
+            "p95": pick(0.95),
+            "max": latencies[-1] if latencies else None,
+        },
+        "tool_calls": sum(tools.values()),
+        "tools": dict(tools),
+    }
+
+
+def _read_items(path: str) -> List[Dict[str, Any]]:
+    """Reads items from a JSON array file or a JSON Lines file."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if text.startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def main(argv: Optional[List[str]] = None):
+    import requests
+
+    parser = argparse.ArgumentParser(
+        description="Send a batch of chat queries to POST /api/chat/batch."
+    )
+    parser.add_argument("items", help="JSON or JSON Lines file of {user_id, query} items")
+    parser.add_argument("--url", default="http://localhost:8001", help="Server base URL")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--out", help="Write NDJSON results to this file")
+    parser.add_argument(
+        "--keep-threads",
+        action="store_true",
+        help="Keep the batch checkpoints for inspection",
+    )
+    args = parser.parse_args(argv)
+
+    items = _read_items(args.items)
+    payload = {
+        "items": items,
+        "concurrency": args.concurrency,
+        "keep_threads": args.keep_threads,
+    }
+    out = open(args.out, "w", encoding="utf-8") if args.out else None
+    summary = None
+    try:
+        with requests.post(
+            f"{args.url.rstrip('/')}/api/chat/batch", json=payload, stream=True
+        ) as response:
+            if response.status_code != 200:
+                print(f"❌ [ERROR] {response.status_code}: {response.text}")
+                return 1
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                if out:
+                    out.write(line + "\n")
+                record = json.loads(line)
+                if record["type"] == "summary":
+                    summary = record
+                    continue
+                mark = "✅" if record["status"] == "ok" else "❌"
+                print(
+                    f"{mark} [{record['index']}] {record.get('latency_ms', '-')} ms, "
+                    f"{record.get('tool_calls', 0)} tool calls: {record['query'][:60]}"
+                )
+    finally:
+        if out:
+            out.close()
+
+    if summary:
+        print(json.dumps(summary, indent=2))
+    return 0 if summary and summary["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
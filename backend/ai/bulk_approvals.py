@@ -0,0 +1,241 @@
+# ai/bulk_approvals.py
+"""Bulk admin decisions on update requests.
+
+Used by `POST /api/approve-update/bulk` to clear many paused threads at once.
+Resuming one thread is cheap (only `human_approval_node` runs), so the cost
+of a large backlog is in doing them one request at a time. Here:
+
+1. the paused states are read concurrently on a bounded pool,
+2. the user data updates of all approved requests are written together, in
+   one transaction on PostgreSQL (see `update_users_data_bulk`),
+3. the threads are resumed concurrently on the shared graph executor, so
+   they count against its admission and queue limits and the request's
+   deadline; `human_approval_node` picks up the result already written for
+   its request instead of writing it again.
+
+Each thread gets its own result; one failing item never fails the batch.
+An approved update that was written but whose thread could not be resumed
+is recorded as decided in the approvals index and reported as
+"applied_not_resumed": resuming the thread later (by another bulk or
+single decision) finds the recorded result and does not write it again.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from database.approvals_index import approvals_index
+from database.postgre import update_users_data_bulk
+from utils.deadline import with_deadline
+from utils.graph_executor import QueueFullError
+
+# Keys starting with "__" are passed down the run but not saved in
+# checkpoint metadata. Maps approval request id -> update_user_data message.
+APPLIED_UPDATES_KEY = "__applied_user_updates"
+
+DECISIONS = ("approved", "declined")
+
+
+def applied_update_result(approval_id: str) -> Optional[str]:
+    """
+    Result of a user data update already written for this request by a bulk
+    decision (in this run, or in an earlier one that could not resume the
+    thread), or None if the node has to write it itself.
+    """
+    from langgraph.config import get_config
+
+    try:
+        applied = get_config().get("configurable", {}).get(APPLIED_UPDATES_KEY) or {}
+    except RuntimeError:
+        # Called outside of a graph run.
+        applied = {}
+    if approval_id in applied:
+        return applied[approval_id]
+    return _recorded_update(approval_id)
+
+
+def _recorded_update(approval_id: str) -> Optional[str]:
+    """Result of an approved update already recorded in the approvals index."""
+    try:
+        recorded = approvals_index.decision(approval_id)
+    except Exception as e:
+        print(f"⚠️ [WARNING] Could not read approval decision {approval_id}: {e}")
+        return None
+    if recorded is None or recorded[0] != "approved":
+        return None
+    return recorded[1] or "Update successful."
+
+
+def validate_decisions(decisions: Any, max_items: int) -> List[Dict[str, str]]:
+    """Checks a bulk payload; raises ValueError with a client-facing message."""
+    if not isinstance(decisions, list) or not decisions:
+        raise ValueError("'decisions' must be a non-empty list.")
+    if len(decisions) > max_items:
+        raise ValueError(f"At most {max_items} decisions can be sent at once.")
+    seen = set()
+    for index, item in enumerate(decisions):
+        if not isinstance(item, dict) or not item.get("thread_id"):
+            raise ValueError(f"Decision {index} is missing 'thread_id'.")
+        if item.get("decision") not in DECISIONS:
+            raise ValueError(f"Decision {index} must be 'approved' or 'declined'.")
+        if item["thread_id"] in seen:
+            # A thread resumes one request at a time.
+            raise ValueError(f"Thread {item['thread_id']} appears more than once.")
+        seen.add(item["thread_id"])
+    return decisions
+
+
+def _paused_request(app_graph: Any, thread_id: str) -> Optional[Dict[str, Any]]:
+    """The request human_approval_node will process next, if the thread is paused on one."""
+    graph_state = app_graph.get_state({"configurable": {"thread_id": thread_id}})
+    if not graph_state or "human_approval" not in (graph_state.next or ()):
+        return None
+    pending_list = graph_state.values.get("pending_approvals") or []
+    return pending_list[-1] if pending_list else None
+
+
+def _resume(
+    app_graph: Any, thread_id: str, decision: str, applied: Dict[str, str], deadline: float
+) -> Optional[str]:
+    config = with_deadline(
+        {"configurable": {"thread_id": thread_id, APPLIED_UPDATES_KEY: applied}}, deadline
+    )
+    # Only the decision changes; writing back the whole state would append
+    # the history again through its reducer.
+    app_graph.update_state(config, {"human_approval_status": decision})
+    final_state = app_graph.invoke(None, config)
+    return final_state.get("human_approval_response")
+
+
+def run_bulk_decisions(
+    app_graph: Any,
+    graph_executor: Any,
+    decisions: List[Dict[str, str]],
+    concurrency: int,
+    deadline: float,
+) -> Dict[str, Any]:
+    """
+    Applies the decisions and returns per-item results and a summary. At
+    most `concurrency` resumes are in flight on `graph_executor` at a time.
+    """
+    started = time.perf_counter()
+    results = [
+        {"thread_id": item["thread_id"], "decision": item["decision"]} for item in decisions
+    ]
+    workers = max(1, min(concurrency, len(decisions)))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-approval") as pool:
+        # 1. Find the paused request of every thread.
+        def load(item):
+            try:
+                return _paused_request(app_graph, item["thread_id"]), None
+            except Exception as e:
+                return None, str(e)[:500]
+
+        requests_to_process = {}
+        for index, (approval_request, error) in enumerate(pool.map(load, decisions)):
+            if error:
+                results[index].update({"status": "error", "error": error})
+            elif approval_request is None:
+                results[index].update(
+                    {"status": "not_found", "error": "No pending approval request."}
+                )
+            else:
+                results[index]["approval_id"] = approval_request["timestamp"]
+                requests_to_process[index] = approval_request
+
+    # 2. Write all approved updates together, except those an earlier
+    # bulk decision already wrote without resuming the thread.
+    applied_by_index = {}
+    approved = []
+    for index in requests_to_process:
+        if decisions[index]["decision"] != "approved":
+            continue
+        approval_id = requests_to_process[index]["timestamp"]
+        recorded = _recorded_update(approval_id)
+        if recorded is None:
+            approved.append(index)
+        else:
+            applied_by_index[index] = {approval_id: recorded}
+    if approved:
+        try:
+            writes = update_users_data_bulk(
+                [
+                    (
+                        requests_to_process[index]["user_id"],
+                        dict(requests_to_process[index]["details"] or {}),
+                    )
+                    for index in approved
+                ]
+            )
+        except Exception as e:
+            # E.g. no database connection available.
+            writes = [(False, f"Error updating user data: {e}")] * len(approved)
+        for index, (written, message) in zip(approved, writes):
+            if written:
+                applied_by_index[index] = {
+                    requests_to_process[index]["timestamp"]: message
+                }
+            else:
+                # Leave the thread paused so the decision can be retried.
+                results[index].update({"status": "error", "error": message})
+                del requests_to_process[index]
+
+    # 3. Resume the threads on the graph executor.
+    def resume(index):
+        return _resume(
+            app_graph,
+            decisions[index]["thread_id"],
+            decisions[index]["decision"],
+            applied_by_index.get(index, {}),
+            deadline,
+        )
+
+    def resumed(index, response=None, error=None):
+        if error is None:
+            results[index].update({"status": "ok", "response": response})
+        elif index in applied_by_index:
+            # The user data has changed; record the decision so the update
+            # is not applied again when the thread is resumed later.
+            approval_id = requests_to_process[index]["timestamp"]
+            message = applied_by_index[index][approval_id]
+            try:
+                approvals_index.record_decision(requests_to_process[index], "approved", message)
+            except Exception as e:
+                print(f"⚠️ [WARNING] Could not index approval decision {approval_id}: {e}")
+            results[index].update(
+                {"status": "applied_not_resumed", "response": message, "error": error}
+            )
+        else:
+            results[index].update({"status": "error", "error": error})
+
+    waiting = list(requests_to_process)
+    waiting.reverse()
+    in_flight = {}
+    while waiting or in_flight:
+        while waiting and len(in_flight) < workers and time.monotonic() < deadline:
+            try:
+                future = graph_executor.submit(resume, waiting[-1], deadline=deadline)
+            except QueueFullError as e:
+                if not in_flight:
+                    time.sleep(min(e.retry_after, max(deadline - time.monotonic(), 0), 5))
+                break
+            in_flight[future] = waiting.pop()
+        if not in_flight:
+            if time.monotonic() >= deadline:
+                for index in waiting:
+                    resumed(index, error="Not resumed before the request deadline.")
+                waiting = []
+            continue
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            index = in_flight.pop(future)
+            try:
+                resumed(index, response=future.result())
+            except Exception as e:
+                resumed(index, error=str(e)[:500])
+
+    summary = {"total": len(results)}
+    for status in ("ok", "applied_not_resumed", "not_found", "error"):
+        summary[status] = sum(1 for r in results if r["status"] == status)
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return {"results": results, "summary": summary}
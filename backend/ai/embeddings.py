@@ -0,0 +1,51 @@
+# ai/embeddings.py
+"""Shared SentenceTransformers embedding model.
+
+The FAQ retriever and the PDF processor embed with the same model, so it is
+loaded once per process (and shared by forked workers) instead of once per
+user of it.
+"""
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+# Define custom model path
+MODEL_CACHE_PATH = os.path.join(os.path.dirname(__file__), "Embedding_models")
+
+_lock = threading.Lock()
+_embeddings = None
+
+
+class SentenceTransformerEmbeddings:
+    """Wrapper to make a SentenceTransformer compatible with LangChain and ChromaDB."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def embed_query(self, text):
+        return self.model.encode(text).tolist()
+
+    def embed_documents(self, texts):
+        return [self.model.encode(text).tolist() for text in texts]
+
+
+def get_embeddings() -> SentenceTransformerEmbeddings:
+    """Returns the process-wide embeddings, loading the model on first use."""
+    global _embeddings
+    with _lock:
+        if _embeddings is None:
+            # Imported here: pulling in torch is a large part of cold start.
+            from sentence_transformers import SentenceTransformer
+
+            logger.info("Initializing SentenceTransformers embeddings...")
+            # Use a lightweight, fast model with custom cache directory
+            model = SentenceTransformer(
+                EMBEDDING_MODEL_NAME, cache_folder=MODEL_CACHE_PATH
+            )
+            _embeddings = SentenceTransformerEmbeddings(model)
+            logger.info("✅ SentenceTransformers embeddings initialized successfully")
+            logger.info(f"📁 Model cached at: {MODEL_CACHE_PATH}")
+        return _embeddings
@@ -36,7 +36,7 @@ def init_db():
     conn.close()
 
 
-init_db()
+# init_db() is called by app startup, concurrently with the other subsystems.
 
 
 def get_cached_metric(cache_key):
@@ -53,6 +53,19 @@ def get_cached_metric(cache_key):
     return None, None
 
 
+def get_metrics_version():
+    """
+    Cheap version of the whole metrics cache: changes whenever any metric is
+    rewritten, without loading the cached payloads.
+    """
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*), MAX(created_at) FROM metrics_cache")
+    count, latest = cur.fetchone()
+    conn.close()
+    return f"{count}.{latest}"
+
+
 def set_cached_metric(cache_key, data):
     conn = get_db_connection()
     with conn:
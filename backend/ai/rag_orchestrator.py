@@ -8,12 +8,12 @@ import re
 import config
 import chromadb
 from typing import List, Dict, Any, Optional
-from sentence_transformers import SentenceTransformer
 from langchain_google_genai import GoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain_chroma import Chroma
 from database.postgre import get_policy_data, get_user_data
+from ai.embeddings import get_embeddings
 import logging
 
 # Set up logging
@@ -26,15 +26,21 @@ class UnifiedSupportChain:
         self,
         faq_db_path=config.FAQ_DB_PATH,
         faq_collection_name=config.FAQ_COLLECTION_NAME,
+        faq_embeddings=None,
+        faq_client=None,
     ):
+        """
+        `faq_embeddings` and `faq_client` may be passed in when they were
+        loaded ahead of time (app startup loads them concurrently).
+        """
         self.faq_db_path = faq_db_path
         self.faq_collection_name = faq_collection_name
 
         # Try to initialize Google AI embeddings, fallback to SentenceTransformers if quota exceeded
-        self.faq_embeddings = self._initialize_embeddings()
+        self.faq_embeddings = faq_embeddings or self._initialize_embeddings()
 
         self.faq_vectorstore = Chroma(
-            client=chromadb.PersistentClient(path=faq_db_path),
+            client=faq_client or chromadb.PersistentClient(path=faq_db_path),
             collection_name=faq_collection_name,
             embedding_function=self.faq_embeddings,
         )
@@ -47,32 +53,7 @@ class UnifiedSupportChain:
     def _initialize_embeddings(self):
         """Initialize SentenceTransformers embeddings with custom model path"""
         try:
-            logger.info("Initializing SentenceTransformers embeddings...")
-
-            # Define custom model path
-            model_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), "ai", "Embedding_models"
-            )
-
-            # Use a lightweight, fast model with custom cache directory
-            model = SentenceTransformer("all-MiniLM-L6-v2", cache_folder=model_path)
-
-            # Create a wrapper class to make it compatible with LangChain
-            class SentenceTransformerEmbeddings:
-                def __init__(self, model):
-                    self.model = model
-
-                def embed_query(self, text):
-                    return self.model.encode(text).tolist()
-
-                def embed_documents(self, texts):
-                    return [self.model.encode(text).tolist() for text in texts]
-
-            embeddings = SentenceTransformerEmbeddings(model)
-            logger.info("✅ SentenceTransformers embeddings initialized successfully")
-            logger.info(f"📁 Model cached at: {model_path}")
-            return embeddings
-
+            return get_embeddings()
         except Exception as e:
             logger.error(
                 f"❌ Failed to initialize SentenceTransformers embeddings: {e}"
@@ -7,9 +7,11 @@ from pydantic import BaseModel, Field
 from langchain.tools import Tool
 from typing import Dict, Any, List
 
+from ai.batch_runner import is_dry_run
 from database.postgre import get_policy_data, get_user_data, update_user_data
 from services.email_service import send_email
 from services.ticket_service import create_ticket, search_tickets
+from utils.deadline import deadline_guard
 
 
 class TicketCreateInput(BaseModel):
@@ -89,12 +91,8 @@ def query_specific_document(user_id: str, filename: str, query: str) -> str:
         Formatted response with relevant content from the specified document
     """
     try:
-        # Import here to avoid circular imports
-        import sys
-        import os
-
-        sys.path.append(os.path.join(os.path.dirname(__file__), "..", "uploads"))
-        from pdf_processor import pdf_processor
+        # Imported on first use: the PDF stack is loaded lazily.
+        from uploads.pdf_processor import pdf_processor
 
         # Use the user's query directly for semantic search
         # Search all documents in the database (no user filtering for simplicity)
@@ -201,6 +199,32 @@ def create_tool_wrapper(
     return wrapped_func
 
 
+# What the JIRA and Gmail tools answer in a batch run (see ai/batch_runner.py),
+# which must not open tickets for or email the real users its items name.
+DRY_RUN_RESULTS = {
+    "create_ticket": lambda x: f'Ticket DRY-RUN created in JIRA for: "{x.get("summary", "")}" (simulated, batch run).',
+    "search_ticket": lambda x: "No tickets found in JIRA for this user (simulated, batch run).",
+    "send_email": lambda x: f'Confirmation sent: {x.get("subject", "")} (simulated, batch run).',
+}
+
+
+def dry_run_guard(tool_name: str, func):
+    """Wraps a side-effecting tool so a batch run gets its simulated result."""
+
+    def guarded(input_data: Union[str, Dict[str, Any]] = None, *args, **kwargs):
+        if is_dry_run():
+            print(f"---DRY RUN: simulating tool {tool_name}---")
+            if isinstance(input_data, str):
+                try:
+                    input_data = json.loads(input_data)
+                except json.JSONDecodeError:
+                    input_data = {}
+            return DRY_RUN_RESULTS[tool_name](input_data if isinstance(input_data, dict) else {})
+        return func(input_data, *args, **kwargs)
+
+    return guarded
+
+
 def create_tools(support_chain, tool_names: List[str]):
     """
     Create a list of tools for an agent based on a list of tool names.
@@ -269,5 +293,11 @@ def create_tools(support_chain, tool_names: List[str]):
         ),
     }
 
+    # Every tool is skipped once the request's time budget is nearly spent.
+    for tool in available_tools.values():
+        tool.func = deadline_guard(tool.name, tool.func)
+    for name in DRY_RUN_RESULTS:
+        available_tools[name].func = dry_run_guard(name, available_tools[name].func)
+
     # Return only the tools that were requested
     return [available_tools[name] for name in tool_names if name in available_tools]
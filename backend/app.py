@@ -48,17 +48,24 @@ It initializes the database, sets up routes for L1 and L2 support, and handles
 all API endpoints for the conversational AI system.
 """
 
+# Imported first so the startup timeline also covers the imports below.
+from utils.startup_timeline import startup_timeline
+
+import json
+import os
+import queue
 import sqlite3
+import sys
+import time
 import traceback
 import threading
 import pickle
 from datetime import datetime
 from typing import Dict, Any
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from google.api_core import exceptions
-from langgraph.checkpoint.sqlite import SqliteSaver
 from langgraph.graph import START
 from psycopg2.extras import RealDictCursor
 
@@ -68,47 +75,374 @@ from config import SUPABASE_CLIENT, USE_SUPABASE, FLASK_SECRET_KEY
 from ai.Level1_agent import create_l1_agent_executor
 from ai.Level2_agent import create_level2_agent_executor
 from ai.Langgraph_module.graph_compiler import compile_graph
-from ai.langsmith.langsmith_cache import fetch_and_cache_all_metrics, get_cached_metric
+from ai.Langgraph_module.graph_stream import format_sse, stream_graph
+from ai.batch_runner import run_batch, validate_items
+from ai.bulk_approvals import run_bulk_decisions, validate_decisions
+from ai.embeddings import get_embeddings
+from ai.langsmith.langsmith_cache import (
+    DB_PATH as METRICS_DB_PATH,
+    fetch_and_cache_all_metrics,
+    get_cached_metric,
+    get_metrics_version,
+    init_db as init_metrics_db,
+)
 from ai.rag_orchestrator import UnifiedSupportChain
+from database.approvals_index import STATUSES as APPROVAL_STATUSES, approvals_index
+from database.checkpoint_maintenance import checkpoint_maintenance
+from database.checkpointer import create_checkpointer
 from database.db_utils import DB_POOL
-from database.postgre import init_db, update_user_history, get_all_users
+from database.turn_log import turn_log
+from database.postgre import (
+    get_user_history_since,
+    get_users_page,
+    init_db,
+    update_user_history,
+)
 from services import ticket_service
-
+from utils.graph_executor import DeadlineExceededError, GraphExecutor, QueueFullError
+from utils.change_counters import change_counters, time_bucket
+from utils.health_prober import EXTERNAL, HealthProber
+from utils.http_cache import conditional, install_compression
+from utils.idempotency import IdempotencyStore, idempotent
+from utils.leader_lock import LeaderLock
+from utils.pagination import InvalidCursorError, decode_cursor, encode_cursor, parse_limit
+from utils.process_memory import server_memory_report
+from utils.process_resources import after_fork, before_fork, master_pid
+from utils.deadline import with_deadline
+from utils.rate_limiter import estimate_llm_tokens, rate_limited, rate_limiter
+from utils.readiness import Readiness
+
+startup_timeline.mark("imports")
 
 # Initialize Flask app
 app = Flask(__name__)
 app.secret_key = FLASK_SECRET_KEY
+# Headroom over the largest file so multipart form fields still fit.
+app.config["MAX_CONTENT_LENGTH"] = config.MAX_UPLOAD_BYTES + 1024 * 1024
 
 CORS(
     app,
     resources={
         r"/*": {
             "origins": ["http://localhost:5173"],
-            "methods": ["GET", "POST", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"],
+            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+            "allow_headers": [
+                "Content-Type",
+                "Authorization",
+                "Idempotency-Key",
+                "X-Request-Timeout",
+                "If-None-Match",
+            ],
+            "expose_headers": [
+                "Retry-After",
+                "Idempotent-Replayed",
+                "ETag",
+                "X-RateLimit-Remaining-Requests",
+                "X-RateLimit-Remaining-Tokens",
+            ],
             "supports_credentials": True,
         }
     },
 )
+install_compression(app, config.HTTP_COMPRESS_MIN_BYTES, config.HTTP_COMPRESS_LEVEL)
+
+
+# --- Shared, read-only state: the embedding model and FAQ index ---
+# Under the pre-fork server (gunicorn.conf.py) this is built once in the
+# master and shared copy-on-write by all workers.
+def load_faq_client():
+    import chromadb
+
+    return chromadb.PersistentClient(path=config.FAQ_DB_PATH)
+
+
+# Independent subsystems load concurrently. JIRA, Gmail and the PDF stack
+# are not loaded here at all; they initialize on first use.
+_loaded = startup_timeline.run_parallel(
+    {
+        "embedding model": get_embeddings,
+        "faq index": load_faq_client,
+        "metrics cache db": init_metrics_db,
+    }
+)
+with startup_timeline.step("support chain"):
+    support_chain = UnifiedSupportChain(
+        faq_embeddings=_loaded["embedding model"],
+        faq_client=_loaded["faq index"],
+    )
+
+
+def init_process_resources():
+    """
+    Creates the per-process parts of the chat runtime: the agents' LLM
+    clients, the checkpointer's SQLite connections, the compiled graph and
+    the worker pool. Runs at import and again in every forked worker.
+    """
+    global l1_agent_executor, level2_agent_executor
+    global memory, app_graph, graph_executor
+
+    with startup_timeline.step("agents"):
+        l1_agent_executor = create_l1_agent_executor(support_chain)
+        level2_agent_executor = create_level2_agent_executor(support_chain)
+
+    with startup_timeline.step("checkpointer"):
+        # SQLite (WAL mode, one connection per thread) or pooled PostgreSQL,
+        # depending on CHECKPOINT_BACKEND.
+        memory = create_checkpointer()
+
+    with startup_timeline.step("graph"):
+        # --- Assemble and Compile the Graph (Langgraph---
+        app_graph = compile_graph(
+            l1_agent_executor,
+            level2_agent_executor,
+            memory,
+            durability=config.CHECKPOINT_DURABILITY,
+        )
+
+    # --- Bounded pool that runs graph invocations for the chat endpoints ---
+    graph_executor = GraphExecutor(config.GRAPH_MAX_WORKERS, config.GRAPH_MAX_QUEUE)
+
+
+init_process_resources()
+after_fork("chat runtime")(init_process_resources)
+
+
+@before_fork("checkpointer connection")
+def close_process_resources():
+    # Database connections must never be used across a fork.
+    memory.close()
+
+
+# --- Warm-up: /ready reports ready once these have run in this process ---
+readiness = Readiness(config.WARMUP_RETRY_SECONDS)
+
+WARMUP_QUERIES = [
+    "How do I file a claim?",
+    "What does my policy cover?",
+    "How can I renew my insurance policy?",
+]
+
+
+@readiness.warmup_step("embedding model")
+def warm_embedding_model():
+    # The first forward pass allocates buffers and runs lazy initialization.
+    support_chain.faq_embeddings.embed_documents(WARMUP_QUERIES)
+
+
+@readiness.warmup_step("faq retrieval")
+def warm_faq_retrieval():
+    # Loads the Chroma HNSW index into memory.
+    support_chain.faq_retriever.invoke(WARMUP_QUERIES[0])
+
+
+@readiness.warmup_step("database")
+def warm_database():
+    if USE_SUPABASE:
+        if not SUPABASE_CLIENT:
+            return "not configured"
+        SUPABASE_CLIENT.table("users").select("user_id").limit(1).execute()
+        return None
+
+    from database import db_utils
+
+    if db_utils.DB_POOL is None:
+        return "not configured"
+    # Checks out the pool's kept-open connections and checks each one.
+    conns = []
+    try:
+        for _ in range(config.DB_POOL_MIN_CONNECTIONS):
+            conn = db_utils.get_db_connection()
+            conns.append(conn)
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+    finally:
+        for conn in conns:
+            db_utils.release_db_connection(conn)
+    return f"{len(conns)} connections"
+
+
+@readiness.warmup_step("checkpointer")
+def warm_checkpointer():
+    # Creates the checkpoint tables if needed and reads through the connection.
+    memory.get_tuple({"configurable": {"thread_id": "__warmup__", "checkpoint_ns": ""}})
+
+
+# --- Health probes: /health serves the snapshot cached by this prober ---
+health_prober = HealthProber(
+    config.HEALTH_PROBE_INTERVAL_SECONDS,
+    config.HEALTH_CHECK_TIMEOUT_SECONDS,
+    deep_min_interval_seconds=config.HEALTH_DEEP_MIN_INTERVAL_SECONDS,
+    snapshot_path=config.HEALTH_SNAPSHOT_PATH,
+)
+
+
+@health_prober.check("database")
+def check_database():
+    if USE_SUPABASE:
+        if not SUPABASE_CLIENT:
+            return "not configured"
+        SUPABASE_CLIENT.table("users").select("user_id").limit(1).execute()
+        return None
+
+    from database import db_utils
+
+    conn = db_utils.get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+    finally:
+        db_utils.release_db_connection(conn)
+
+
+@health_prober.check("faq_vectorstore")
+def check_faq_vectorstore():
+    count = support_chain.faq_vectorstore._collection.count()
+    return f"{count} documents"
+
+
+@health_prober.check("pdf_vectorstore")
+def check_pdf_vectorstore():
+    # The PDF stack loads lazily; checking it must not load it.
+    pdf_module = sys.modules.get("uploads.pdf_processor")
+    if pdf_module is None:
+        return "not loaded"
+    return f"{pdf_module.pdf_processor.collection.count()} chunks"
+
+
+@health_prober.check("checkpointer")
+def check_checkpointer():
+    memory.get_tuple({"configurable": {"thread_id": "__warmup__", "checkpoint_ns": ""}})
+
+
+@health_prober.check("jira", tier=EXTERNAL)
+def check_jira():
+    if not config.JIRA_SERVER:
+        return "not configured"
+    # The client logs in lazily on first use; checking it must not connect it.
+    jira_service = sys.modules.get("services.jira_service")
+    client = jira_service.loaded_jira_client() if jira_service else None
+    if client is None:
+        return "not loaded"
+    client.server_info()
+
+
+@health_prober.check("metrics_cache", tier=EXTERNAL)
+def check_metrics_cache():
+    return f"version {get_metrics_version()}"
+
+
+# --- Deduplicates retried chat/approval requests sent with an Idempotency-Key ---
+idempotency_store = IdempotencyStore(
+    config.IDEMPOTENCY_DB_PATH, config.IDEMPOTENCY_TTL_SECONDS, config.IDEMPOTENCY_MAX_ENTRIES
+)
 
 
-support_chain = UnifiedSupportChain()
-l1_agent_executor = create_l1_agent_executor(support_chain)
-level2_agent_executor = create_level2_agent_executor(support_chain)
+@before_fork("idempotency store")
+def _close_idempotency_store():
+    idempotency_store.close()
 
 
-# Manually create a persistent connection to the SQLite database Langgraph.
-# Use Railway path if available, otherwise use local path
-checkpoints_path = config.CHECKPOINTS_PATH
-sqlite_conn = sqlite3.connect(checkpoints_path, check_same_thread=False)
-# Instantiate the checkpointer by passing the connection object to its constructor.
-memory = SqliteSaver(conn=sqlite_conn)
+@after_fork("idempotency store")
+def _reset_idempotency_store():
+    # Connections are opened lazily per thread in the worker.
+    idempotency_store.close()
 
-# --- Assemble and Compile the Graph (Langgraph---
-app_graph = compile_graph(l1_agent_executor, level2_agent_executor, memory)
+
+def data_version(scope: str, key: str = None) -> str:
+    """
+    Response version for data the app writes (see change_counters),
+    rolled over every HTTP_CACHE_REVALIDATE_SECONDS to pick up changes made
+    elsewhere.
+    """
+    bucket = time_bucket(config.HTTP_CACHE_REVALIDATE_SECONDS)
+    return f"{change_counters.version(scope, key)}.{bucket}"
+
+
+def request_deadline() -> float:
+    """
+    Returns the absolute deadline (time.monotonic) for the current request.
+    Clients may ask for a shorter or longer budget with the X-Request-Timeout
+    header (seconds), capped at GRAPH_MAX_REQUEST_TIMEOUT.
+    """
+    timeout = config.GRAPH_REQUEST_TIMEOUT
+    requested = request.headers.get("X-Request-Timeout")
+    if requested:
+        try:
+            timeout = min(float(requested), config.GRAPH_MAX_REQUEST_TIMEOUT)
+        except ValueError:
+            pass
+    return time.monotonic() + max(timeout, 0)
+
+
+def busy_response(error: QueueFullError):
+    """429 response telling the client when to retry."""
+    response = jsonify(
+        {
+            "response": "We are handling a lot of conversations right now. Please try again in a few moments.",
+            "retry_after": error.retry_after,
+        }
+    )
+    response.headers["Retry-After"] = str(error.retry_after)
+    return response, 429
+
+
+def graph_run_config(thread_id: str, deadline: float) -> dict:
+    """
+    Graph config for one chat turn. The graph gets the request's deadline
+    minus a margin for saving history and responding; nodes, agents and
+    tools use it to cut work short (see utils/deadline.py).
+    """
+    return with_deadline(
+        {"configurable": {"thread_id": thread_id}},
+        deadline - config.DEADLINE_RESPONSE_MARGIN_SECONDS,
+    )
+
+
+def chat_rate_limit_cost():
+    """(user_id, estimated LLM tokens) charged to the rate limiter for a chat turn."""
+    data = request.get_json(silent=True) or {}
+    user_id = data.get("user_id")
+    query = data.get("query")
+    if not user_id or not query:
+        return None  # Rejected by the view as a bad request.
+    return str(user_id), estimate_llm_tokens(query, config.RATE_LIMIT_TOKENS_PER_TURN)
+
+
+def admit_batch_item(item: dict) -> int:
+    """
+    Charges one batch item to its user's and the global rate-limit buckets,
+    like a chat turn. Returns 0 if it may run, else the seconds to wait.
+    """
+    try:
+        decision = rate_limiter.acquire(
+            str(item["user_id"]),
+            estimate_llm_tokens(item["query"], config.RATE_LIMIT_TOKENS_PER_TURN),
+        )
+    except sqlite3.Error as e:
+        print(f"⚠️ [WARNING] Rate limiter unavailable, batch item not limited: {e}")
+        return 0
+    if not decision.allowed:
+        print(
+            f"---BATCH ITEM RATE LIMITED {item['user_id']}: {decision.limited_by}, retry after {decision.retry_after}s---"
+        )
+        return decision.retry_after
+    return 0
+
+
+def deadline_response():
+    return (
+        jsonify(
+            {
+                "response": "I apologize, but this request took too long to process. Please try again."
+            }
+        ),
+        504,
+    )
 
 
 @app.route("/api/chat", methods=["POST"])
+@idempotent(idempotency_store, wait_timeout=config.GRAPH_MAX_REQUEST_TIMEOUT)
+@rate_limited(rate_limiter, chat_rate_limit_cost)
 def chat():
     data = request.get_json()
     query = data.get("query")
@@ -120,9 +454,11 @@ def chat():
     if not query or not user_id:
         return jsonify({"error": "Missing 'query' or 'user_id'."}), 400
 
+    deadline = request_deadline()
+
     # 1. DEFINE the unique ID for the conversation thread in sqlite checkpoint.
     #    This is the key that LangGraph will use to load and save the state.
-    config = {"configurable": {"thread_id": user_id}}
+    config = graph_run_config(user_id, deadline)
 
     # 2. PREPARE only the new inputs for this turn.
     #    The 'history' is now managed automatically by the checkpointer.
@@ -136,24 +472,17 @@ def chat():
     try:
         # 3. INVOKE the stateful graph. LangGraph will automatically load the
         #    previous state for this `thread_id` and resume where it left off.
-        final_state = app_graph.invoke(inputs, config=config)
+        #    The run goes through the bounded executor so bursts queue up
+        #    instead of piling onto the LLM providers.
+        final_state = graph_executor.run(
+            app_graph.invoke, inputs, config=config, deadline=deadline
+        )
 
         # 4. EXTRACT the final response(s) and Level2 status from the result.
         new_responses = final_state.get("new_responses", [])
         is_level2_now = final_state.get("is_level2_session", False)
 
-        # Filter out the is_level2_session field before saving to database
-        # This field is only for internal backend use, not for frontend display
-        filtered_history = []
-        for turn in final_state["history"]:
-            filtered_turn = {
-                "input": turn.get("input", ""),
-                "output": turn.get("output", ""),
-            }
-            filtered_history.append(filtered_turn)
-
-        # This saves a complete copy of the conversation to your PostgreSQL DB
-        update_user_history(user_id, filtered_history)
+        # The nodes have already appended this turn to the turn log.
 
         # 5. SEND the response to the frontend.
         # Always send the `responses` key for consistency on the frontend.
@@ -161,6 +490,14 @@ def chat():
             {"responses": new_responses, "user_id": user_id, "is_l2": is_level2_now}
         )
 
+    except QueueFullError as e:
+        print(f"---CHAT REJECTED: {e}---")
+        return busy_response(e)
+
+    except DeadlineExceededError as e:
+        print(f"---CHAT DEADLINE EXCEEDED for {user_id}: {e}---")
+        return deadline_response()
+
     except exceptions.ServiceUnavailable as e:
         # This will now only be reached if all 3 retries fail
         print(f"API is overloaded and all retries failed: {e}")
@@ -174,6 +511,174 @@ def chat():
         )
 
 
+@app.route("/api/chat/stream", methods=["POST"])
+@rate_limited(rate_limiter, chat_rate_limit_cost)
+def chat_stream():
+    """
+    Streaming variant of /api/chat using Server-Sent Events.
+    Pushes graph-node progress, tool-call markers and the agent's answer
+    tokens as they are produced, then a final "done" event with the same
+    `responses`/`is_l2` payload as /api/chat plus time-to-first-token.
+    """
+    data = request.get_json()
+    query = data.get("query")
+    user_id = data.get("user_id")
+    language = data.get("language", "en")
+
+    if not query or not user_id:
+        return jsonify({"error": "Missing 'query' or 'user_id'."}), 400
+
+    deadline = request_deadline()
+    config = graph_run_config(user_id, deadline)
+    inputs = {
+        "query": query,
+        "user_id": user_id,
+        "language": language,
+        "new_responses": [],  # IMPORTANT: Reset the list for each new turn
+    }
+
+    events = queue.Queue()
+
+    def produce_events():
+        try:
+            for item in stream_graph(app_graph, inputs, config):
+                events.put(item)
+        except Exception as e:
+            events.put(("__error__", e))
+        finally:
+            events.put(None)
+
+    # Admission happens before the response starts so a full queue can
+    # still be reported as a plain 429.
+    try:
+        graph_executor.submit(produce_events, deadline=deadline)
+    except QueueFullError as e:
+        print(f"---CHAT STREAM REJECTED: {e}---")
+        return busy_response(e)
+
+    def next_event():
+        try:
+            item = events.get(timeout=max(deadline - time.monotonic(), 0))
+        except queue.Empty:
+            raise DeadlineExceededError("Request deadline exceeded.")
+        if item is not None and item[0] == "__error__":
+            raise item[1]
+        return item
+
+    def generate():
+        try:
+            for event, payload in iter(next_event, None):
+                if event != "done":
+                    yield format_sse(event, payload)
+                    continue
+
+                final_state = payload["state"]
+                print(
+                    f"---STREAM COMPLETE: ttft={payload['ttft_ms']} ms, total={payload['total_ms']} ms---"
+                )
+                yield format_sse(
+                    "done",
+                    {
+                        "responses": final_state.get("new_responses", []),
+                        "user_id": user_id,
+                        "is_l2": final_state.get("is_level2_session", False),
+                        "ttft_ms": payload["ttft_ms"],
+                        "total_ms": payload["total_ms"],
+                    },
+                )
+
+        except DeadlineExceededError as e:
+            print(f"---CHAT STREAM DEADLINE EXCEEDED for {user_id}: {e}---")
+            yield format_sse(
+                "error",
+                {
+                    "response": "I apologize, but this request took too long to process. Please try again.",
+                    "status": 504,
+                },
+            )
+        except exceptions.ServiceUnavailable as e:
+            print(f"API is overloaded and all retries failed: {e}")
+            yield format_sse(
+                "error",
+                {
+                    "response": "I apologize, but our AI services are currently experiencing high demand. Please try again in a few moments.",
+                    "status": 503,
+                },
+            )
+        except Exception as e:
+            print(f"---ERROR DURING CHAT STREAM---: {e}")
+            traceback.print_exc()
+            yield format_sse(
+                "error", {"response": "Failed to process chat request.", "status": 500}
+            )
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/chat/batch", methods=["POST"])
+def chat_batch():
+    """
+    Runs many {user_id, query[, language, id]} items through the graph for
+    bulk processing and offline evaluation. Items run on isolated thread_ids
+    (deleted afterwards unless keep_threads is set) with bounded concurrency,
+    each charged to the rate limiter like a chat turn (items wait for it),
+    and results stream back as NDJSON: one line per item as it finishes,
+    with latency and tool-call counts, then a summary line.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        items = validate_items(data.get("items"), config.BATCH_MAX_ITEMS)
+        concurrency = int(data.get("concurrency", config.BATCH_MAX_CONCURRENCY))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    concurrency = max(1, min(concurrency, config.BATCH_MAX_CONCURRENCY))
+
+    results = run_batch(
+        app_graph,
+        graph_executor,
+        items,
+        concurrency=concurrency,
+        item_timeout=config.BATCH_ITEM_TIMEOUT,
+        keep_threads=bool(data.get("keep_threads", False)),
+        admit=admit_batch_item,
+    )
+
+    def generate():
+        for record in results:
+            if record["type"] == "summary":
+                print(
+                    f"---BATCH {record['batch_id']} COMPLETE: {record['ok']}/{record['items']} ok, total={record['total_ms']} ms---"
+                )
+            yield json.dumps(record, default=str) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/chat/executor-stats", methods=["GET"])
+def get_executor_stats():
+    """
+    Queue depth, active workers and recent wait/run times of the graph
+    execution pool, plus Idempotency-Key dedup counters.
+    """
+    return (
+        jsonify(
+            {
+                **graph_executor.stats(),
+                "idempotency": idempotency_store.stats(),
+            }
+        ),
+        200,
+    )
+
+
 @app.route("/api/login/", methods=["POST"])
 def login():
     print("🟡 [INFO] Received login request.")
@@ -217,25 +722,23 @@ def login():
                 print(
                     f"[INFO] Clearing Supabase history for user_id: {user_id_to_clear}"
                 )
-                SUPABASE_CLIENT.table("users").update({"history": "[]"}).eq(
-                    "user_id", user_id_to_clear
-                ).execute()
+                update_user_history(user_id_to_clear, [])
 
                 # 2. Reset LangGraph checkpoint for the user to ensure a fresh start.
                 try:
                     print(
                         f"[INFO] Clearing LangGraph checkpoint for thread_id: {user_id_to_clear}"
                     )
-                    with sqlite_conn:
-                        sqlite_cursor = sqlite_conn.cursor()
-                        sqlite_cursor.execute(
-                            "DELETE FROM checkpoints WHERE thread_id = ?",
-                            (user_id_to_clear,),
-                        )
+                    # Deletes the thread's checkpoints and pending writes.
+                    memory.delete_thread(str(user_id_to_clear))
+                    turn_log.clear(str(user_id_to_clear))
+                    # Drops the thread's pending requests and archives its decided ones.
+                    approvals_index.clear_thread(str(user_id_to_clear))
                     print(
                         f"[SUCCESS] Cleared LangGraph checkpoint for thread_id: {user_id_to_clear}"
                     )
-                except sqlite3.Error as e:
+                except Exception as e:
+                    # SQLite or PostgreSQL, depending on CHECKPOINT_BACKEND.
                     print(
                         f"[WARNING] Could not clear LangGraph checkpoint for thread_id {user_id_to_clear}: {e}"
                     )
@@ -343,60 +846,33 @@ def login():
 @app.route("/api/pending-approvals", methods=["GET"])
 def get_pending_approvals():
     """
-    Fetches all approval requests from the checkpoints database,
-    categorized into pending, approved, and declined.
+    Fetches approval requests from the approvals index, newest first, with
+    the total per status. Without `status`, returns the first page of each
+    of pending, approved and declined; with `status`, one page of that list.
+    Query params: status, limit, cursor (only together with status).
     """
+    status = request.args.get("status")
+    if status is not None and status not in APPROVAL_STATUSES:
+        return jsonify({"error": "status must be pending, approved or declined"}), 400
     try:
-        all_pending = []
-        all_approved = []
-        all_declined = []
-
-        # Connect to SQLite to get all thread_ids
-        with sqlite3.connect("checkpoints.sqlite") as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            # DISTINCT to avoid processing the same thread multiple times
-            cursor.execute("SELECT DISTINCT thread_id FROM checkpoints")
-            rows = cursor.fetchall()
-
-        # If there are no threads, there's nothing to do
-        if not rows:
-            return (
-                jsonify(
-                    {
-                        "pending": [],
-                        "approved": [],
-                        "declined": [],
-                    }
-                ),
-                200,
-            )
+        limit = parse_limit(request.args.get("limit"))
+        after = decode_cursor(request.args.get("cursor"), 2) if status else None
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
 
-        # For each thread, get its state and aggregate the approval lists
-        for row in rows:
-            thread_id = row["thread_id"]
-            if not thread_id:
-                continue
-
-            config = {"configurable": {"thread_id": thread_id}}
-            graph_state = app_graph.get_state(config)
-
-            if graph_state:
-                user_state = graph_state.values
-                all_pending.extend(user_state.get("pending_approvals", []))
-                all_approved.extend(user_state.get("approved_approvals", []))
-                all_declined.extend(user_state.get("declined_approvals", []))
-
-        return (
-            jsonify(
-                {
-                    "pending": all_pending,
-                    "approved": all_approved,
-                    "declined": all_declined,
-                }
-            ),
-            200,
-        )
+    try:
+        body = {"counts": approvals_index.counts()}
+        next_cursors = {}
+        for listed_status in [status] if status else APPROVAL_STATUSES:
+            approvals, next_after = approvals_index.page(listed_status, limit, after)
+            body[listed_status] = approvals
+            next_cursors[listed_status] = encode_cursor(next_after) if next_after else None
+        if status:
+            body["next_cursor"] = next_cursors[status]
+            body["has_more"] = next_cursors[status] is not None
+        else:
+            body["next_cursors"] = next_cursors
+        return jsonify(body), 200
 
     except Exception as e:
         print(f"---ERROR FETCHING APPROVALS---: {e}")
@@ -411,42 +887,10 @@ def get_user_approval_status(user_id):
     Returns a simple status string: "pending", "approved", "declined", or "no_history"
     """
     try:
-        # Create config for the specific user
-        config = {"configurable": {"thread_id": user_id}}
-
-        # Get the user's state from checkpoints
-        graph_state = app_graph.get_state(config)
-
-        if not graph_state:
-            # User not found or no state exists
-            return jsonify({"status": "no_history"}), 200
-
-        user_state = graph_state.values
-
-        # Check approval lists in priority order
-        pending_list = user_state.get("pending_approvals", [])
-        approved_list = user_state.get("approved_approvals", [])
-        declined_list = user_state.get("declined_approvals", [])
-
-        # Debug logging to see what's in each list
-        print(f"---DEBUG USER STATUS for {user_id}---")
-        print(f"Pending list: {pending_list}")
-        print(f"Approved list: {approved_list}")
-        print(f"Declined list: {declined_list}")
-
-        # Determine status based on priority: declined > pending > approved > no_history
-        # If there are declined requests, prioritize them over pending (to handle duplicate requests)
-        if declined_list:
-            status = "declined"
-        elif pending_list:
-            status = "pending"
-        elif approved_list:
-            status = "approved"
-        else:
-            status = "no_history"
-
-        print(f"---DETERMINED STATUS: {status}---")
-
+        # Priority over the requests since the last login: declined > pending > approved.
+        # Declined wins over pending to handle duplicate requests.
+        status = approvals_index.user_status(user_id)
+        print(f"---DETERMINED STATUS for {user_id}: {status}---")
         return jsonify({"status": status}), 200
 
     except Exception as e:
@@ -456,7 +900,47 @@ def get_user_approval_status(user_id):
         return jsonify({"status": "no_history"}), 200
 
 
+@app.route("/api/approve-update/bulk", methods=["POST"])
+@idempotent(idempotency_store, wait_timeout=config.GRAPH_MAX_REQUEST_TIMEOUT)
+def approve_updates_bulk():
+    """
+    Applies many admin decisions at once. Body:
+    {"decisions": [{"thread_id": "...", "decision": "approved" | "declined"}, ...]}
+    The approved updates are written in one database transaction and the
+    paused threads are resumed concurrently on the graph executor, within
+    the request's deadline. Returns a result per item.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        decisions = validate_decisions(
+            data.get("decisions"), config.BULK_APPROVAL_MAX_ITEMS
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    print(f"\n---BULK APPROVE-UPDATE TRIGGERED FOR {len(decisions)} THREADS---")
+    try:
+        outcome = run_bulk_decisions(
+            app_graph,
+            graph_executor,
+            decisions,
+            config.BULK_APPROVAL_CONCURRENCY,
+            request_deadline(),
+        )
+    except Exception as e:
+        print(f"---ERROR PROCESSING BULK APPROVALS---: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Failed to process approval decisions."}), 500
+
+    summary = outcome["summary"]
+    print(
+        f"---BULK APPROVE-UPDATE COMPLETE: {summary['ok']}/{summary['total']} ok, total={summary['elapsed_ms']} ms---"
+    )
+    return jsonify(outcome), 200
+
+
 @app.route("/api/approve-update/<string:thread_id>", methods=["POST"])
+@idempotent(idempotency_store, wait_timeout=config.GRAPH_MAX_REQUEST_TIMEOUT)
 def approve_update(thread_id):
     """
     Resumes a paused graph execution with the admin's decision.
@@ -518,52 +1002,46 @@ def logout():
 
 
 @app.route("/api/chat/history/<user_id>", methods=["GET"])
+@conditional(lambda user_id: data_version("history", user_id))
 def get_chat_history(user_id):
+    """
+    Returns chat history turns. With `?since=<turn_index>` only the turns
+    after that index are returned, so clients can poll for new turns and
+    append them. `turn_count` is the total number of turns; if it is lower
+    than `since` the history was reset and the full history is returned with
+    `reset: true`.
+    """
     print(f"\n🔍 [DEBUG] Fetching chat history for user_id: {user_id}")
     try:
-        if USE_SUPABASE:
-            # ========== SUPABASE CODE START ==========
-            # Use Supabase client
-            result = (
-                SUPABASE_CLIENT.table("users")
-                .select("history")
-                .eq("user_id", user_id)
-                .execute()
-            )
+        since = int(request.args.get("since", 0))
+    except ValueError:
+        return jsonify({"error": "since must be an integer"}), 400
+    since = max(since, 0)
 
-            if not result.data:
-                print(f"❌ [ERROR] No user found with user_id: {user_id}")
-                return jsonify({"error": "User not found"}), 404
-
-            history = (
-                eval(result.data[0]["history"]) if result.data[0]["history"] else []
-            )
-            print(f"✅ [SUCCESS] Retrieved history: {history}")
-            return jsonify({"history": history}), 200
-            # ========== SUPABASE CODE END ==========
-        # else:
-        # # ========== ORIGINAL POSTGRESQL CODE START ==========
-        # # Use local PostgreSQL
-        # conn = DB_POOL.getconn()
-        # cursor = conn.cursor(cursor_factory=RealDictCursor)
-
-        # # Get chat history from users table
-        # query = "SELECT history FROM users WHERE user_id = %s"
-        # print(f"📝 [DEBUG] Executing query: {query} with user_id: {user_id}")
-
-        # cursor.execute(query, (user_id,))
-        # result = cursor.fetchone()
-
-        # print(f"📊 [DEBUG] Query result: {result}")
-
-        # if not result:
-        #     print(f"❌ [ERROR] No user found with user_id: {user_id}")
-        #     return jsonify({"error": "User not found"}), 404
-
-        # history = eval(result["history"]) if result["history"] else []
-        # print(f"✅ [SUCCESS] Retrieved history: {history}")
-        # return jsonify({"history": history}), 200
-        # # ========== ORIGINAL POSTGRESQL CODE END ==========
+    try:
+        result = get_user_history_since(user_id, since)
+        if result is None:
+            print(f"❌ [ERROR] No user found with user_id: {user_id}")
+            return jsonify({"error": "User not found"}), 404
+
+        turns, turn_count = result
+        reset = turn_count < since
+        if reset:
+            turns, turn_count = get_user_history_since(user_id, 0)
+        print(
+            f"✅ [SUCCESS] Retrieved {len(turns)} of {turn_count} history turns (since={since})"
+        )
+        return (
+            jsonify(
+                {
+                    "history": turns,
+                    "turn_count": turn_count,
+                    "since": 0 if reset else since,
+                    "reset": reset,
+                }
+            ),
+            200,
+        )
 
     except Exception as e:
         print(f"❌ [ERROR] Error fetching chat history: {str(e)}")
@@ -571,13 +1049,10 @@ def get_chat_history(user_id):
 
         traceback.print_exc()
         return jsonify({"error": str(e)}), 500
-    finally:
-        if not USE_SUPABASE and "conn" in locals():
-            DB_POOL.putconn(conn)
-            print("🔄 [DEBUG] Database connection returned to pool")
 
 
 @app.route("/api/user/policies/<user_id>", methods=["GET"])
+@conditional(lambda user_id: data_version("policies", user_id))
 def get_user_policies(user_id):
     print(f"\n🔍 [DEBUG] Fetching policies for user_id: {user_id}")
     try:
@@ -667,19 +1142,48 @@ def get_user_policies(user_id):
 
 
 @app.route("/api/tickets/all", methods=["GET"])
+@conditional(lambda: data_version("tickets"))
 def get_all_tickets_api():
     """
-    API endpoint to fetch all tickets from JIRA.
+    API endpoint to fetch tickets from JIRA, newest first, one page at a time.
+    Query params: limit, cursor, status (comma-separated), created_from, created_to.
     """
     try:
-        tickets = ticket_service.get_all_tickets()
-        return jsonify({"tickets": tickets}), 200
+        limit = parse_limit(request.args.get("limit"))
+        after = decode_cursor(request.args.get("cursor"), 1)
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    statuses = [
+        status.strip()
+        for status in request.args.get("status", "").split(",")
+        if status.strip()
+    ]
+    try:
+        # One extra row tells us whether another page exists.
+        tickets = ticket_service.get_tickets_page(
+            limit + 1,
+            before_key=after[0] if after else None,
+            statuses=statuses,
+            created_from=request.args.get("created_from"),
+            created_to=request.args.get("created_to"),
+        )
+        has_more = len(tickets) > limit
+        tickets = tickets[:limit]
+        next_cursor = encode_cursor([tickets[-1]["id"]]) if has_more else None
+        return (
+            jsonify(
+                {"tickets": tickets, "next_cursor": next_cursor, "has_more": has_more}
+            ),
+            200,
+        )
     except Exception as e:
         print(f"Error fetching all tickets: {e}")
         return jsonify({"error": "Failed to fetch tickets"}), 500
 
 
 @app.route("/api/metrics", methods=["GET"])
+@conditional(get_metrics_version)
 def get_metrics():
     """
     API endpoint to serve all cached LangSmith metrics for the dashboard.
@@ -715,13 +1219,37 @@ def get_metrics():
 
 
 @app.route("/api/admin/users", methods=["GET"])
+@conditional(lambda: data_version("users"))
 def get_all_users_api():
     """
-    API endpoint to fetch all users for the admin portal.
+    API endpoint to fetch users for the admin portal, ordered by name, one
+    page at a time. Query params: limit, cursor, name_prefix, email_prefix.
     """
     try:
-        users = get_all_users()
-        return jsonify({"users": users}), 200
+        limit = parse_limit(request.args.get("limit"))
+        after = decode_cursor(request.args.get("cursor"), 2)
+    except (InvalidCursorError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        # One extra row tells us whether another page exists.
+        users = get_users_page(
+            limit + 1,
+            after=after,
+            name_prefix=request.args.get("name_prefix"),
+            email_prefix=request.args.get("email_prefix"),
+        )
+        has_more = len(users) > limit
+        users = users[:limit]
+        next_cursor = (
+            encode_cursor([users[-1]["name"], users[-1]["user_id"]])
+            if has_more
+            else None
+        )
+        return (
+            jsonify({"users": users, "next_cursor": next_cursor, "has_more": has_more}),
+            200,
+        )
     except Exception as e:
         print(f"Error fetching users: {e}")
         return jsonify({"error": "Failed to fetch users"}), 500
@@ -739,11 +1267,92 @@ def background_metrics_caching():
         print(f"⚠️ [WARNING] The background metrics caching task failed: {e}")
 
 
+def checkpointed_approval_states():
+    """(thread_id, state values) of every checkpointed thread, for the backfill."""
+    for thread_id in memory.thread_ids():
+        if not thread_id or thread_id.startswith("batch-"):
+            continue
+        graph_state = app_graph.get_state({"configurable": {"thread_id": thread_id}})
+        if graph_state:
+            yield thread_id, graph_state.values
+
+
+def background_approvals_backfill():
+    """
+    Imports approval requests made before the approvals index existed.
+    Runs once per deployment; later starts return immediately.
+    """
+    try:
+        imported = approvals_index.backfill(checkpointed_approval_states)
+        if imported is not None:
+            print(f"✅ [SUCCESS] Approvals index backfilled with {imported} requests.")
+    except Exception as e:
+        print(f"⚠️ [WARNING] The approvals index backfill failed: {e}")
+
+
+# Only one server process refreshes the metrics cache at startup.
+metrics_leader = LeaderLock(f"{METRICS_DB_PATH}.lock")
+
+
+def start_background_services():
+    """
+    Starts background work for this process: the warm-up behind /ready, the
+    health prober behind /health, the PDF ingestion dispatcher and checkpoint
+    maintenance (the last three active in one process only), the one-time
+    approvals index backfill and the startup metrics caching. Must run after forking,
+    never in the pre-fork master.
+    """
+    from uploads.ingestion_jobs import ingestion_jobs
+
+    readiness.start()
+    health_prober.start()
+    ingestion_jobs.start()
+    checkpoint_maintenance.start()
+    threading.Thread(target=background_approvals_backfill, daemon=True).start()
+
+    if metrics_leader.try_acquire():
+        # Populate metrics cache on startup in a background thread
+        print("🚀 [INFO] Starting off metrics caching in the background.")
+        metrics_thread = threading.Thread(
+            target=background_metrics_caching, daemon=True
+        )
+        metrics_thread.start()
+
+
+after_fork("background services")(start_background_services)
+
+
+@app.route("/api/system/workers", methods=["GET"])
+def get_worker_memory():
+    """
+    Per-process memory (RSS, PSS, shared/private KiB) of the server master and
+    its workers, to verify the preloaded models stay shared after forking.
+    """
+    return jsonify(server_memory_report(master_pid())), 200
+
+
+@app.route("/api/system/checkpoints", methods=["GET"])
+def get_checkpoint_maintenance():
+    """
+    Checkpoint retention settings, the size of the checkpoints database, the
+    rows and bytes reclaimed by the last maintenance run and in total, and
+    this worker's checkpointer connections and write-lock wait times.
+    """
+    try:
+        report = checkpoint_maintenance.report()
+        report["checkpointer"] = memory.stats()
+        return jsonify(report), 200
+    except Exception as e:
+        print(f"Error reading checkpoint maintenance stats: {e}")
+        return jsonify({"error": "Failed to read checkpoint maintenance stats"}), 500
+
+
 # ========== PDF UPLOAD ENDPOINTS START ==========
 @app.route("/api/upload/pdf", methods=["POST"])
 def upload_pdf():
     """
-    Upload and process PDF documents for vector storage.
+    Accept a PDF upload and queue it for background ingestion into vector
+    storage. Returns a job id to poll at /api/upload/jobs/<job_id>.
     """
     print("🔄 [INFO] Received PDF upload request")
 
@@ -770,57 +1379,63 @@ def upload_pdf():
             if key not in ["user_id", "document_type"]:
                 metadata[key] = value
 
-        # Save file temporarily
-        import tempfile
-        import os
-        from uploads.pdf_processor import pdf_processor
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            file.save(temp_file.name)
-            temp_path = temp_file.name
+        # Spool the file to disk and hand it to the background ingestion
+        # workers; extraction and embedding happen outside this request.
+        from uploads.chunked_upload import UploadError, hash_stream_to_file
+        from uploads.ingestion_jobs import ingestion_jobs
 
+        job_id = ingestion_jobs.new_job_id()
+        spool_path = ingestion_jobs.spool_path(job_id)
         try:
-            # Process PDF
-            result = pdf_processor.process_pdf(
-                pdf_path=temp_path,
-                filename=file.filename,
-                user_id=user_id,
-                document_type=document_type,
-                metadata=metadata,
+            content_sha256 = hash_stream_to_file(
+                file.stream, spool_path, config.MAX_UPLOAD_BYTES
+            )
+        except UploadError as e:
+            os.unlink(spool_path)
+            return jsonify({"error": str(e)}), e.status
+
+        # Identical content is only embedded once.
+        existing = ingestion_jobs.find_indexed_document(
+            content_sha256
+        ) or ingestion_jobs.find_active_job(content_sha256)
+        if existing:
+            os.unlink(spool_path)
+            print(f"♻️ [INFO] {file.filename} is already indexed; skipping ingestion")
+            return (
+                jsonify(
+                    {
+                        "message": "PDF content already uploaded",
+                        "duplicate": True,
+                        "job_id": existing.get("job_id"),
+                        "content_sha256": content_sha256,
+                        "status_url": f"/api/upload/jobs/{existing.get('job_id')}",
+                    }
+                ),
+                200,
             )
 
-            if result["success"]:
-                print(f"✅ [SUCCESS] PDF processed successfully: {file.filename}")
-                return (
-                    jsonify(
-                        {
-                            "message": "PDF processed successfully",
-                            "document_id": result["document_id"],
-                            "chunk_count": result["chunk_count"],
-                            "text_length": result["text_length"],
-                            "filename": result["filename"],
-                            "document_type": result["document_type"],
-                        }
-                    ),
-                    200,
-                )
-            else:
-                print(
-                    f"❌ [ERROR] PDF processing failed: {result.get('error', 'Unknown error')}"
-                )
-                return (
-                    jsonify(
-                        {
-                            "error": f"PDF processing failed: {result.get('error', 'Unknown error')}"
-                        }
-                    ),
-                    500,
-                )
-
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+        job = ingestion_jobs.submit(
+            job_id,
+            spool_path,
+            file.filename,
+            user_id=user_id,
+            document_type=document_type,
+            metadata=metadata,
+            content_sha256=content_sha256,
+        )
+        return (
+            jsonify(
+                {
+                    "message": "PDF accepted for processing",
+                    "duplicate": False,
+                    "job_id": job_id,
+                    "content_sha256": content_sha256,
+                    "status": job["status"],
+                    "status_url": f"/api/upload/jobs/{job_id}",
+                }
+            ),
+            202,
+        )
 
     except Exception as e:
         print(f"❌ [ERROR] PDF upload error: {str(e)}")
@@ -830,72 +1445,158 @@ def upload_pdf():
         return jsonify({"error": f"Upload failed: {str(e)}"}), 500
 
 
-# ========== PDF UPLOAD ENDPOINTS END ==========
+@app.route("/api/upload/jobs/<string:job_id>", methods=["GET"])
+def get_upload_job(job_id):
+    """
+    Returns the state of a PDF ingestion job:
+    queued, extracting, embedding, done or failed, with chunk progress.
+    """
+    from uploads.ingestion_jobs import ingestion_jobs
 
+    job = ingestion_jobs.get_job(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job), 200
 
-@app.route("/health", methods=["GET"])
-def health_check():
+
+def upload_error_response(error):
+    return jsonify({"error": str(error)}), error.status
+
+
+@app.route("/api/upload/sessions", methods=["POST"])
+def create_upload_session():
     """
-    Health check endpoint for Railway deployment.
+    Starts a resumable chunked upload.
+    Body: {"filename", "total_size", "user_id"?, "document_type"?, "metadata"?}
+    Parts of `part_size` bytes are then PUT in order to
+    /api/upload/sessions/<upload_id>/parts/<n> (1-based).
     """
+    from uploads.chunked_upload import UploadError, chunked_uploads
+
+    data = request.get_json(silent=True) or {}
     try:
-        # Check if essential components are working
-        health_status = {
-            "status": "healthy",
-            "timestamp": str(datetime.now()),
-            "services": {
-                "flask": "ok",
-                "database": "unknown",  # Will be checked if needed
-                "chromadb": "unknown",  # Will be checked if needed
-            },
-        }
+        session_info = chunked_uploads.create_session(
+            filename=data.get("filename", ""),
+            total_size=int(data.get("total_size") or 0),
+            user_id=data.get("user_id"),
+            document_type=data.get("document_type", "policy"),
+            metadata=data.get("metadata") or {},
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+    except (TypeError, ValueError):
+        return jsonify({"error": "total_size must be an integer"}), 400
+    return jsonify(session_info), 201
 
-        # Try to check database connection (optional)
-        try:
-            if USE_SUPABASE and SUPABASE_CLIENT:
-                # Simple Supabase health check
-                result = (
-                    SUPABASE_CLIENT.table("users").select("user_id").limit(1).execute()
-                )
-                health_status["services"]["database"] = "ok"
-            else:
-                health_status["services"]["database"] = "not_configured"
-        except Exception as e:
-            health_status["services"]["database"] = f"error: {str(e)[:50]}"
 
-        # Try to check ChromaDB (optional)
-        try:
-            # Simple ChromaDB health check
-            if hasattr(support_chain, "faq_vectorstore"):
-                health_status["services"]["chromadb"] = "ok"
-            else:
-                health_status["services"]["chromadb"] = "not_initialized"
-        except Exception as e:
-            health_status["services"]["chromadb"] = f"error: {str(e)[:50]}"
+@app.route("/api/upload/sessions/<string:upload_id>", methods=["GET"])
+def get_upload_session(upload_id):
+    """Returns upload progress; `next_part` tells a client where to resume."""
+    from uploads.chunked_upload import UploadError, chunked_uploads
 
-        return jsonify(health_status), 200
+    try:
+        return jsonify(chunked_uploads.get_session(upload_id)), 200
+    except UploadError as e:
+        return upload_error_response(e)
 
-    except Exception as e:
+
+@app.route(
+    "/api/upload/sessions/<string:upload_id>/parts/<int:part_number>",
+    methods=["PUT"],
+)
+def put_upload_part(upload_id, part_number):
+    """Streams one part (raw request body) into the upload."""
+    from uploads.chunked_upload import UploadError, chunked_uploads
+
+    try:
         return (
-            jsonify(
-                {
-                    "status": "unhealthy",
-                    "error": str(e),
-                    "timestamp": str(datetime.now()),
-                }
-            ),
-            500,
+            jsonify(chunked_uploads.write_part(upload_id, part_number, request.stream)),
+            200,
         )
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+@app.route("/api/upload/sessions/<string:upload_id>/complete", methods=["POST"])
+def complete_upload_session(upload_id):
+    """
+    Finishes the upload. An optional {"sha256"} body is checked against the
+    hash computed while the parts streamed in. Duplicate content returns 200
+    with the existing document; new content returns 202 with the ingestion job.
+    """
+    from uploads.chunked_upload import UploadError, chunked_uploads
+    from uploads.ingestion_jobs import ingestion_jobs
+
+    data = request.get_json(silent=True) or {}
+    try:
+        result = chunked_uploads.complete(
+            upload_id, ingestion_jobs, expected_sha256=data.get("sha256")
+        )
+    except UploadError as e:
+        return upload_error_response(e)
+
+    if result["job_id"]:
+        result["status_url"] = f"/api/upload/jobs/{result['job_id']}"
+    return jsonify(result), 200 if result["duplicate"] else 202
+
+
+@app.route("/api/upload/sessions/<string:upload_id>", methods=["DELETE"])
+def abort_upload_session(upload_id):
+    """Aborts an open upload and discards the received parts."""
+    from uploads.chunked_upload import UploadError, chunked_uploads
+
+    try:
+        return jsonify(chunked_uploads.abort(upload_id)), 200
+    except UploadError as e:
+        return upload_error_response(e)
+
+
+# ========== PDF UPLOAD ENDPOINTS END ==========
+
+
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """
+    Readiness endpoint for Railway and Docker health checks. Returns 503
+    until this process has finished warming up, with per-step durations.
+    """
+    status_code = 200 if readiness.is_ready else 503
+    return jsonify(readiness.report()), status_code
+
+
+@app.route("/health", methods=["GET"])
+def health_check():
+    """
+    Liveness endpoint (see /ready). Returns the snapshot cached by the
+    background health prober, so polling it never touches a dependency.
+    With ?deep=1 the checks run now, each bounded by a timeout, at most once
+    per HEALTH_DEEP_MIN_INTERVAL_SECONDS on the host; sooner requests get 429
+    with the cached snapshot.
+    """
+    if request.args.get("deep") == "1":
+        retry_after = health_prober.deep_retry_after()
+        if retry_after:
+            response = jsonify(health_prober.snapshot())
+            response.headers["Retry-After"] = str(retry_after)
+            return response, 429
+        health_status = health_prober.refresh()
+    else:
+        health_status = health_prober.snapshot()
+    status_code = 503 if health_status["status"] == "unhealthy" else 200
+    return jsonify(health_status), status_code
+
+
+startup_timeline.mark("app ready")
+startup_timeline.log()
 
 
 if __name__ == "__main__":
     # Initialize database
     init_db()
 
-    # Populate metrics cache on startup in a background thread
-    print("🚀 [INFO] Starting off metrics caching in the background.")
-    metrics_thread = threading.Thread(target=background_metrics_caching)
-    metrics_thread.start()
+    # Development server: a single process runs all background services.
+    # Production runs pre-forked workers behind the router: python router.py
+    start_background_services()
 
     # Run Flask app12
     app.run(debug=config.DEBUG, host="0.0.0.0", port=8001)
@@ -1,6 +1,7 @@
 # 2. config.py
 """Configuration settings for the application."""
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -43,6 +44,13 @@ if os.path.exists(RAILWAY_DATA_DIR):
     CHECKPOINTS_PATH = os.getenv(
         "CHECKPOINTS_PATH", os.path.join(RAILWAY_DATA_DIR, "checkpoints.sqlite")
     )
+    UPLOAD_SPOOL_DIR = os.getenv(
+        "UPLOAD_SPOOL_DIR", os.path.join(RAILWAY_DATA_DIR, "uploads")
+    )
+    CHANGE_COUNTERS_DB_PATH = os.getenv(
+        "CHANGE_COUNTERS_DB_PATH",
+        os.path.join(RAILWAY_DATA_DIR, "change_counters.sqlite"),
+    )
 else:
     # Running locally
     FAQ_DB_PATH = os.getenv("FAQ_DB_PATH", os.path.join(BASE_DIR, "faq_database"))
@@ -55,6 +63,25 @@ else:
     CHECKPOINTS_PATH = os.getenv(
         "CHECKPOINTS_PATH", os.path.join(BASE_DIR, "checkpoints.sqlite")
     )
+    UPLOAD_SPOOL_DIR = os.getenv(
+        "UPLOAD_SPOOL_DIR", os.path.join(BASE_DIR, "uploads", "spool")
+    )
+    CHANGE_COUNTERS_DB_PATH = os.getenv(
+        "CHANGE_COUNTERS_DB_PATH", os.path.join(BASE_DIR, "change_counters.sqlite")
+    )
+
+# PDF ingestion jobs are tracked next to the spooled uploads.
+INGESTION_JOBS_DB_PATH = os.getenv(
+    "INGESTION_JOBS_DB_PATH", os.path.join(UPLOAD_SPOOL_DIR, "ingestion_jobs.sqlite")
+)
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", "2"))
+# How often the dispatching process looks for jobs queued by other workers.
+INGESTION_POLL_SECONDS = float(os.getenv("INGESTION_POLL_SECONDS", "1"))
+
+# Upload limits. Large files go through the resumable chunked upload API.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(100 * 1024 * 1024)))
+UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", str(5 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
 
 FAQ_COLLECTION_NAME = os.getenv("FAQ_COLLECTION_NAME", "faq_collection")
 PDF_COLLECTION_NAME = os.getenv("PDF_COLLECTION_NAME", "pdf_documents")
@@ -109,4 +136,204 @@ else:
     }
     SUPABASE_CLIENT = None
     # ========== ORIGINAL POSTGRESQL CODE END ==========
+
+# Local PostgreSQL pool size. The minimum connections are kept open and are
+# checked during warm-up so the first requests do not pay for connecting.
+DB_POOL_MIN_CONNECTIONS = int(os.getenv("DB_POOL_MIN_CONNECTIONS", "2"))
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "10"))
 # ========== SUPABASE INTEGRATION END ==========
+
+# Graph Execution Pool Settings
+# Chat turns run on a fixed pool of workers behind a bounded queue.
+GRAPH_MAX_WORKERS = int(os.getenv("GRAPH_MAX_WORKERS", "8"))
+GRAPH_MAX_QUEUE = int(os.getenv("GRAPH_MAX_QUEUE", "32"))
+# Default and maximum time budget for a single chat request, in seconds.
+GRAPH_REQUEST_TIMEOUT = float(os.getenv("GRAPH_REQUEST_TIMEOUT", "60"))
+GRAPH_MAX_REQUEST_TIMEOUT = float(os.getenv("GRAPH_MAX_REQUEST_TIMEOUT", "120"))
+
+# Rate Limiting Settings (LLM-backed chat endpoints)
+# Token buckets per user and global, in requests and in estimated LLM
+# tokens: each refills at *_PER_MINUTE and holds at most *_BURST. A rate of
+# 0 disables that bucket. Buckets are shared by all workers via SQLite.
+RATE_LIMIT_DB_PATH = os.getenv(
+    "RATE_LIMIT_DB_PATH",
+    os.path.join(os.path.dirname(CHANGE_COUNTERS_DB_PATH), "rate_limits.sqlite"),
+)
+RATE_LIMIT_USER_REQUESTS_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_REQUESTS_PER_MINUTE", "10"))
+RATE_LIMIT_USER_REQUESTS_BURST = float(os.getenv("RATE_LIMIT_USER_REQUESTS_BURST", "5"))
+RATE_LIMIT_USER_TOKENS_PER_MINUTE = float(os.getenv("RATE_LIMIT_USER_TOKENS_PER_MINUTE", "40000"))
+RATE_LIMIT_USER_TOKENS_BURST = float(os.getenv("RATE_LIMIT_USER_TOKENS_BURST", "20000"))
+RATE_LIMIT_GLOBAL_REQUESTS_PER_MINUTE = float(os.getenv("RATE_LIMIT_GLOBAL_REQUESTS_PER_MINUTE", "300"))
+RATE_LIMIT_GLOBAL_REQUESTS_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_REQUESTS_BURST", "60"))
+RATE_LIMIT_GLOBAL_TOKENS_PER_MINUTE = float(os.getenv("RATE_LIMIT_GLOBAL_TOKENS_PER_MINUTE", "1000000"))
+RATE_LIMIT_GLOBAL_TOKENS_BURST = float(os.getenv("RATE_LIMIT_GLOBAL_TOKENS_BURST", "200000"))
+# Estimated LLM tokens charged per chat turn on top of the query itself
+# (prompts, history, tool results and the answer).
+RATE_LIMIT_TOKENS_PER_TURN = int(os.getenv("RATE_LIMIT_TOKENS_PER_TURN", "4000"))
+
+# Deadline Settings
+# The graph's deadline is this much earlier than the request's, leaving time
+# to save history and send the response.
+DEADLINE_RESPONSE_MARGIN_SECONDS = float(os.getenv("DEADLINE_RESPONSE_MARGIN_SECONDS", "2"))
+# No agent step (LLM call) starts with less time than this left; tools are
+# skipped with less than DEADLINE_MIN_TOOL_SECONDS left.
+DEADLINE_STEP_RESERVE_SECONDS = float(os.getenv("DEADLINE_STEP_RESERVE_SECONDS", "8"))
+DEADLINE_MIN_TOOL_SECONDS = float(os.getenv("DEADLINE_MIN_TOOL_SECONDS", "3"))
+# Per-attempt LLM timeout and retries (retries are dropped near the deadline).
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+
+# Batch Chat Settings (POST /api/chat/batch)
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "4"))
+# Time budget for each batch item, in seconds.
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", "180"))
+
+# Bulk Approval Settings
+# POST /api/approve-update/bulk resumes up to this many paused threads at a time.
+BULK_APPROVAL_MAX_ITEMS = int(os.getenv("BULK_APPROVAL_MAX_ITEMS", "1000"))
+BULK_APPROVAL_CONCURRENCY = int(os.getenv("BULK_APPROVAL_CONCURRENCY", "8"))
+
+# Idempotency Settings
+# Responses to requests sent with an Idempotency-Key header are kept this
+# long (seconds) and replayed to retries with the same key.
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", "3600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "5000"))
+# Keys are shared by the worker processes of one host through this file.
+IDEMPOTENCY_DB_PATH = os.getenv(
+    "IDEMPOTENCY_DB_PATH",
+    os.path.join(os.path.dirname(CHANGE_COUNTERS_DB_PATH), "idempotency.sqlite"),
+)
+
+# Chat History Cache
+# Decoded histories kept in memory so delta polls do not re-read the blob.
+HISTORY_CACHE_MAX_USERS = int(os.getenv("HISTORY_CACHE_MAX_USERS", "1000"))
+HISTORY_CACHE_TTL_SECONDS = float(os.getenv("HISTORY_CACHE_TTL_SECONDS", "60"))
+
+# Pagination Settings (admin users and tickets)
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "200"))
+
+# Checkpointer Backend
+# "sqlite" keeps conversation state in CHECKPOINTS_PATH, local to one server.
+# "postgres" stores it in the PostgreSQL database from DB_CONFIG, so any
+# replica can serve any turn or approval. Pool sizes are per worker process.
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite").lower()
+CHECKPOINT_PG_POOL_MIN_SIZE = int(os.getenv("CHECKPOINT_PG_POOL_MIN_SIZE", "2"))
+CHECKPOINT_PG_POOL_MAX_SIZE = int(os.getenv("CHECKPOINT_PG_POOL_MAX_SIZE", "10"))
+# Seconds to wait for a free pooled connection.
+CHECKPOINT_PG_POOL_TIMEOUT = float(os.getenv("CHECKPOINT_PG_POOL_TIMEOUT", "30"))
+
+# Checkpoint durability: when a chat turn writes its checkpoints.
+# "sync" after every graph step before the next one runs, "async" after
+# every step in the background (LangGraph's default), "exit" once per turn.
+# Pauses for human approval are persisted in every mode.
+CHECKPOINT_DURABILITY = os.getenv("CHECKPOINT_DURABILITY", "async").lower()
+
+# Checkpoint Cache Settings
+# The latest checkpoint of recently active threads is kept in memory in
+# every worker, bounded by entries and encoded bytes; entries unused for
+# CHECKPOINT_CACHE_IDLE_SECONDS are dropped. 0 entries disables the cache.
+CHECKPOINT_CACHE_MAX_ENTRIES = int(os.getenv("CHECKPOINT_CACHE_MAX_ENTRIES", "1000"))
+CHECKPOINT_CACHE_MAX_BYTES = int(os.getenv("CHECKPOINT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CHECKPOINT_CACHE_IDLE_SECONDS = float(os.getenv("CHECKPOINT_CACHE_IDLE_SECONDS", "600"))
+# Hits are checked against the thread's newest checkpoint in the database.
+# Only turn this off when every write to a thread goes through the worker
+# that caches it: router.py defaults it to false for its workers when the
+# checkpoints are in SQLite (hits are still checked once after the router
+# moves threads between workers).
+CHECKPOINT_CACHE_VALIDATE = os.getenv("CHECKPOINT_CACHE_VALIDATE", "true").lower() == "true"
+
+# Checkpointer SQLite Settings
+# Each operation checks out one of at most CHECKPOINT_SQLITE_POOL_SIZE
+# WAL-mode connections to CHECKPOINTS_PATH per process. Writers wait up to
+# the busy timeout for the write lock (and for a free connection); waits
+# longer than CHECKPOINT_SLOW_LOCK_WAIT_MS are counted as slow.
+CHECKPOINT_SQLITE_POOL_SIZE = int(os.getenv("CHECKPOINT_SQLITE_POOL_SIZE", "16"))
+CHECKPOINT_SQLITE_SYNCHRONOUS = os.getenv("CHECKPOINT_SQLITE_SYNCHRONOUS", "NORMAL")
+CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS", "10000"))
+CHECKPOINT_SQLITE_MMAP_BYTES = int(os.getenv("CHECKPOINT_SQLITE_MMAP_BYTES", str(256 * 1024 * 1024)))
+CHECKPOINT_SLOW_LOCK_WAIT_MS = float(os.getenv("CHECKPOINT_SLOW_LOCK_WAIT_MS", "100"))
+
+# Checkpoint Serialization Settings
+# "zstd" compresses checkpoint blobs (msgpack) with zstd, using the active
+# trained dictionary in CHECKPOINT_ZSTD_DICT_DIR if there is one; "none"
+# writes plain msgpack. Both read blobs written in either format.
+CHECKPOINT_COMPRESSION = os.getenv("CHECKPOINT_COMPRESSION", "zstd").lower()
+CHECKPOINT_ZSTD_LEVEL = int(os.getenv("CHECKPOINT_ZSTD_LEVEL", "3"))
+# Smaller blobs are stored uncompressed.
+CHECKPOINT_ZSTD_MIN_BYTES = int(os.getenv("CHECKPOINT_ZSTD_MIN_BYTES", "128"))
+CHECKPOINT_ZSTD_DICT_DIR = os.getenv(
+    "CHECKPOINT_ZSTD_DICT_DIR",
+    os.path.join(os.path.dirname(CHECKPOINTS_PATH), "checkpoint_dictionaries"),
+)
+
+# Checkpoint Retention Settings
+# A background task keeps the newest CHECKPOINT_KEEP_PER_THREAD checkpoints
+# of every thread, expires threads idle for longer than the TTL (0 keeps
+# them) and compacts the file. An interval of 0 disables the task.
+CHECKPOINT_KEEP_PER_THREAD = int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "2"))
+CHECKPOINT_IDLE_TTL_HOURS = float(os.getenv("CHECKPOINT_IDLE_TTL_HOURS", "168"))
+CHECKPOINT_MAINTENANCE_INTERVAL_SECONDS = float(
+    os.getenv("CHECKPOINT_MAINTENANCE_INTERVAL_SECONDS", "3600")
+)
+# Pages returned to the filesystem per incremental VACUUM step.
+CHECKPOINT_VACUUM_PAGES = int(os.getenv("CHECKPOINT_VACUUM_PAGES", "1000"))
+
+# Approvals Index
+# Update requests and admin decisions are recorded here by the graph, so the
+# approval endpoints never have to scan checkpoint threads.
+APPROVALS_DB_PATH = os.getenv(
+    "APPROVALS_DB_PATH",
+    os.path.join(os.path.dirname(CHECKPOINTS_PATH), "approvals.sqlite"),
+)
+
+# Turn Log
+# Conversation turns are appended here once each; the graph state only
+# keeps the recent turns the prompts use.
+TURN_LOG_DB_PATH = os.getenv(
+    "TURN_LOG_DB_PATH",
+    os.path.join(os.path.dirname(CHECKPOINTS_PATH), "turn_log.sqlite"),
+)
+
+# Readiness Settings
+# Failed warm-up steps (see /ready) are retried after this many seconds.
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+
+# Health Probe Settings
+# /health serves results cached by a background prober that checks every
+# dependency this often; each check gives up after the timeout.
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "30"))
+HEALTH_CHECK_TIMEOUT_SECONDS = float(os.getenv("HEALTH_CHECK_TIMEOUT_SECONDS", "5"))
+# /health?deep=1 runs a round at most this often (it is unauthenticated).
+HEALTH_DEEP_MIN_INTERVAL_SECONDS = float(os.getenv("HEALTH_DEEP_MIN_INTERVAL_SECONDS", "10"))
+# One worker per host probes and writes the snapshot here for all of them.
+HEALTH_SNAPSHOT_PATH = os.getenv(
+    "HEALTH_SNAPSHOT_PATH",
+    os.path.join(os.path.dirname(CHANGE_COUNTERS_DB_PATH), "health_snapshot.json"),
+)
+
+# HTTP Cache Settings
+# ETags for polled read endpoints. Data that can change outside this
+# process (Supabase dashboard, JIRA) is revalidated at least this often.
+HTTP_CACHE_REVALIDATE_SECONDS = float(os.getenv("HTTP_CACHE_REVALIDATE_SECONDS", "15"))
+HTTP_COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", "1024"))
+HTTP_COMPRESS_LEVEL = int(os.getenv("HTTP_COMPRESS_LEVEL", "6"))
+
+# Worker Router Settings (python router.py)
+# The router serves HOST:PORT and starts the pre-fork server on a loopback
+# port, with every worker also listening on a slot socket in
+# ROUTER_SOCKET_DIR. Requests for one thread always go to the same worker;
+# requests that change a thread's state wait at most
+# ROUTER_QUEUE_TIMEOUT_SECONDS for the ones before them.
+ROUTER_WORKERS = int(os.getenv("WEB_CONCURRENCY", "2"))
+ROUTER_BACKEND_PORT = int(os.getenv("ROUTER_BACKEND_PORT", "8002"))
+ROUTER_SOCKET_DIR = os.getenv(
+    "ROUTER_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "helpdesk-router")
+)
+ROUTER_VNODES = int(os.getenv("ROUTER_VNODES", "64"))
+ROUTER_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ROUTER_QUEUE_TIMEOUT_SECONDS", "180"))
+ROUTER_UPSTREAM_TIMEOUT_SECONDS = float(
+    os.getenv("ROUTER_UPSTREAM_TIMEOUT_SECONDS", os.getenv("GUNICORN_TIMEOUT", "180"))
+)
+ROUTER_PROBE_SECONDS = float(os.getenv("ROUTER_PROBE_SECONDS", "2"))
@@ -0,0 +1,285 @@
+# database/approvals_index.py
+"""
+Materialized index of update-approval requests.
+
+`level2_node` records each update request here when it parks a thread for
+human approval, and `human_approval_node` records the admin's decision, so
+the approval endpoints read one indexed table instead of loading the graph
+state of every thread that ever chatted. The graph state stays the source
+of truth for resuming a thread; this table only answers "what is waiting,
+what was decided, and when".
+
+Rows are keyed by the request's id (the `timestamp` uuid of the approval
+request dict). Clearing a thread (login) drops its pending requests and
+archives its decided ones: they stay listed for admins but no longer count
+towards the user's current status, which, like the thread state it
+replaces, starts afresh. The table lives next to the checkpoints (see
+`database/state_store.py`) so every server process that can resume a
+thread sees its requests.
+"""
+import json
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import config
+from database.state_store import create_store
+from utils.process_resources import after_fork, before_fork
+
+STATUSES = ("pending", "approved", "declined")
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS approvals (
+    approval_id TEXT PRIMARY KEY,
+    thread_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    details TEXT NOT NULL,
+    requested_at DOUBLE PRECISION NOT NULL,
+    decided_at DOUBLE PRECISION,
+    response TEXT,
+    archived_at DOUBLE PRECISION
+);
+CREATE INDEX IF NOT EXISTS approvals_status_time
+    ON approvals (status, requested_at DESC, approval_id DESC);
+CREATE INDEX IF NOT EXISTS approvals_user_time
+    ON approvals (user_id, requested_at DESC);
+CREATE TABLE IF NOT EXISTS approvals_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+UPSERT_DECISION_SQL = """
+INSERT INTO approvals
+    (approval_id, thread_id, user_id, status, details, requested_at, decided_at, response)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (approval_id) DO UPDATE SET
+    status = excluded.status,
+    decided_at = excluded.decided_at,
+    response = excluded.response
+"""
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class ApprovalsIndex:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.store = create_store(db_path, CREATE_TABLE_SQL, CREATE_TABLE_SQL)
+        if self.store.backend == "sqlite":
+            with self.store.transaction() as conn:
+                columns = {row["name"] for row in conn.execute("PRAGMA table_info(approvals)")}
+                if "archived_at" not in columns:
+                    # Files created before threads could be archived.
+                    conn.execute("ALTER TABLE approvals ADD COLUMN archived_at REAL")
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        self.store.close()
+
+    @staticmethod
+    def _key(approval_request: Dict[str, Any]) -> Tuple[str, str, str, str]:
+        return (
+            str(approval_request["timestamp"]),
+            str(approval_request.get("thread_id") or approval_request["user_id"]),
+            str(approval_request["user_id"]),
+            json.dumps(approval_request.get("details") or {}, default=str),
+        )
+
+    def record_request(self, approval_request: Dict[str, Any]):
+        """Records a new pending request (the dict level2_node puts in the state)."""
+        approval_id, thread_id, user_id, details = self._key(approval_request)
+        with self.store.transaction() as conn:
+            conn.execute(
+                "INSERT INTO approvals "
+                "(approval_id, thread_id, user_id, status, details, requested_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?) ON CONFLICT (approval_id) DO NOTHING",
+                (approval_id, thread_id, user_id, details, time.time()),
+            )
+
+    def record_decision(
+        self, approval_request: Dict[str, Any], status: str, response: Optional[str] = None
+    ):
+        """
+        Records the decision on a request. Requests made before the index
+        existed are inserted on the spot.
+        """
+        approval_id, thread_id, user_id, details = self._key(approval_request)
+        now = time.time()
+        with self.store.transaction() as conn:
+            conn.execute(
+                UPSERT_DECISION_SQL,
+                (approval_id, thread_id, user_id, status, details, now, now, response),
+            )
+
+    def clear_thread(self, thread_id: str) -> int:
+        """
+        Called when a thread's checkpoints are cleared. Drops its pending
+        requests, which can no longer be resumed, and archives its decided
+        ones. Returns the number of pending requests dropped.
+        """
+        with self.store.transaction() as conn:
+            cursor = conn.execute(
+                "DELETE FROM approvals WHERE thread_id = ? AND status = 'pending'",
+                (thread_id,),
+            )
+            conn.execute(
+                "UPDATE approvals SET archived_at = ? "
+                "WHERE thread_id = ? AND archived_at IS NULL",
+                (time.time(), thread_id),
+            )
+        return cursor.rowcount
+
+    def pending_thread_ids(self) -> set:
+        """Threads paused on a request that has not been decided yet."""
+        with self.store.read() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT thread_id FROM approvals WHERE status = 'pending'"
+            ).fetchall()
+        return {row["thread_id"] for row in rows}
+
+    def page(
+        self, status: str, limit: int, after: Optional[List[Any]] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[List[Any]]]:
+        """
+        Up to `limit` requests with `status`, newest first, and the sort key
+        to pass as `after` for the next page (None on the last page). `after`
+        is the (requested_at, approval_id) of the last row already returned.
+        """
+        sql = (
+            "SELECT approval_id, thread_id, user_id, status, details, requested_at, "
+            "decided_at, response FROM approvals WHERE status = ?"
+        )
+        params: List[Any] = [status]
+        if after is not None:
+            sql += " AND (requested_at, approval_id) < (?, ?)"
+            params.extend([float(after[0]), str(after[1])])
+        sql += " ORDER BY requested_at DESC, approval_id DESC LIMIT ?"
+        # One extra row tells us whether another page exists.
+        params.append(limit + 1)
+        with self.store.read() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        next_after = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_after = [rows[-1]["requested_at"], rows[-1]["approval_id"]]
+        return [self._to_dict(row) for row in rows], next_after
+
+    @staticmethod
+    def _to_dict(row: Any) -> Dict[str, Any]:
+        # Keeps the keys of the approval request dicts in the graph state.
+        return {
+            "thread_id": row["thread_id"],
+            "user_id": row["user_id"],
+            "details": json.loads(row["details"]),
+            "timestamp": row["approval_id"],
+            "status": row["status"],
+            "requested_at": _iso(row["requested_at"]),
+            "decided_at": _iso(row["decided_at"]),
+            "response": row["response"],
+        }
+
+    def counts(self) -> Dict[str, int]:
+        with self.store.read() as conn:
+            rows = conn.execute(
+                "SELECT status, COUNT(*) AS requests FROM approvals GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in STATUSES}
+        counts.update({row["status"]: row["requests"] for row in rows})
+        return counts
+
+    def decision(self, approval_id: str) -> Optional[Tuple[str, Optional[str]]]:
+        """(status, response) recorded for a request, or None if it is still pending."""
+        with self.store.read() as conn:
+            row = conn.execute(
+                "SELECT status, response FROM approvals WHERE approval_id = ?",
+                (str(approval_id),),
+            ).fetchone()
+        if row is None or row["status"] == "pending":
+            return None
+        return row["status"], row["response"]
+
+    def user_status(self, user_id: str) -> str:
+        """
+        "declined", "pending", "approved" or "no_history", in that order of
+        priority over the user's requests since their thread was last cleared.
+        """
+        with self.store.read() as conn:
+            rows = conn.execute(
+                "SELECT DISTINCT status FROM approvals "
+                "WHERE user_id = ? AND archived_at IS NULL",
+                (str(user_id),),
+            ).fetchall()
+        statuses = {row["status"] for row in rows}
+        for status in ("declined", "pending", "approved"):
+            if status in statuses:
+                return status
+        return "no_history"
+
+    def backfill(
+        self, load_states: Callable[[], Iterable[Tuple[str, Dict[str, Any]]]]
+    ) -> Optional[int]:
+        """
+        One-time import of the approval lists held in existing thread states
+        (from before the index existed). `load_states` yields
+        (thread_id, state values). Only the first process to claim the
+        backfill runs it; returns the number of requests imported, or None
+        if it had already been claimed.
+        """
+        with self.store.transaction() as conn:
+            claimed = conn.execute(
+                "INSERT INTO approvals_meta (name, value) VALUES ('backfilled', ?) "
+                "ON CONFLICT (name) DO NOTHING",
+                (_iso(time.time()),),
+            ).rowcount
+        if not claimed:
+            return None
+
+        imported = 0
+        try:
+            for thread_id, values in load_states():
+                for status in STATUSES:
+                    for approval_request in values.get(f"{status}_approvals") or []:
+                        approval_id, _, user_id, details = self._key(approval_request)
+                        now = time.time()
+                        with self.store.transaction() as conn:
+                            imported += conn.execute(
+                                "INSERT INTO approvals "
+                                "(approval_id, thread_id, user_id, status, details, "
+                                "requested_at, decided_at) VALUES (?, ?, ?, ?, ?, ?, ?) "
+                                "ON CONFLICT (approval_id) DO NOTHING",
+                                (
+                                    approval_id,
+                                    thread_id,
+                                    user_id,
+                                    status,
+                                    details,
+                                    now,
+                                    None if status == "pending" else now,
+                                ),
+                            ).rowcount
+        except Exception:
+            # Let the next start try again.
+            with self.store.transaction() as conn:
+                conn.execute("DELETE FROM approvals_meta WHERE name = 'backfilled'")
+            raise
+        return imported
+
+
+approvals_index = ApprovalsIndex(config.APPROVALS_DB_PATH)
+
+
+@before_fork("approvals index")
+def _close_approvals_index():
+    approvals_index.close()
+
+
+@after_fork("approvals index")
+def _reset_approvals_index():
+    # Connections are opened lazily per thread in the worker.
+    approvals_index.close()
@@ -0,0 +1,386 @@
+# database/checkpoint_cache.py
+"""
+In-process cache of the latest checkpoint of recently active threads.
+
+Every chat turn and every `/api/pending-approvals/<user_id>` poll makes
+LangGraph load the thread's latest checkpoint, which means reading and
+decoding the blob (and its pending writes) from the database, and most
+active users send several messages a minute. `CachedCheckpointer` wraps
+the checkpointer and keeps the latest checkpoint of each recent thread in
+memory:
+
+- writes go through to the database first and then replace the cached
+  entry (write-through), so the cache never holds state the database does
+  not;
+- entries are kept in LRU order, bounded by count and by encoded size, and
+  dropped after `idle_seconds` without use;
+- entries are stored encoded and decoded on every hit, because graph nodes
+  mutate the lists in the state they are given. A checkpoint written by
+  `put` is cached as the bytes the saver just wrote, so the many
+  super-steps of a run are not encoded twice; a saver that writes the
+  channels separately (PostgreSQL) has its entry reloaded on next use;
+- `delete_thread` (login, batch cleanup) drops the thread's entries.
+
+Other worker processes write to the same threads, so by default a hit is
+first checked against the database's newest checkpoint id and pending
+write count for the thread, a key-only index lookup. A mismatch counts as
+stale and reloads the thread. Behind `router.py` every write to a thread
+goes through the worker that caches it and hits are not checked, except
+after the router moved threads between workers (`ring_version` changed).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+
+class _Entry:
+    __slots__ = (
+        "config",
+        "parent_config",
+        "checkpoint",
+        "metadata",
+        "writes",
+        "serde",
+        "head",
+        "ring",
+        "size",
+        "used_at",
+    )
+
+    def __init__(self, config, parent_config, checkpoint, metadata, writes, serde, head, ring):
+        self.config = config
+        self.parent_config = parent_config
+        self.checkpoint = checkpoint
+        self.metadata = metadata
+        self.writes = writes
+        # Decodes `checkpoint`: the cache's own codec or the saver's serializer.
+        self.serde = serde
+        # (checkpoint_id, pending write count) this entry matches.
+        self.head = head
+        # The router's ring version when the entry was stored.
+        self.ring = ring
+        self.size = len(checkpoint[1]) + len(metadata) + len(writes[1])
+        self.used_at = time.monotonic()
+
+
+def _checkpoint_id(entry: _Entry) -> str:
+    # Checkpoint ids are uuid6 strings, which sort by creation time.
+    return entry.config["configurable"]["checkpoint_id"]
+
+
+class _PutRecorder:
+    """
+    Wraps the saver's serializer and keeps what it encodes for the
+    checkpoint being put, so `put` can cache those bytes.
+    """
+
+    def __init__(self, serde: Any):
+        self.serde = serde
+        self._local = threading.local()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.serde, name)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        data = self.serde.dumps_typed(obj)
+        if obj is getattr(self._local, "checkpoint", None):
+            self._local.data = data
+        return data
+
+    def expect(self, checkpoint: Checkpoint):
+        self._local.checkpoint = checkpoint
+        self._local.data = None
+
+    def take(self) -> Optional[Tuple[str, bytes]]:
+        """The saver's encoding of the expected checkpoint, if it made one."""
+        data = getattr(self._local, "data", None)
+        self._local.checkpoint = self._local.data = None
+        return data
+
+
+class CachedCheckpointer(BaseCheckpointSaver):
+    """Write-through LRU of each recent thread's latest checkpoint."""
+
+    def __init__(
+        self,
+        saver: BaseCheckpointSaver,
+        max_entries: int,
+        max_bytes: int,
+        idle_seconds: float,
+        validate: bool = True,
+        ring_version: Optional[Callable[[], Optional[str]]] = None,
+    ):
+        saver.serde = self._recorder = _PutRecorder(saver.serde)
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.validate = validate
+        self.ring_version = ring_version
+        # Entries read back from the saver are re-encoded as plain msgpack.
+        self._codec = JsonPlusSerializer()
+        self._no_writes = self._codec.dumps_typed([])
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._counts = {"hits": 0, "misses": 0, "stale": 0, "evictions": 0}
+
+    # --- Cache bookkeeping ---
+
+    @staticmethod
+    def _key(config: Dict[str, Any]) -> Tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def _count(self, name: str):
+        with self._lock:
+            self._counts[name] += 1
+
+    def _drop(self, key: Tuple[str, str]):
+        # Caller holds self._lock.
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.size
+
+    def _store(self, key: Tuple[str, str], entry: _Entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            current = self._entries.get(key)
+            if current is not None and _checkpoint_id(current) > _checkpoint_id(entry):
+                # A concurrent put already cached a newer checkpoint.
+                return
+            self._drop(key)
+            self._entries[key] = entry
+            self._bytes += entry.size
+            now = time.monotonic()
+            while self._entries and (
+                len(self._entries) > self.max_entries
+                or self._bytes > self.max_bytes
+                or now - next(iter(self._entries.values())).used_at > self.idle_seconds
+            ):
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+                self._counts["evictions"] += 1
+
+    def _cached(self, key: Tuple[str, str]) -> Optional[_Entry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            now = time.monotonic()
+            if now - entry.used_at > self.idle_seconds:
+                self._drop(key)
+                self._counts["evictions"] += 1
+                return None
+            entry.used_at = now
+            self._entries.move_to_end(key)
+            return entry
+
+    def _ring(self) -> Optional[str]:
+        return self.ring_version() if self.ring_version is not None else None
+
+    def _entry(
+        self,
+        item: CheckpointTuple,
+        head: Tuple[str, int],
+        encoded: Optional[Tuple[str, bytes]] = None,
+    ) -> _Entry:
+        """An entry for `item`; `encoded` is the saver's encoding of its checkpoint."""
+        writes = [list(write) for write in item.pending_writes or []]
+        return _Entry(
+            item.config,
+            item.parent_config,
+            encoded or self._codec.dumps_typed(item.checkpoint),
+            self._codec.dumps(item.metadata),
+            self._codec.dumps_typed(writes) if writes else self._no_writes,
+            self._recorder.serde if encoded else self._codec,
+            head,
+            self._ring(),
+        )
+
+    def _tuple(self, entry: _Entry) -> CheckpointTuple:
+        writes = self._codec.loads_typed(entry.writes) or []
+        return CheckpointTuple(
+            entry.config,
+            entry.serde.loads_typed(entry.checkpoint),
+            self._codec.loads(entry.metadata),
+            entry.parent_config,
+            [tuple(write) for write in writes],
+        )
+
+    def invalidate(self, thread_id: str):
+        """Drops every cached namespace of a thread."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == thread_id]:
+                self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            entries, size = len(self._entries), self._bytes
+        lookups = counts["hits"] + counts["misses"] + counts["stale"]
+        return {
+            "entries": entries,
+            "bytes": size,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            **counts,
+            "hit_rate": round(counts["hits"] / lookups, 3) if lookups else None,
+        }
+
+    # --- Checkpointer ---
+
+    def get_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        key = self._key(config)
+        checkpoint_id = get_checkpoint_id(config)
+        entry = self._cached(key)
+        if entry is not None and checkpoint_id not in (None, _checkpoint_id(entry)):
+            # An older checkpoint was asked for; those are not cached.
+            return self.saver.get_tuple(config)
+        if entry is None:
+            self._count("misses")
+            head = self.saver.head(*key) if self.validate else None
+        elif not self.validate and entry.ring == self._ring():
+            self._count("hits")
+            return self._tuple(entry)
+        else:
+            # The same head is checked against the reloaded checkpoint below.
+            head = self.saver.head(*key)
+            if head == entry.head:
+                # Checked once after a ring change, then trusted again.
+                entry.ring = self._ring()
+                self._count("hits")
+                return self._tuple(entry)
+            self._count("stale")
+
+        item = self.saver.get_tuple(config)
+        if item is None:
+            return None
+        item_head = (item.config["configurable"]["checkpoint_id"], len(item.pending_writes or []))
+        if not self.validate or head == item_head:
+            # Only cache the latest checkpoint, as read after the head check.
+            self._store(key, self._entry(item, item_head))
+        return item
+
+    def list(
+        self,
+        config: Optional[Dict[str, Any]],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: Dict[str, Any],
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> Dict[str, Any]:
+        key = self._key(config)
+        self._recorder.expect(checkpoint)
+        try:
+            next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        except Exception:
+            self._recorder.take()
+            with self._lock:
+                self._drop(key)
+            raise
+        encoded = self._recorder.take()
+        if encoded is None:
+            # No single blob to reuse; the next read reloads the thread.
+            with self._lock:
+                self._drop(key)
+            return next_config
+        parent_id = config["configurable"].get("checkpoint_id")
+        item = CheckpointTuple(
+            next_config,
+            checkpoint,
+            get_checkpoint_metadata(config, metadata),
+            (
+                {
+                    "configurable": {
+                        "thread_id": key[0],
+                        "checkpoint_ns": key[1],
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            [],
+        )
+        self._store(key, self._entry(item, (checkpoint["id"], 0), encoded))
+        return next_config
+
+    def put_writes(
+        self,
+        config: Dict[str, Any],
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        # Pending writes change what get_tuple returns; reload on next use.
+        with self._lock:
+            self._drop(self._key(config))
+        self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.invalidate(str(thread_id))
+        self.saver.delete_thread(thread_id)
+
+    def get_next_version(self, current: Any, channel: None) -> Any:
+        return self.saver.get_next_version(current, channel)
+
+    # The app only runs graphs synchronously; async calls skip the cache.
+
+    async def aget_tuple(self, config: Dict[str, Any]) -> Optional[CheckpointTuple]:
+        return await self.saver.aget_tuple(config)
+
+    def alist(self, config, *, filter=None, before=None, limit=None):
+        return self.saver.alist(config, filter=filter, before=before, limit=limit)
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        self.invalidate(self._key(config)[0])
+        return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        self.invalidate(self._key(config)[0])
+        return await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.invalidate(str(thread_id))
+        return await self.saver.adelete_thread(thread_id)
+
+    # --- Pass-through ---
+
+    def close(self):
+        self.clear()
+        self.saver.close()
+
+    def thread_ids(self):
+        return self.saver.thread_ids()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.saver.stats(), "cache": self.cache_stats()}
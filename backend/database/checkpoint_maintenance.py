@@ -0,0 +1,375 @@
+# database/checkpoint_maintenance.py
+"""
+Retention and compaction for the LangGraph checkpoints database.
+
+`SqliteSaver` keeps a checkpoint for every super-step of every thread, and
+because `AgentState.history` accumulates, each one carries the whole
+conversation so far. Left alone the file grows without bound and every
+`get_state` reads through more pages. A background task in one server
+process (the holder of the maintenance leader lock) periodically:
+
+1. expires threads whose latest checkpoint is older than the idle TTL,
+   except threads still paused on a pending approval,
+2. keeps only the newest `keep_per_thread` checkpoints of every thread,
+3. deletes pending writes whose checkpoint no longer exists,
+4. returns the freed pages to the filesystem with incremental VACUUM.
+
+Each thread is cleaned in its own short transaction so chat turns are never
+blocked for long. Stats of the last run and running totals are stored in
+the database itself, so any worker can report them.
+
+New checkpoint files are created in incremental auto-vacuum mode. Switching
+an existing file needs one full VACUUM, which holds the write lock for as
+long as it takes to rewrite the file, so it is never done by the server.
+Stop the server and run it once:
+
+    python -m database.checkpoint_maintenance enable-incremental-vacuum
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Set
+
+import config
+from database.checkpointer import open_connection
+from utils.leader_lock import LeaderLock
+
+CREATE_STATS_SQL = """
+CREATE TABLE IF NOT EXISTS checkpoint_maintenance_stats (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# 100-ns intervals between the UUID epoch (1582-10-15) and the Unix epoch.
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+COUNTED_STATS = (
+    "runs",
+    "threads_expired",
+    "checkpoints_deleted",
+    "writes_deleted",
+    "bytes_reclaimed",
+)
+
+
+def checkpoint_time(checkpoint_id: str) -> Optional[float]:
+    """Unix time encoded in a checkpoint id (LangGraph uses uuid6 ids)."""
+    try:
+        value = uuid.UUID(checkpoint_id)
+    except (TypeError, ValueError):
+        return None
+    if value.version != 6:
+        return None
+    timestamp = (
+        (value.time_low << 28) | (value.time_mid << 12) | (value.time_hi_version & 0x0FFF)
+    )
+    return (timestamp - _UUID_EPOCH_OFFSET) / 10_000_000
+
+
+class CheckpointMaintenance:
+    def __init__(
+        self,
+        db_path: str,
+        keep_per_thread: int,
+        idle_ttl_hours: float,
+        interval_seconds: float,
+        vacuum_pages: int,
+        protected_threads: Optional[Callable[[], Set[str]]] = None,
+    ):
+        self.db_path = db_path
+        self.keep_per_thread = max(1, keep_per_thread)
+        self.idle_ttl_hours = idle_ttl_hours
+        self.interval_seconds = interval_seconds
+        self.vacuum_pages = max(1, vacuum_pages)
+        self.protected_threads = protected_threads
+        self._leader = LeaderLock(f"{db_path}.maintenance.lock")
+        self._lock = threading.Lock()
+        self._started = False
+        self._warned_full_vacuum = False
+
+    def start(self):
+        """
+        Starts the maintenance loop in this process. Call it after forking;
+        it waits until this process becomes the maintenance leader.
+        """
+        if self.interval_seconds <= 0:
+            return
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(
+            target=self._maintenance_loop, name="checkpoint-maintenance", daemon=True
+        ).start()
+
+    def _maintenance_loop(self):
+        while not self._leader.try_acquire():
+            time.sleep(self.interval_seconds)
+        print(f"✅ [SUCCESS] Process {os.getpid()} is running checkpoint maintenance")
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"❌ [ERROR] Checkpoint maintenance failed: {e}")
+            time.sleep(self.interval_seconds)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit, so every statement or explicit BEGIN is its own short
+        # transaction next to the checkpointer's connection.
+        return open_connection(self.db_path, isolation_level=None)
+
+    def _file_bytes(self) -> int:
+        return sum(
+            os.path.getsize(path)
+            for path in (self.db_path, f"{self.db_path}-wal")
+            if os.path.exists(path)
+        )
+
+    def run_once(self) -> Optional[Dict[str, Any]]:
+        """Runs one maintenance pass and returns its stats (None if there is no checkpoint table yet)."""
+        if not os.path.exists(self.db_path):
+            return None
+        started = time.perf_counter()
+        bytes_before = self._file_bytes()
+        stats = {name: 0 for name in COUNTED_STATS if name != "runs"}
+        stats["started_at"] = datetime.now(timezone.utc).isoformat()
+
+        conn = self._connect()
+        try:
+            tables = {
+                row[0]
+                for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+            }
+            if "checkpoints" not in tables or "writes" not in tables:
+                return None
+            conn.executescript(CREATE_STATS_SQL)
+            if self.idle_ttl_hours > 0:
+                self._expire_idle_threads(conn, stats)
+            self._trim_threads(conn, stats)
+            stats["writes_deleted"] += conn.execute(
+                "DELETE FROM writes WHERE NOT EXISTS ("
+                "SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id "
+                "AND c.checkpoint_ns = writes.checkpoint_ns "
+                "AND c.checkpoint_id = writes.checkpoint_id)"
+            ).rowcount
+            if self._incremental_vacuum_enabled(conn):
+                self._incremental_vacuum(conn)
+            elif not self._warned_full_vacuum:
+                self._warned_full_vacuum = True
+                print(
+                    "⚠️ [WARNING] The checkpoints database is not in incremental auto-vacuum "
+                    "mode, so freed pages are reused but the file does not shrink. Stop the "
+                    "server and run: python -m database.checkpoint_maintenance enable-incremental-vacuum"
+                )
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+
+            stats["bytes_reclaimed"] = max(bytes_before - self._file_bytes(), 0)
+            stats["file_bytes"] = self._file_bytes()
+            stats["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            self._save_stats(conn, stats)
+        finally:
+            conn.close()
+
+        print(
+            f"✅ [SUCCESS] Checkpoint maintenance: {stats['threads_expired']} threads expired, "
+            f"{stats['checkpoints_deleted']} checkpoints and {stats['writes_deleted']} writes deleted, "
+            f"{stats['bytes_reclaimed']} bytes reclaimed in {stats['duration_ms']} ms"
+        )
+        return stats
+
+    @staticmethod
+    def _incremental_vacuum_enabled(conn: sqlite3.Connection) -> bool:
+        return conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+    def enable_incremental_vacuum(self) -> bool:
+        """
+        Switches the file to incremental auto-vacuum with one full VACUUM.
+        Offline step: the VACUUM holds the write lock until the whole file is
+        rewritten. Returns False if the file was already in that mode.
+        """
+        conn = self._connect()
+        try:
+            if self._incremental_vacuum_enabled(conn):
+                return False
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+            return True
+        finally:
+            conn.close()
+
+    def _expire_idle_threads(self, conn: sqlite3.Connection, stats: Dict[str, Any]):
+        cutoff = time.time() - self.idle_ttl_hours * 3600
+        protected = self.protected_threads() if self.protected_threads else set()
+        latest = conn.execute(
+            "SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id"
+        ).fetchall()
+        for thread_id, checkpoint_id in latest:
+            if thread_id in protected:
+                continue
+            created = checkpoint_time(checkpoint_id)
+            if created is None or created >= cutoff:
+                continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stats["writes_deleted"] += conn.execute(
+                    "DELETE FROM writes WHERE thread_id = ?", (thread_id,)
+                ).rowcount
+                stats["checkpoints_deleted"] += conn.execute(
+                    "DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,)
+                ).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            stats["threads_expired"] += 1
+
+    def _trim_threads(self, conn: sqlite3.Connection, stats: Dict[str, Any]):
+        threads = conn.execute(
+            "SELECT thread_id, checkpoint_ns FROM checkpoints "
+            "GROUP BY thread_id, checkpoint_ns HAVING COUNT(*) > ?",
+            (self.keep_per_thread,),
+        ).fetchall()
+        for thread_id, checkpoint_ns in threads:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-read inside the transaction: a turn may have added checkpoints.
+                row = conn.execute(
+                    "SELECT checkpoint_id FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                    (thread_id, checkpoint_ns, self.keep_per_thread - 1),
+                ).fetchone()
+                if row is not None:
+                    params = (thread_id, checkpoint_ns, row[0])
+                    stats["writes_deleted"] += conn.execute(
+                        "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+                        "AND checkpoint_id < ?",
+                        params,
+                    ).rowcount
+                    stats["checkpoints_deleted"] += conn.execute(
+                        "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                        "AND checkpoint_id < ?",
+                        params,
+                    ).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _incremental_vacuum(self, conn: sqlite3.Connection):
+        # Free pages in small steps so no single step holds the write lock long.
+        while conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            # The pragma frees pages as its rows are stepped through.
+            conn.execute(f"PRAGMA incremental_vacuum({int(self.vacuum_pages)})").fetchall()
+
+    def _save_stats(self, conn: sqlite3.Connection, stats: Dict[str, Any]):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT value FROM checkpoint_maintenance_stats WHERE name = 'totals'"
+            ).fetchone()
+            totals = json.loads(row[0]) if row else {name: 0 for name in COUNTED_STATS}
+            totals["runs"] = totals.get("runs", 0) + 1
+            for name in COUNTED_STATS:
+                if name != "runs":
+                    totals[name] = totals.get(name, 0) + stats[name]
+            for name, value in (("last_run", stats), ("totals", totals)):
+                conn.execute(
+                    "INSERT INTO checkpoint_maintenance_stats (name, value) VALUES (?, ?) "
+                    "ON CONFLICT (name) DO UPDATE SET value = excluded.value",
+                    (name, json.dumps(value)),
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def report(self) -> Dict[str, Any]:
+        """Settings, the last run's stats and running totals."""
+        report = {
+            "enabled": self.interval_seconds > 0,
+            "keep_per_thread": self.keep_per_thread,
+            "idle_ttl_hours": self.idle_ttl_hours,
+            "interval_seconds": self.interval_seconds,
+            "incremental_vacuum": None,
+            "file_bytes": self._file_bytes() if os.path.exists(self.db_path) else 0,
+            "last_run": None,
+            "totals": None,
+        }
+        if not os.path.exists(self.db_path):
+            return report
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            report["incremental_vacuum"] = self._incremental_vacuum_enabled(conn)
+            rows = conn.execute(
+                "SELECT name, value FROM checkpoint_maintenance_stats"
+            ).fetchall()
+        except sqlite3.OperationalError:
+            # No maintenance run has created the stats table yet.
+            rows = []
+        finally:
+            conn.close()
+        for name, value in rows:
+            report[name] = json.loads(value)
+        return report
+
+
+def _pending_approval_threads() -> Set[str]:
+    from database.approvals_index import approvals_index
+
+    return approvals_index.pending_thread_ids()
+
+
+checkpoint_maintenance = CheckpointMaintenance(
+    config.CHECKPOINTS_PATH,
+    keep_per_thread=config.CHECKPOINT_KEEP_PER_THREAD,
+    idle_ttl_hours=config.CHECKPOINT_IDLE_TTL_HOURS,
+    # Retention applies to the SQLite checkpointer only.
+    interval_seconds=(
+        config.CHECKPOINT_MAINTENANCE_INTERVAL_SECONDS
+        if config.CHECKPOINT_BACKEND == "sqlite"
+        else 0
+    ),
+    vacuum_pages=config.CHECKPOINT_VACUUM_PAGES,
+    protected_threads=_pending_approval_threads,
+)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Checkpoint database maintenance.")
+    parser.add_argument(
+        "command",
+        choices=["enable-incremental-vacuum", "run"],
+        help="enable-incremental-vacuum: one-time full VACUUM (stop the server first); "
+        "run: one maintenance pass",
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        checkpoint_maintenance.run_once()
+        return 0
+    if not os.path.exists(config.CHECKPOINTS_PATH):
+        print(f"❌ [ERROR] {config.CHECKPOINTS_PATH} does not exist.")
+        return 1
+    # A running server's maintenance leader holds this lock.
+    if not checkpoint_maintenance._leader.try_acquire():
+        print("❌ [ERROR] A server process is running checkpoint maintenance; stop the server first.")
+        return 1
+    print(f"🔄 [INFO] Running a full VACUUM on {config.CHECKPOINTS_PATH}...")
+    if checkpoint_maintenance.enable_incremental_vacuum():
+        print("✅ [SUCCESS] Incremental auto-vacuum enabled.")
+    else:
+        print("✅ [SUCCESS] Incremental auto-vacuum was already enabled.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,414 @@
+# database/checkpoint_serde.py
+"""
+Compact serialization for checkpoint blobs.
+
+Every super-step writes the whole `AgentState` (the full `history` and the
+approval lists) through the checkpointer's serializer, so disk use and
+`get_state` latency both grow with the size of that blob. LangGraph's
+default serializer already encodes it as msgpack; `CompressedSerializer`
+wraps it and compresses the msgpack bytes with zstd, using a dictionary
+trained on our own checkpoints. The dictionary holds the keys and phrases
+every state repeats ("input", "output", "is_level2_session", the approval
+fields, the agents' stock answers), so even a short conversation compresses
+well.
+
+Compressed blobs are stored with the type "<base type>+zstd"; the id of the
+dictionary they need is in the zstd frame header. Dictionaries are kept as
+`<dict_id>.zdict` files in `CHECKPOINT_ZSTD_DICT_DIR` and never deleted, so
+older blobs stay readable after retraining. Blobs written before
+compression was enabled (plain "msgpack", "json", ...) are read unchanged.
+
+Run as a script to train a dictionary from the stored checkpoints and to
+compare bytes per checkpoint and encode/decode time:
+
+    python -m database.checkpoint_serde train
+    python -m database.checkpoint_serde benchmark
+    python -m database.checkpoint_serde benchmark --synthetic 300
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import zstandard
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+import config
+from utils.helpers import MAX_HISTORY_TURNS
+
+TYPE_SUFFIX = "+zstd"
+ACTIVE_DICT_FILE = "active"
+# Types the base serializer stores as-is.
+RAW_TYPES = ("null", "bytes", "bytearray")
+
+
+class CompressedSerializer:
+    """Checkpoint serializer: the default msgpack encoding, zstd-compressed."""
+
+    def __init__(
+        self,
+        base: Optional[Any] = None,
+        level: int = 3,
+        min_bytes: int = 128,
+        dict_dir: Optional[str] = None,
+        compress: bool = True,
+        dictionary: Optional[zstandard.ZstdCompressionDict] = None,
+    ):
+        self.base = base or JsonPlusSerializer()
+        self.level = level
+        self.min_bytes = min_bytes
+        self.dict_dir = dict_dir
+        self.compress = compress
+        self._dictionaries: Dict[int, zstandard.ZstdCompressionDict] = {}
+        self._dictionaries_lock = threading.Lock()
+        # zstd contexts must not be shared between threads.
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "encoded": 0,
+            "decoded": 0,
+            "raw_bytes": 0,
+            "stored_bytes": 0,
+            "encode_ms": 0.0,
+            "decode_ms": 0.0,
+        }
+        if dictionary is not None:
+            self._dictionaries[dictionary.dict_id()] = dictionary
+        self.active_dict = dictionary or self._load_active_dictionary()
+
+    # --- Dictionaries ---
+
+    def _dict_path(self, dict_id: int) -> str:
+        return os.path.join(self.dict_dir, f"{dict_id}.zdict")
+
+    def _load_active_dictionary(self) -> Optional[zstandard.ZstdCompressionDict]:
+        if not self.dict_dir:
+            return None
+        try:
+            with open(os.path.join(self.dict_dir, ACTIVE_DICT_FILE), encoding="utf-8") as f:
+                dict_id = int(f.read().strip())
+        except (OSError, ValueError):
+            return None
+        return self._dictionary(dict_id)
+
+    def _dictionary(self, dict_id: int) -> zstandard.ZstdCompressionDict:
+        dictionary = self._dictionaries.get(dict_id)
+        if dictionary is not None:
+            return dictionary
+        with self._dictionaries_lock:
+            if dict_id not in self._dictionaries:
+                if not self.dict_dir:
+                    raise ValueError(f"Checkpoint blob needs zstd dictionary {dict_id}")
+                try:
+                    with open(self._dict_path(dict_id), "rb") as f:
+                        data = f.read()
+                except OSError as e:
+                    raise ValueError(
+                        f"Checkpoint blob needs zstd dictionary {dict_id}, "
+                        f"which is missing from {self.dict_dir}"
+                    ) from e
+                self._dictionaries[dict_id] = zstandard.ZstdCompressionDict(data)
+            return self._dictionaries[dict_id]
+
+    def _compressor(self) -> zstandard.ZstdCompressor:
+        compressor = getattr(self._local, "compressor", None)
+        if compressor is None:
+            compressor = zstandard.ZstdCompressor(
+                level=self.level, dict_data=self.active_dict
+            )
+            self._local.compressor = compressor
+        return compressor
+
+    def _decompressor(self, dict_id: int) -> zstandard.ZstdDecompressor:
+        decompressors = getattr(self._local, "decompressors", None)
+        if decompressors is None:
+            decompressors = self._local.decompressors = {}
+        decompressor = decompressors.get(dict_id)
+        if decompressor is None:
+            dictionary = self._dictionary(dict_id) if dict_id else None
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary)
+            decompressors[dict_id] = decompressor
+        return decompressor
+
+    # --- SerializerProtocol ---
+
+    def dumps(self, obj: Any) -> bytes:
+        return self.base.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self.base.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        started = time.perf_counter()
+        type_, data = self.base.dumps_typed(obj)
+        stored = data
+        if self.compress and type_ not in RAW_TYPES and len(data) >= self.min_bytes:
+            stored = self._compressor().compress(data)
+            type_ = type_ + TYPE_SUFFIX
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._stats_lock:
+            self._stats["encoded"] += 1
+            self._stats["raw_bytes"] += len(data)
+            self._stats["stored_bytes"] += len(stored)
+            self._stats["encode_ms"] += elapsed_ms
+        return type_, stored
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        started = time.perf_counter()
+        type_, payload = data
+        if type_.endswith(TYPE_SUFFIX):
+            dict_id = zstandard.get_frame_parameters(payload).dict_id
+            payload = self._decompressor(dict_id).decompress(payload)
+            type_ = type_[: -len(TYPE_SUFFIX)]
+        obj = self.base.loads_typed((type_, payload))
+        with self._stats_lock:
+            self._stats["decoded"] += 1
+            self._stats["decode_ms"] += (time.perf_counter() - started) * 1000
+        return obj
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        return {
+            "compression": "zstd" if self.compress else "none",
+            "dictionary_id": self.active_dict.dict_id() if self.active_dict else None,
+            "blobs_encoded": stats["encoded"],
+            "blobs_decoded": stats["decoded"],
+            "compression_ratio": round(stats["raw_bytes"] / stats["stored_bytes"], 2)
+            if stats["stored_bytes"]
+            else None,
+            "encode_ms_avg": round(stats["encode_ms"] / stats["encoded"], 3)
+            if stats["encoded"]
+            else None,
+            "decode_ms_avg": round(stats["decode_ms"] / stats["decoded"], 3)
+            if stats["decoded"]
+            else None,
+        }
+
+
+def create_serializer() -> CompressedSerializer:
+    """The serializer used by the chat runtime's checkpointer."""
+    if config.CHECKPOINT_COMPRESSION not in ("zstd", "none"):
+        raise ValueError(
+            f"Unknown CHECKPOINT_COMPRESSION '{config.CHECKPOINT_COMPRESSION}' (use zstd or none)"
+        )
+    return CompressedSerializer(
+        level=config.CHECKPOINT_ZSTD_LEVEL,
+        min_bytes=config.CHECKPOINT_ZSTD_MIN_BYTES,
+        dict_dir=config.CHECKPOINT_ZSTD_DICT_DIR,
+        compress=config.CHECKPOINT_COMPRESSION == "zstd",
+    )
+
+
+def train_dictionary(samples: List[bytes], dict_dir: str, dict_size: int) -> int:
+    """
+    Trains a zstd dictionary on msgpack-encoded checkpoint blobs, saves it
+    and makes it the active one. Returns its id.
+    """
+    dictionary = zstandard.train_dictionary(dict_size, samples)
+    dict_id = dictionary.dict_id()
+    os.makedirs(dict_dir, exist_ok=True)
+    with open(os.path.join(dict_dir, f"{dict_id}.zdict"), "wb") as f:
+        f.write(dictionary.as_bytes())
+    active_path = os.path.join(dict_dir, ACTIVE_DICT_FILE)
+    with open(active_path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(str(dict_id))
+    os.replace(active_path + ".tmp", active_path)
+    return dict_id
+
+
+# --- Training and benchmark ---
+
+
+def stored_states(limit: int) -> List[Dict[str, Any]]:
+    """The newest `limit` checkpoints in the configured checkpointer."""
+    from database.checkpointer import create_checkpointer
+
+    memory = create_checkpointer()
+    try:
+        return [item.checkpoint for item in memory.list(None, limit=limit)]
+    finally:
+        memory.close()
+
+
+def synthetic_states(count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Checkpoints shaped like ours, from conversations of 1 to 40 turns."""
+    rng = random.Random(seed)
+    questions = [
+        "What does my policy cover for water damage?",
+        "Can you update my phone number to {n}?",
+        "How do I file a claim for my car?",
+        "Why was my premium increased this year?",
+        "I want to talk to a human agent about claim {n}.",
+        "Please change my address to {n} Main Street.",
+    ]
+    answers = [
+        "Your policy covers sudden and accidental water damage up to the limit in your schedule.",
+        "I have sent your update request to an administrator for approval.",
+        "You can file a claim from the Claims page or by replying with the incident details.",
+        "Premiums are reviewed every year based on claims history and regional risk.",
+        "I've escalated your request. A Level 2 specialist will review claim {n}.",
+    ]
+    states = []
+    for index in range(count):
+        user_id = f"USR{rng.randint(1000, 9999)}"
+        level2 = rng.random() < 0.3
+        history = [
+            {
+                "input": rng.choice(questions).format(n=rng.randint(100, 99999)),
+                "output": rng.choice(answers).format(n=rng.randint(100, 99999)),
+                "is_level2_session": level2 and turn > 0,
+            }
+            for turn in range(rng.randint(1, 40))
+        ]
+        history_seq = len(history)
+        # The state carries only the recent window (see database/turn_log.py).
+        history = history[-MAX_HISTORY_TURNS:]
+        pending = [
+            {
+                "thread_id": user_id,
+                "user_id": user_id,
+                "details": {"phone": str(rng.randint(10**9, 10**10 - 1))},
+                "timestamp": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            }
+            for _ in range(rng.randint(0, 2))
+        ]
+        states.append(
+            {
+                "v": 4,
+                "id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                "ts": "2026-01-01T00:00:00+00:00",
+                "channel_values": {
+                    "query": history[-1]["input"],
+                    "user_id": user_id,
+                    "language": rng.choice(["en", "hi", "es"]),
+                    "history": history,
+                    "history_seq": history_seq,
+                    "escalation_summary": "Customer asked to change contact details." if level2 else "",
+                    "new_responses": [history[-1]["output"]],
+                    "is_level2_session": level2,
+                    "routing_decision": "END",
+                    "pending_approvals": pending,
+                    "approved_approvals": [],
+                    "declined_approvals": [],
+                    "human_approval_status": "pending" if pending else None,
+                    "human_approval_response": None,
+                },
+                "channel_versions": {"history": index, "query": index},
+                "versions_seen": {"l1_agent": {"query": index}},
+            }
+        )
+    return states
+
+
+def training_samples(states: Iterable[Dict[str, Any]]) -> List[bytes]:
+    """
+    The blobs the checkpointers write: SQLite stores each checkpoint as one
+    blob, PostgreSQL stores every channel value separately.
+    """
+    base = JsonPlusSerializer()
+    samples = []
+    for state in states:
+        samples.append(base.dumps_typed(state)[1])
+        for value in state.get("channel_values", {}).values():
+            type_, data = base.dumps_typed(value)
+            if type_ not in RAW_TYPES and len(data) >= config.CHECKPOINT_ZSTD_MIN_BYTES:
+                samples.append(data)
+    return samples
+
+
+def benchmark(states: List[Dict[str, Any]], dict_size: int, rounds: int) -> List[Dict[str, Any]]:
+    """
+    Bytes per checkpoint and encode/decode time of the default serializer,
+    plain zstd and zstd with a dictionary trained on the other half of the
+    states (so the dictionary never saw the blobs it is measured on).
+    """
+    train_states, test_states = states[::2], states[1::2]
+    dictionary = zstandard.train_dictionary(dict_size, training_samples(train_states))
+    candidates = [
+        ("msgpack (default)", CompressedSerializer(compress=False)),
+        ("msgpack + zstd", CompressedSerializer(level=config.CHECKPOINT_ZSTD_LEVEL)),
+        (
+            "msgpack + zstd + dictionary",
+            CompressedSerializer(level=config.CHECKPOINT_ZSTD_LEVEL, dictionary=dictionary),
+        ),
+    ]
+    results = []
+    for name, serde in candidates:
+        encoded = [serde.dumps_typed(state) for state in test_states]
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for state in test_states:
+                serde.dumps_typed(state)
+        encode_s = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for blob in encoded:
+                serde.loads_typed(blob)
+        decode_s = time.perf_counter() - started
+        operations = rounds * len(test_states)
+        results.append(
+            {
+                "serializer": name,
+                "bytes_per_checkpoint": round(
+                    sum(len(blob) for _, blob in encoded) / len(encoded)
+                ),
+                "encode_us": round(encode_s / operations * 1_000_000, 1),
+                "decode_us": round(decode_s / operations * 1_000_000, 1),
+            }
+        )
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["train", "benchmark"])
+    parser.add_argument(
+        "--limit", type=int, default=2000, help="Newest checkpoints to sample"
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="Use this many generated states instead of the stored checkpoints",
+    )
+    parser.add_argument(
+        "--dict-size", type=int, default=64 * 1024, help="Dictionary size in bytes"
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Benchmark repetitions")
+    args = parser.parse_args(argv)
+
+    states = synthetic_states(args.synthetic) if args.synthetic else stored_states(args.limit)
+    if len(states) < 20:
+        print(f"❌ [ERROR] Only {len(states)} checkpoints found; use --synthetic or wait for more traffic.")
+        return 1
+    print(f"🔄 [INFO] Using {len(states)} checkpoints...")
+
+    if args.command == "train":
+        dict_id = train_dictionary(
+            training_samples(states), config.CHECKPOINT_ZSTD_DICT_DIR, args.dict_size
+        )
+        print(
+            f"✅ [SUCCESS] Dictionary {dict_id} saved to {config.CHECKPOINT_ZSTD_DICT_DIR} "
+            "and activated; restart the workers to use it."
+        )
+        return 0
+
+    results = benchmark(states, args.dict_size, args.rounds)
+    baseline = results[0]["bytes_per_checkpoint"]
+    print(f"{'serializer':<30} {'bytes/ckpt':>11} {'ratio':>7} {'encode µs':>10} {'decode µs':>10}")
+    for row in results:
+        print(
+            f"{row['serializer']:<30} {row['bytes_per_checkpoint']:>11} "
+            f"{baseline / row['bytes_per_checkpoint']:>6.1f}x "
+            f"{row['encode_us']:>10} {row['decode_us']:>10}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
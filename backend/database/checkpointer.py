@@ -0,0 +1,286 @@
+# database/checkpointer.py
+"""
+Checkpointer for the LangGraph runtime.
+
+`SqliteSaver` on its own shares one connection between all Flask threads and
+serializes every read and write behind a Python lock, so an approvals or
+status poll waits for a chat turn's checkpoint write and vice versa.
+`create_checkpointer` instead returns a saver that:
+
+- runs the database in WAL mode with tuned pragmas (synchronous, busy
+  timeout, memory-mapped reads),
+- checks a connection out of a bounded per-process pool for each
+  operation, so readers never wait for writers and concurrent writers
+  queue inside SQLite rather than behind a Python lock. Connections are
+  reused across threads, including LangGraph's short-lived background
+  threads that write checkpoints with async durability,
+- takes the write lock up front (`BEGIN IMMEDIATE`) for writes and records
+  how long each write waited for it.
+
+With `CHECKPOINT_BACKEND=postgres` the PostgreSQL saver from
+`database/pg_checkpointer.py` is used instead.
+"""
+import functools
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import config
+
+
+# Newest checkpoint of a thread and its pending write count; both lookups
+# only read the primary key indexes.
+HEAD_SQL = """
+SELECT c.checkpoint_id, (
+    SELECT COUNT(*) FROM {writes} w
+    WHERE w.thread_id = c.thread_id
+      AND w.checkpoint_ns = c.checkpoint_ns
+      AND w.checkpoint_id = c.checkpoint_id
+) AS pending_writes
+FROM checkpoints c
+WHERE c.thread_id = ? AND c.checkpoint_ns = ?
+ORDER BY c.checkpoint_id DESC
+LIMIT 1
+"""
+
+
+def open_connection(db_path: str, **kwargs: Any) -> sqlite3.Connection:
+    """Opens a connection to the checkpoints database with the tuned pragmas."""
+    conn = sqlite3.connect(db_path, check_same_thread=False, **kwargs)
+    # Takes effect only on a new, empty file; existing files are switched
+    # offline (see database/checkpoint_maintenance.py).
+    conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    conn.execute("PRAGMA journal_mode=WAL")
+    # NORMAL is durable in WAL mode except for the last commits on power loss.
+    conn.execute(f"PRAGMA synchronous={config.CHECKPOINT_SQLITE_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA busy_timeout={int(config.CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA mmap_size={int(config.CHECKPOINT_SQLITE_MMAP_BYTES)}")
+    return conn
+
+
+class LockWaitStats:
+    """Time writes spent waiting for the database write lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.reads = 0
+            self.writes = 0
+            self.total_wait_ms = 0.0
+            self.max_wait_ms = 0.0
+            self.slow_waits = 0
+
+    def record_read(self):
+        with self._lock:
+            self.reads += 1
+
+    def record_write(self, wait_ms: float):
+        with self._lock:
+            self.writes += 1
+            self.total_wait_ms += wait_ms
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            if wait_ms >= config.CHECKPOINT_SLOW_LOCK_WAIT_MS:
+                self.slow_waits += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "reads": self.reads,
+                "writes": self.writes,
+                "lock_wait_ms_total": round(self.total_wait_ms, 1),
+                "lock_wait_ms_avg": round(self.total_wait_ms / self.writes, 2)
+                if self.writes
+                else None,
+                "lock_wait_ms_max": round(self.max_wait_ms, 1),
+                "slow_lock_waits": self.slow_waits,
+            }
+
+
+class PooledSqliteSaver(SqliteSaver):
+    """SqliteSaver on a bounded pool of connections and no process-wide lock."""
+
+    def __init__(self, db_path: str, pool_size: int, serde: Optional[Any] = None):
+        self.db_path = db_path
+        self.pool_size = max(1, pool_size)
+        # Most recently returned first, so a quiet worker keeps few connections warm.
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._pool_waits = 0
+        self._pool_wait_ms = 0.0
+        # The connection a thread has checked out, for nested cursor() calls.
+        self._local = threading.local()
+        self.lock_waits = LockWaitStats()
+        super().__init__(conn=None, serde=serde)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # SqliteSaver uses self.conn only inside cursor() (setup, list).
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            raise RuntimeError("Checkpoint connections are only available inside cursor()")
+        return conn
+
+    @conn.setter
+    def conn(self, value: Optional[sqlite3.Connection]):
+        # SqliteSaver.__init__ assigns the connection it was given; the
+        # pool hands them out instead.
+        pass
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._pool_lock:
+            if len(self._opened) < self.pool_size:
+                conn = open_connection(self.db_path)
+                self._opened.append(conn)
+                return conn
+        started = time.perf_counter()
+        try:
+            # As long as SQLite itself would wait for a lock.
+            conn = self._idle.get(timeout=config.CHECKPOINT_SQLITE_BUSY_TIMEOUT_MS / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(
+                f"No checkpoint connection free (pool of {self.pool_size})"
+            ) from None
+        with self._pool_lock:
+            self._pool_waits += 1
+            self._pool_wait_ms += (time.perf_counter() - started) * 1000
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """The thread's checked-out connection, reused by nested calls."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            try:
+                yield conn
+            finally:
+                self._local.depth -= 1
+            return
+        conn = self._checkout()
+        self._local.conn, self._local.depth = conn, 1
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put(conn)
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        with self._pool_lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened = []
+            self._idle = queue.LifoQueue()
+        self._local = threading.local()
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        with self._connection() as conn:
+            self.setup()
+            cur = conn.cursor()
+            try:
+                if transaction and not conn.in_transaction:
+                    started = time.perf_counter()
+                    cur.execute("BEGIN IMMEDIATE")
+                    self.lock_waits.record_write((time.perf_counter() - started) * 1000)
+                else:
+                    self.lock_waits.record_read()
+                yield cur
+            except Exception:
+                if transaction:
+                    conn.rollback()
+                raise
+            finally:
+                if transaction and conn.in_transaction:
+                    conn.commit()
+                cur.close()
+
+    def head(self, thread_id: str, checkpoint_ns: str = "") -> Optional[Tuple[str, int]]:
+        """(newest checkpoint id, its pending write count) of a thread, or None."""
+        with self.cursor(transaction=False) as cur:
+            row = cur.execute(HEAD_SQL.format(writes="writes"), (thread_id, checkpoint_ns)).fetchone()
+        return (row[0], row[1]) if row else None
+
+    def thread_ids(self) -> List[str]:
+        with self.cursor(transaction=False) as cur:
+            return [
+                row[0] for row in cur.execute("SELECT DISTINCT thread_id FROM checkpoints")
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._pool_lock:
+            pool = {
+                "pool_size": len(self._opened),
+                "pool_max_size": self.pool_size,
+                "pool_available": self._idle.qsize(),
+                "pool_waits": self._pool_waits,
+                "pool_wait_ms_total": round(self._pool_wait_ms, 1),
+            }
+        return {
+            "backend": "sqlite",
+            **pool,
+            **self.lock_waits.snapshot(),
+            "serializer": self.serde.stats() if hasattr(self.serde, "stats") else None,
+        }
+
+
+def create_checkpointer() -> Any:
+    """
+    The checkpointer used by the chat runtime, one per process:
+    CHECKPOINT_BACKEND "sqlite" (CHECKPOINTS_PATH) or "postgres" (DB_CONFIG).
+    Both also provide close(), head(), thread_ids() and stats(), and store
+    their blobs through the compressed serializer from
+    `database/checkpoint_serde.py`. Unless disabled, the saver is wrapped in
+    the in-memory cache from `database/checkpoint_cache.py`.
+    """
+    from database.checkpoint_cache import CachedCheckpointer
+    from database.checkpoint_serde import create_serializer
+
+    if config.CHECKPOINT_BACKEND == "postgres":
+        from database.pg_checkpointer import create_postgres_checkpointer
+
+        saver = create_postgres_checkpointer(create_serializer())
+    elif config.CHECKPOINT_BACKEND == "sqlite":
+        saver = PooledSqliteSaver(
+            config.CHECKPOINTS_PATH,
+            pool_size=config.CHECKPOINT_SQLITE_POOL_SIZE,
+            serde=create_serializer(),
+        )
+    else:
+        raise ValueError(
+            f"Unknown CHECKPOINT_BACKEND '{config.CHECKPOINT_BACKEND}' (use sqlite or postgres)"
+        )
+    if config.CHECKPOINT_CACHE_MAX_ENTRIES <= 0:
+        return saver
+    # Set by router.py for its workers.
+    socket_dir = os.getenv("ROUTER_SOCKET_DIR")
+    if socket_dir:
+        from utils.worker_router import read_ring_version
+
+        ring_version = functools.partial(read_ring_version, socket_dir)
+    else:
+        ring_version = None
+    return CachedCheckpointer(
+        saver,
+        max_entries=config.CHECKPOINT_CACHE_MAX_ENTRIES,
+        max_bytes=config.CHECKPOINT_CACHE_MAX_BYTES,
+        idle_seconds=config.CHECKPOINT_CACHE_IDLE_SECONDS,
+        validate=config.CHECKPOINT_CACHE_VALIDATE,
+        ring_version=ring_version,
+    )
@@ -5,20 +5,44 @@ from psycopg2.pool import SimpleConnectionPool
 from psycopg2.extras import RealDictCursor
 import config
 from config import USE_SUPABASE, SUPABASE_CLIENT
+from utils.process_resources import after_fork, before_fork
 
 # ========== SUPABASE INTEGRATION START ==========
 # Initialize the connection pool for local PostgreSQL
-if not USE_SUPABASE:
+def _create_pool():
+    if USE_SUPABASE:
+        return None
     try:
-        DB_POOL = SimpleConnectionPool(minconn=1, maxconn=10, **DB_CONFIG)
+        pool = SimpleConnectionPool(
+            minconn=config.DB_POOL_MIN_CONNECTIONS,
+            maxconn=config.DB_POOL_MAX_CONNECTIONS,
+            **config.DB_CONFIG,
+        )
         print("Database pool initialized successfully.")
+        return pool
     except Exception as e:
         print(f"Error initializing database pool: {e}")
-        DB_POOL = None
-else:
+        return None
+
+
+DB_POOL = _create_pool()
+
+
+@before_fork("postgres pool")
+def _close_pool():
+    # Connections must not be shared by forked workers.
+    global DB_POOL
+    if DB_POOL:
+        DB_POOL.closeall()
     DB_POOL = None
 
 
+@after_fork("postgres pool")
+def _reopen_pool():
+    global DB_POOL
+    DB_POOL = _create_pool()
+
+
 def get_db_connection():
     """Gets a connection from the pool (for local PostgreSQL only)."""
     if USE_SUPABASE:
@@ -0,0 +1,50 @@
+# database/history_cache.py
+"""
+In-process cache of decoded chat histories.
+
+`update_user_history` writes through this cache, so a client polling for new
+turns is served by slicing the cached list instead of re-reading and
+re-decoding the whole history blob. Each entry remembers the history change
+counter it was loaded at; a write from another worker process bumps the
+counter and invalidates it. Entries are also re-read after `ttl_seconds` to
+pick up writes made outside the app.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+
+class HistoryCache:
+    def __init__(self, max_users: int, ttl_seconds: float):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, user_id: str, version: str) -> Optional[List[Any]]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            loaded_at, entry_version, history = entry
+            if (
+                entry_version != version
+                or time.monotonic() - loaded_at > self.ttl_seconds
+            ):
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return history
+
+    def put(self, user_id: str, history: List[Any], version: str):
+        # Store a private copy; callers keep mutating their own lists.
+        with self._lock:
+            self._entries[user_id] = (time.monotonic(), version, list(history))
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(user_id, None)
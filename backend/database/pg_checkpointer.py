@@ -0,0 +1,112 @@
+# database/pg_checkpointer.py
+"""
+PostgreSQL checkpointer for multi-replica deployments.
+
+With `CHECKPOINT_BACKEND=postgres` conversation state is stored in the same
+PostgreSQL database as the application data (`DB_CONFIG`), so every replica
+sees every thread: sticky L2 routing in `dispatcher` and paused HITL threads
+work whichever replica serves the next turn or the admin's decision.
+
+Each worker process talks to the database through its own psycopg
+connection pool. The schema (including the thread_id indexes used for
+thread lookups) is created and migrated by `init_db()`.
+
+Requires `langgraph-checkpoint-postgres` and `psycopg[binary,pool]`.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+from langgraph.checkpoint.postgres import PostgresSaver
+from psycopg import Connection
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row
+from psycopg_pool import ConnectionPool
+
+import config
+from database.checkpointer import HEAD_SQL
+
+# Settings the saver needs on every connection: it manages transactions
+# itself, and prepared statements do not survive pgbouncer-style poolers.
+CONNECTION_KWARGS = {"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row}
+
+
+def postgres_conninfo() -> str:
+    """libpq connection string for DB_CONFIG (psycopg2 style keys)."""
+    params = {
+        ("dbname" if key == "database" else key): value
+        for key, value in config.DB_CONFIG.items()
+        if value
+    }
+    return make_conninfo(**params)
+
+
+class PooledPostgresSaver(PostgresSaver):
+    """PostgresSaver on a per-process connection pool."""
+
+    def __init__(
+        self,
+        conninfo: str,
+        min_size: int,
+        max_size: int,
+        timeout: float,
+        serde: Optional[Any] = None,
+    ):
+        self.pool = ConnectionPool(
+            conninfo,
+            min_size=min_size,
+            max_size=max_size,
+            timeout=timeout,
+            kwargs=CONNECTION_KWARGS,
+            name="langgraph-checkpoints",
+            open=True,
+        )
+        super().__init__(self.pool, serde=serde)
+
+    def close(self):
+        """Closes the pool; used before forking and at shutdown."""
+        self.pool.close()
+
+    def head(self, thread_id: str, checkpoint_ns: str = "") -> Optional[Tuple[str, int]]:
+        """(newest checkpoint id, its pending write count) of a thread, or None."""
+        sql = HEAD_SQL.format(writes="checkpoint_writes").replace("?", "%s")
+        with self.pool.connection() as conn:
+            row = conn.execute(sql, (thread_id, checkpoint_ns)).fetchone()
+        return (row["checkpoint_id"], row["pending_writes"]) if row else None
+
+    def thread_ids(self) -> List[str]:
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT DISTINCT thread_id FROM checkpoints").fetchall()
+        return [row["thread_id"] for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.pool.get_stats()
+        return {
+            "backend": "postgres",
+            "pool_size": stats.get("pool_size"),
+            "pool_available": stats.get("pool_available"),
+            "requests_waiting": stats.get("requests_waiting"),
+            "requests": stats.get("requests_num", 0),
+            "requests_queued": stats.get("requests_queued", 0),
+            "pool_wait_ms_total": stats.get("requests_wait_ms", 0),
+            "connection_errors": stats.get("connections_errors", 0),
+            "serializer": self.serde.stats() if hasattr(self.serde, "stats") else None,
+        }
+
+
+def create_postgres_checkpointer(serde: Optional[Any] = None) -> PooledPostgresSaver:
+    return PooledPostgresSaver(
+        postgres_conninfo(),
+        min_size=config.CHECKPOINT_PG_POOL_MIN_SIZE,
+        max_size=config.CHECKPOINT_PG_POOL_MAX_SIZE,
+        timeout=config.CHECKPOINT_PG_POOL_TIMEOUT,
+        serde=serde,
+    )
+
+
+def migrate_checkpoint_schema():
+    """
+    Creates or migrates the checkpoint tables and their thread_id indexes.
+    Runs on a dedicated autocommit connection: some migrations build
+    indexes CONCURRENTLY, which cannot run inside a transaction.
+    """
+    with Connection.connect(postgres_conninfo(), **CONNECTION_KWARGS) as conn:
+        PostgresSaver(conn).setup()
@@ -4,15 +4,44 @@ import json
 import psycopg2
 import uuid
 from config import DB_CONFIG
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from . import db_utils
+from .history_cache import HistoryCache
+from .turn_log import turn_log
 from psycopg2.extras import RealDictCursor
 from config import USE_SUPABASE, SUPABASE_CLIENT
+from utils.change_counters import change_counters
+from utils.fast_json import loads_history
+import config
+
+history_cache = HistoryCache(
+    config.HISTORY_CACHE_MAX_USERS, config.HISTORY_CACHE_TTL_SECONDS
+)
+
+
+# Indexes for the admin users page: the (name, user_id) keyset order and
+# the case-insensitive name/email prefix filters.
+USERS_INDEXES_SQL = """
+CREATE INDEX IF NOT EXISTS idx_users_name_user_id ON users (name, user_id);
+CREATE INDEX IF NOT EXISTS idx_users_lower_name ON users (lower(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_users_lower_email ON users (lower(email) text_pattern_ops);
+"""
 
 
 # Database initialization
 def init_db():
     """Initialize database tables - works with both Supabase and local PostgreSQL"""
+    if config.CHECKPOINT_BACKEND == "postgres":
+        # LangGraph checkpoint tables live in the same database.
+        from .pg_checkpointer import migrate_checkpoint_schema
+
+        from .state_store import migrate_state_schema
+
+        migrate_checkpoint_schema()
+        # So do the approvals index and the turn log (database/state_store.py).
+        migrate_state_schema()
+        print("✅ [SUCCESS] Checkpoint tables migrated in PostgreSQL")
+
     if USE_SUPABASE:
         # ========== SUPABASE CODE START ==========
         print(
@@ -27,7 +56,8 @@ def init_db():
         """Initialize PostgreSQL database tables"""
         conn = psycopg2.connect(**DB_CONFIG)
         cursor = conn.cursor()
-        # Add any table creation logic here if needed
+        cursor.execute(USERS_INDEXES_SQL)
+        conn.commit()
         cursor.close()
         conn.close()
         # ========== ORIGINAL POSTGRESQL CODE END ==========
@@ -113,38 +143,90 @@ def get_user_data(user_id: str):
         # ========== ORIGINAL POSTGRESQL CODE END ==========
 
 
-def get_all_users():
-    """Fetch all users from the database for admin portal."""
+def _like_prefix(prefix: str) -> str:
+    """LIKE pattern matching values that start with `prefix` literally."""
+    escaped = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"{escaped}%"
+
+
+def _postgrest_quote(value: str) -> str:
+    """Quotes a value for use inside a PostgREST or=(...) filter."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def get_users_page(
+    limit: int,
+    after: Optional[List[str]] = None,
+    name_prefix: Optional[str] = None,
+    email_prefix: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Fetches one page of users for the admin portal, ordered by (name, user_id).
+
+    Args:
+        limit: Maximum number of users to return
+        after: (name, user_id) of the last user on the previous page
+        name_prefix: Only users whose name starts with this (case-insensitive)
+        email_prefix: Only users whose email starts with this (case-insensitive)
+    """
     if USE_SUPABASE:
         # ========== SUPABASE CODE START ==========
         try:
-            result = (
-                SUPABASE_CLIENT.table("users")
-                .select("user_id, name, email, phone, address, location")
-                .order("name")
-                .execute()
+            query = SUPABASE_CLIENT.table("users").select(
+                "user_id, name, email, phone, address, location"
             )
+            if name_prefix:
+                query = query.ilike("name", _like_prefix(name_prefix))
+            if email_prefix:
+                query = query.ilike("email", _like_prefix(email_prefix))
+            if after:
+                name, user_id = (_postgrest_quote(v) for v in after)
+                query = query.or_(
+                    f"name.gt.{name},and(name.eq.{name},user_id.gt.{user_id})"
+                )
+            result = query.order("name").order("user_id").limit(limit).execute()
             return result.data
         except Exception as e:
-            print(f"Error fetching all users: {e}")
+            print(f"Error fetching users page: {e}")
             return []
         # ========== SUPABASE CODE END ==========
     else:
         # ========== ORIGINAL POSTGRESQL CODE START ==========
+        conditions = []
+        params = []
+        # lower(...) LIKE 'prefix%' can use the text_pattern_ops indexes
+        # created by init_db(); ILIKE cannot use a btree index.
+        if name_prefix:
+            conditions.append("lower(name) LIKE %s")
+            params.append(_like_prefix(name_prefix.lower()))
+        if email_prefix:
+            conditions.append("lower(email) LIKE %s")
+            params.append(_like_prefix(email_prefix.lower()))
+        if after:
+            # Row comparison lets the (name, user_id) index from init_db()
+            # seek straight to the start of the page.
+            conditions.append("(name, user_id) > (%s, %s)")
+            params.extend(after)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
         conn = db_utils.get_db_connection()
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 cur.execute(
-                    """
+                    f"""
                     SELECT user_id, name, email, phone, address, location
                     FROM users
-                    ORDER BY name
-                """
+                    {where}
+                    ORDER BY name, user_id
+                    LIMIT %s
+                """,
+                    (*params, limit),
                 )
                 users = cur.fetchall()
                 return users
         except Exception as e:
-            print(f"Error fetching all users: {e}")
+            print(f"Error fetching users page: {e}")
             return []
         finally:
             db_utils.release_db_connection(conn)
@@ -242,8 +324,8 @@ def get_user_history(user_id: str) -> List[Dict[str, str]]:
             if result.data and result.data[0]["history"]:
                 try:
                     # Safely parse the JSON string into a Python list of dictionaries
-                    return json.loads(result.data[0]["history"])
-                except json.JSONDecodeError:
+                    return loads_history(result.data[0]["history"])
+                except ValueError:
                     print(
                         f"Warning: Corrupted history for user_id {user_id}. Returning empty list."
                     )
@@ -263,8 +345,8 @@ def get_user_history(user_id: str) -> List[Dict[str, str]]:
                 if result and result[0]:
                     try:
                         # Safely parse the JSON string into a Python list of dictionaries
-                        return json.loads(result[0])
-                    except json.JSONDecodeError:
+                        return loads_history(result[0])
+                    except ValueError:
                         print(
                             f"Warning: Corrupted history for user_id {user_id}. Returning empty list."
                         )
@@ -279,6 +361,60 @@ def get_user_history(user_id: str) -> List[Dict[str, str]]:
         # ========== ORIGINAL POSTGRESQL CODE END ==========
 
 
+def get_user_history_since(
+    user_id: str, since: int = 0
+) -> Optional[Tuple[List[Dict[str, str]], int]]:
+    """
+    Returns (turns after index `since`, total turn count) for a user, or None
+    if the user does not exist. Turns are read from the turn log (an indexed
+    range read of the new turns). Conversations from before the turn log
+    are read from `users.history`, through the history cache so polling for
+    new turns does not re-read and re-decode the whole history.
+    """
+    turn_count = turn_log.last_seq(user_id)
+    if turn_count:
+        turns = [
+            {"input": turn["input"], "output": turn["output"]}
+            for turn in turn_log.turns(user_id, after_seq=since)
+        ]
+        return turns, turn_count
+
+    version = change_counters.version("history", user_id)
+    history = history_cache.get(user_id, version)
+    if history is None:
+        if USE_SUPABASE:
+            # ========== SUPABASE CODE START ==========
+            result = (
+                SUPABASE_CLIENT.table("users")
+                .select("history")
+                .eq("user_id", user_id)
+                .execute()
+            )
+            if not result.data:
+                return None
+            raw = result.data[0]["history"]
+            # ========== SUPABASE CODE END ==========
+        else:
+            # ========== ORIGINAL POSTGRESQL CODE START ==========
+            conn = db_utils.get_db_connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        "SELECT history FROM users WHERE user_id = %s", (user_id,)
+                    )
+                    row = cur.fetchone()
+            finally:
+                db_utils.release_db_connection(conn)
+            if not row:
+                return None
+            raw = row[0]
+            # ========== ORIGINAL POSTGRESQL CODE END ==========
+        history = loads_history(raw)
+        history_cache.put(user_id, history, version)
+
+    return history[since:], len(history)
+
+
 def update_user_history(user_id: str, history: List[Dict[str, str]]) -> bool:
     """
     Updates the conversation history for a user using a structured list.
@@ -294,6 +430,8 @@ def update_user_history(user_id: str, history: List[Dict[str, str]]) -> bool:
                 .eq("user_id", user_id)
                 .execute()
             )
+            version = change_counters.bump("history", user_id)
+            history_cache.put(user_id, history, version)
             return True
         except Exception as e:
             print(f"History update failed for {user_id}: {e}")
@@ -313,6 +451,8 @@ def update_user_history(user_id: str, history: List[Dict[str, str]]) -> bool:
                     (history_json, user_id),
                 )
                 conn.commit()
+                version = change_counters.bump("history", user_id)
+                history_cache.put(user_id, history, version)
                 return True
         except Exception as e:
             conn.rollback()
@@ -371,6 +511,7 @@ def update_user_data(user_id: str, updates: dict) -> str:
             if not result.data:
                 return f"No changes made for user {user_id}"
 
+            change_counters.bump("users", user_id)
             updated_fields = ", ".join(valid_updates.keys())
             return (
                 f"Successfully updated user {user_id}. Updated fields: {updated_fields}"
@@ -416,6 +557,7 @@ def update_user_data(user_id: str, updates: dict) -> str:
                     return f"No changes made for user {user_id}"
 
                 conn.commit()
+                change_counters.bump("users", user_id)
 
                 updated_fields = ", ".join(valid_updates.keys())
                 return f"Successfully updated user {user_id}. Updated fields: {updated_fields}"
@@ -427,3 +569,92 @@ def update_user_data(user_id: str, updates: dict) -> str:
         finally:
             db_utils.release_db_connection(conn)
         # ========== ORIGINAL POSTGRESQL CODE END ==========
+
+
+def update_users_data_bulk(items: List[Tuple[str, dict]]) -> List[Tuple[bool, str]]:
+    """
+    Applies many `update_user_data` updates at once, e.g. a batch of approved
+    requests. On PostgreSQL they are written in a single transaction, with a
+    savepoint per item so one failing update does not undo the others.
+    Supabase has no client-side transactions, so there each item is updated
+    on its own.
+
+    Args:
+        items: (user_id, updates) pairs, in the same form as for update_user_data
+
+    Returns:
+        One (written, message) pair per item, in order. `written` is False
+        only if the update raised, i.e. it can be retried; messages are the
+        same as update_user_data's.
+    """
+    if USE_SUPABASE:
+        # ========== SUPABASE CODE START ==========
+        results = []
+        for user_id, updates in items:
+            message = update_user_data(user_id, updates)
+            results.append((not message.startswith("Error updating user data"), message))
+        return results
+        # ========== SUPABASE CODE END ==========
+
+    # ========== ORIGINAL POSTGRESQL CODE START ==========
+    allowed_fields = {"name", "phone", "address", "location", "passwords"}
+    results = []
+    updated_users = []
+    conn = db_utils.get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            for user_id, updates in items:
+                valid_updates = {
+                    k: v
+                    for k, v in updates.items()
+                    if k in allowed_fields and v is not None
+                }
+                if not valid_updates:
+                    results.append(
+                        (
+                            True,
+                            "No valid fields provided for update. Allowed fields: name, phone, address, location, passwords",
+                        )
+                    )
+                    continue
+
+                cur.execute("SAVEPOINT bulk_item")
+                try:
+                    set_clause = ", ".join([f"{field} = %s" for field in valid_updates.keys()])
+                    cur.execute(
+                        f"UPDATE users SET {set_clause} WHERE user_id = %s",
+                        list(valid_updates.values()) + [user_id],
+                    )
+                    updated = cur.rowcount
+                    cur.execute("RELEASE SAVEPOINT bulk_item")
+                except Exception as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT bulk_item")
+                    print(f"Error updating user data for {user_id}: {e}")
+                    results.append((False, f"Error updating user data: {str(e)}"))
+                    continue
+
+                if updated == 0:
+                    results.append(
+                        (True, f"User with ID {user_id} not found in the database.")
+                    )
+                else:
+                    updated_users.append(user_id)
+                    updated_fields = ", ".join(valid_updates.keys())
+                    results.append(
+                        (
+                            True,
+                            f"Successfully updated user {user_id}. Updated fields: {updated_fields}",
+                        )
+                    )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Bulk user data update failed: {e}")
+        return [(False, f"Error updating user data: {str(e)}") for _ in items]
+    finally:
+        db_utils.release_db_connection(conn)
+
+    for user_id in set(updated_users):
+        change_counters.bump("users", user_id)
+    return results
+    # ========== ORIGINAL POSTGRESQL CODE END ==========
@@ -0,0 +1,206 @@
+# database/state_store.py
+"""
+Connections for the small state tables kept beside the checkpoints: the
+approvals index (`database/approvals_index.py`) and the turn log
+(`database/turn_log.py`).
+
+They must live wherever the checkpoints live, or a replica would see a
+thread's state without its approvals or history. With the SQLite
+checkpointer each table is a SQLite file next to the checkpoints, shared by
+the worker processes of that host. With `CHECKPOINT_BACKEND=postgres` they
+are tables in the same PostgreSQL database (`DB_CONFIG`), created by
+`init_db()`. SQLite files must not be shared between hosts: WAL mode and
+file locks do not work over network filesystems.
+
+Both stores run the same SQL: `?` placeholders, `ON CONFLICT` upserts and
+rows read by column name.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Iterator, Optional, Sequence
+
+import config
+from utils.process_resources import after_fork, before_fork
+
+
+class SqliteStore:
+    """A SQLite file with one WAL connection per thread."""
+
+    backend = "sqlite"
+
+    def __init__(self, db_path: str, schema: str, pragmas: Sequence[str] = ()):
+        self.db_path = db_path
+        self.pragmas = tuple(pragmas)
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn().executescript(schema)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit: transactions are opened explicitly by transaction().
+            conn = sqlite3.connect(
+                self.db_path, timeout=30, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            for pragma in self.pragmas:
+                conn.execute(pragma)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def read(self) -> Iterator[sqlite3.Connection]:
+        yield self._conn()
+
+    @contextmanager
+    def transaction(self, lock_key: Optional[str] = None) -> Iterator[sqlite3.Connection]:
+        """
+        A write transaction, committed on exit. BEGIN IMMEDIATE takes the
+        file's write lock up front, which already serializes `lock_key`.
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+class _PostgresConnection:
+    """Runs the stores' `?`-placeholder SQL on a psycopg connection."""
+
+    def __init__(self, conn: Any):
+        self._conn = conn
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> Any:
+        if not params:
+            # No parameters: sent as-is, so a schema script may hold several statements.
+            return self._conn.execute(sql)
+        return self._conn.execute(sql.replace("?", "%s"), tuple(params))
+
+
+class PostgresStore:
+    """
+    The DB_CONFIG database, through a small per-process psycopg pool that
+    is opened on first use (so it is never inherited across a fork).
+    """
+
+    backend = "postgres"
+
+    def __init__(self, min_size: int, max_size: int, timeout: float):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def _get_pool(self) -> Any:
+        with self._pool_lock:
+            if self._pool is None:
+                from psycopg_pool import ConnectionPool
+
+                from database.pg_checkpointer import CONNECTION_KWARGS, postgres_conninfo
+
+                self._pool = ConnectionPool(
+                    postgres_conninfo(),
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    timeout=self.timeout,
+                    kwargs=CONNECTION_KWARGS,
+                    name="state-tables",
+                    open=True,
+                )
+            return self._pool
+
+    @contextmanager
+    def read(self) -> Iterator[_PostgresConnection]:
+        with self._get_pool().connection() as conn:
+            yield _PostgresConnection(conn)
+
+    @contextmanager
+    def transaction(self, lock_key: Optional[str] = None) -> Iterator[_PostgresConnection]:
+        """
+        A write transaction, committed on exit. With `lock_key`, concurrent
+        transactions on the same key (e.g. one thread's turns) run one at a
+        time, on every replica.
+        """
+        with self._get_pool().connection() as conn:
+            with conn.transaction():
+                if lock_key is not None:
+                    conn.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (lock_key,))
+                yield _PostgresConnection(conn)
+
+    def close(self):
+        """Closes the pool; the next use opens a new one."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+
+
+_postgres_store: Optional[PostgresStore] = None
+_postgres_schemas = []
+
+
+def create_store(
+    db_path: str, sqlite_schema: str, postgres_schema: str, pragmas: Sequence[str] = ()
+) -> Any:
+    """
+    The store for one set of state tables: the SQLite file `db_path`, or
+    with `CHECKPOINT_BACKEND=postgres` the pool shared by every table in
+    DB_CONFIG, whose `postgres_schema` is applied by `migrate_state_schema()`.
+    """
+    global _postgres_store
+    if config.CHECKPOINT_BACKEND != "postgres":
+        return SqliteStore(db_path, sqlite_schema, pragmas)
+    _postgres_schemas.append(postgres_schema)
+    if _postgres_store is None:
+        _postgres_store = PostgresStore(
+            min_size=0,
+            max_size=config.CHECKPOINT_PG_POOL_MAX_SIZE,
+            timeout=config.CHECKPOINT_PG_POOL_TIMEOUT,
+        )
+    return _postgres_store
+
+
+def migrate_state_schema():
+    """Creates the state tables in DB_CONFIG (called from init_db())."""
+    # Importing the modules registers their schemas.
+    import database.approvals_index  # noqa: F401
+    import database.turn_log  # noqa: F401
+
+    if _postgres_store is None:
+        return
+    with _postgres_store.transaction() as conn:
+        for schema in _postgres_schemas:
+            conn.execute(schema)
+
+
+@before_fork("state tables (postgres)")
+def _close_postgres_store():
+    if _postgres_store is not None:
+        _postgres_store.close()
+
+
+@after_fork("state tables (postgres)")
+def _reset_postgres_store():
+    # Drops the parent's pool handle; the worker opens its own on first use.
+    if _postgres_store is not None:
+        _postgres_store._pool = None
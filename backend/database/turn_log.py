@@ -0,0 +1,154 @@
+# database/turn_log.py
+"""
+Append-only log of conversation turns.
+
+The graph state used to carry the whole conversation in `history`, so every
+checkpoint re-serialized it and every chat turn rewrote `users.history`.
+Now each turn is written once, as a row keyed by (thread_id, seq), by the
+node that produced it. The graph state keeps only the last few turns the
+prompts need plus `history_seq`, the seq of its newest logged turn; the
+full conversation is read from here when it is needed (the Level2 summary
+and the chat history endpoint).
+
+The log lives next to the checkpoints (see `database/state_store.py`) so
+every server process that can serve a thread sees its whole conversation.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+import config
+from database.state_store import create_store
+from utils.change_counters import change_counters
+from utils.process_resources import after_fork, before_fork
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS turns (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    is_level2_session INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (thread_id, seq)
+) WITHOUT ROWID;
+"""
+
+POSTGRES_CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS turns (
+    thread_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    input TEXT NOT NULL,
+    output TEXT NOT NULL,
+    is_level2_session INTEGER NOT NULL,
+    created_at DOUBLE PRECISION NOT NULL,
+    PRIMARY KEY (thread_id, seq)
+);
+"""
+
+# Re-running a step rewrites its own turn (see TurnLog.append).
+UPSERT_TURN_SQL = """
+INSERT INTO turns (thread_id, seq, input, output, is_level2_session, created_at)
+VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (thread_id, seq) DO UPDATE SET
+    input = excluded.input,
+    output = excluded.output,
+    is_level2_session = excluded.is_level2_session,
+    created_at = excluded.created_at
+"""
+
+
+class TurnLog:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.store = create_store(
+            db_path,
+            CREATE_TABLE_SQL,
+            POSTGRES_CREATE_TABLE_SQL,
+            pragmas=("PRAGMA synchronous=NORMAL",),
+        )
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        self.store.close()
+
+    def append(
+        self,
+        thread_id: str,
+        turns: List[Dict[str, Any]],
+        after_seq: Optional[int] = None,
+    ) -> int:
+        """
+        Writes `turns` after `after_seq` (the caller's cursor; by default the
+        end of the log) and returns the seq of the last one. Writing at the
+        cursor makes a re-run of the same step overwrite its own turn
+        instead of adding it twice.
+        """
+        now = time.time()
+        with self.store.transaction(lock_key=thread_id) as conn:
+            if after_seq is None:
+                after_seq = self._last_seq(conn, thread_id)
+            seq = after_seq
+            for turn in turns:
+                seq += 1
+                conn.execute(
+                    UPSERT_TURN_SQL,
+                    (
+                        thread_id,
+                        seq,
+                        str(turn.get("input", "")),
+                        str(turn.get("output", "")),
+                        int(bool(turn.get("is_level2_session", False))),
+                        now,
+                    ),
+                )
+        change_counters.bump("history", thread_id)
+        return seq
+
+    def last_seq(self, thread_id: str) -> int:
+        """Seq of the newest turn (0 for an empty thread), i.e. the turn count."""
+        with self.store.read() as conn:
+            return self._last_seq(conn, thread_id)
+
+    @staticmethod
+    def _last_seq(conn: Any, thread_id: str) -> int:
+        row = conn.execute(
+            "SELECT MAX(seq) AS last_seq FROM turns WHERE thread_id = ?", (thread_id,)
+        ).fetchone()
+        return row["last_seq"] or 0
+
+    def turns(self, thread_id: str, after_seq: int = 0) -> List[Dict[str, Any]]:
+        """Turns after `after_seq`, oldest first, in the graph's history format."""
+        with self.store.read() as conn:
+            rows = conn.execute(
+                "SELECT input, output, is_level2_session FROM turns "
+                "WHERE thread_id = ? AND seq > ? ORDER BY seq",
+                (thread_id, after_seq),
+            ).fetchall()
+        return [
+            {
+                "input": row["input"],
+                "output": row["output"],
+                "is_level2_session": bool(row["is_level2_session"]),
+            }
+            for row in rows
+        ]
+
+    def clear(self, thread_id: str):
+        """Deletes a thread's turns (login starts a fresh conversation)."""
+        with self.store.transaction(lock_key=thread_id) as conn:
+            conn.execute("DELETE FROM turns WHERE thread_id = ?", (thread_id,))
+        change_counters.bump("history", thread_id)
+
+
+turn_log = TurnLog(config.TURN_LOG_DB_PATH)
+
+
+@before_fork("turn log")
+def _close_turn_log():
+    turn_log.close()
+
+
+@after_fork("turn log")
+def _reset_turn_log():
+    # Connections are opened lazily per thread in the worker.
+    turn_log.close()
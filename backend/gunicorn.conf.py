@@ -0,0 +1,83 @@
+# gunicorn.conf.py
+"""
+Pre-fork production server configuration.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is preloaded in the master so heavy read-only state is shared
+copy-on-write by the workers. Connections, pools and background threads are
+closed before forking and recreated in each worker (see
+utils/process_resources.py). Behind the front router (router.py) every
+worker also listens on its slot socket.
+"""
+import gc
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8001')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Threads per worker; chat turns additionally run on the in-process graph pool.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+preload_app = True
+# LLM calls and SSE streams are long-lived.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "180"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = 5
+# Recycle workers periodically to bound copy-on-write drift.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    from utils.process_memory import process_memory
+    from utils.process_resources import run_before_fork_hooks
+
+    run_before_fork_hooks()
+    # Move everything loaded so far out of the GC's generations so that
+    # collections in the workers do not write to (and un-share) those pages.
+    gc.collect()
+    gc.freeze()
+    usage = process_memory(os.getpid())
+    server.log.info(
+        "Master %s preloaded app: rss=%s KiB", os.getpid(), usage.get("rss_kb")
+    )
+
+
+def post_fork(server, worker):
+    from utils.process_resources import run_after_fork_hooks
+
+    run_after_fork_hooks()
+    # Set by router.py: also serve this worker's slot socket.
+    socket_dir = os.getenv("ROUTER_SOCKET_DIR")
+    if socket_dir:
+        _bind_router_slot(server, worker, socket_dir)
+
+
+def _bind_router_slot(server, worker, socket_dir):
+    from gunicorn.sock import UnixSocket
+
+    from utils.worker_router import claim_worker_slot, slot_socket_path
+
+    slot = claim_worker_slot(socket_dir, workers)
+    if slot is None:
+        server.log.warning("Worker %s found no free router slot", worker.pid)
+        return
+    listener = UnixSocket(slot_socket_path(socket_dir, slot), server.cfg, server.log)
+    worker.sockets = list(worker.sockets) + [listener]
+    server.log.info("Worker %s serves router slot %s", worker.pid, slot)
+
+
+def post_worker_init(worker):
+    from utils.process_memory import process_memory
+
+    usage = process_memory(os.getpid())
+    worker.log.info(
+        "Worker %s ready: rss=%s KiB pss=%s KiB shared=%s KiB private=%s KiB",
+        worker.pid,
+        usage.get("rss_kb"),
+        usage.get("pss_kb"),
+        usage.get("shared_kb"),
+        usage.get("private_kb"),
+    )
@@ -0,0 +1,77 @@
+# router.py
+"""
+Front router for the pre-fork server:
+
+    python router.py
+
+Starts `gunicorn -c gunicorn.conf.py wsgi:app` on a loopback port with every
+worker also listening on a slot socket, then serves HOST:PORT and sends each
+request to a worker: requests for one conversation thread always to the
+same worker and one at a time (see utils/worker_router.py).
+`GET /api/system/router` reports every worker's load.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+
+import config
+from utils.worker_router import RouterServer, WorkerRouter
+
+
+def main():
+    os.makedirs(config.ROUTER_SOCKET_DIR, exist_ok=True)
+    env = dict(
+        os.environ,
+        HOST="127.0.0.1",
+        PORT=str(config.ROUTER_BACKEND_PORT),
+        WEB_CONCURRENCY=str(config.ROUTER_WORKERS),
+        ROUTER_SOCKET_DIR=config.ROUTER_SOCKET_DIR,
+    )
+    if config.CHECKPOINT_BACKEND == "sqlite":
+        # Every write to a thread now goes through the worker that caches it,
+        # so checkpoint cache hits skip the database check by default.
+        env.setdefault("CHECKPOINT_CACHE_VALIDATE", "false")
+    workers = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:app"],
+        cwd=config.BASE_DIR,
+        env=env,
+    )
+
+    router = WorkerRouter(
+        config.ROUTER_SOCKET_DIR,
+        slots=config.ROUTER_WORKERS,
+        vnodes=config.ROUTER_VNODES,
+        queue_timeout=config.ROUTER_QUEUE_TIMEOUT_SECONDS,
+        upstream_timeout=config.ROUTER_UPSTREAM_TIMEOUT_SECONDS,
+        probe_seconds=config.ROUTER_PROBE_SECONDS,
+        bulk_max_items=config.BULK_APPROVAL_MAX_ITEMS,
+    )
+    router.start()
+    server = RouterServer((config.HOST, config.PORT), router)
+
+    def stop(signum, frame):
+        workers.send_signal(signum)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    def watch_workers():
+        # The router has nothing to serve once the server is gone.
+        code = workers.wait()
+        print(f"🔄 [INFO] Server exited with code {code}; stopping the router")
+        server.shutdown()
+
+    threading.Thread(target=watch_workers, name="router-watch", daemon=True).start()
+    print(
+        f"✅ [SUCCESS] Router listening on {config.HOST}:{config.PORT} "
+        f"for {config.ROUTER_WORKERS} workers"
+    )
+    server.serve_forever()
+    server.server_close()
+    sys.exit(workers.returncode or 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,16 +6,17 @@ import pickle
 from typing import Optional
 from email.message import EmailMessage
 
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+# The Google client libraries are imported on first use: email is sent
+# rarely and they add noticeably to startup time.
 
 from database import postgre
 import config
 
 
 def get_credentials():
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from google.auth.transport.requests import Request
+
     creds = None
     if os.path.exists("token.pickle"):
         with open("token.pickle", "rb") as token:
@@ -39,6 +40,9 @@ def send_email(user_id: str, subject: str, body: str) -> str:
     if not recipient_email:
         return f"Could not send email: No email address found for user_id {user_id}."
 
+    from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+
     try:
         creds = get_credentials()
         service = build("gmail", "v1", credentials=creds)
@@ -1,11 +1,32 @@
 # 9.1 services/jira_service.py
 import re
-from jira import JIRA
+import threading
+from typing import List, Optional
 import config
 
-# Initialize JIRA client
-options = {"server": config.JIRA_SERVER}
-jira_client = JIRA(options, basic_auth=(config.JIRA_USERNAME, config.JIRA_API_TOKEN))
+# The JIRA client authenticates when it is created, so it is built on first
+# use rather than at import (startup should not wait on JIRA).
+_jira_client = None
+_jira_client_lock = threading.Lock()
+
+
+def get_jira_client():
+    """Returns the shared JIRA client, connecting on first call."""
+    global _jira_client
+    with _jira_client_lock:
+        if _jira_client is None:
+            from jira import JIRA
+
+            options = {"server": config.JIRA_SERVER}
+            _jira_client = JIRA(
+                options, basic_auth=(config.JIRA_USERNAME, config.JIRA_API_TOKEN)
+            )
+        return _jira_client
+
+
+def loaded_jira_client():
+    """Returns the JIRA client if something has already connected it, else None."""
+    return _jira_client
 
 
 def create_jira_ticket(username: str, summary: str, description: str):
@@ -22,7 +43,7 @@ def create_jira_ticket(username: str, summary: str, description: str):
             # If you have a custom field for username:
             # "customfield_XXXXX": username
         }
-        new_issue = jira_client.create_issue(fields=issue_dict)
+        new_issue = get_jira_client().create_issue(fields=issue_dict)
         return new_issue.key  # Returns the JIRA ticket ID like 'SUP-123'
     except Exception as e:
         print(f"Error creating JIRA ticket: {e}")
@@ -52,7 +73,7 @@ def search_jira_tickets(username: str, query: str = ""):
 
         jql_query += " ORDER BY created DESC"
 
-        issues = jira_client.search_issues(jql_query, maxResults=10)
+        issues = get_jira_client().search_issues(jql_query, maxResults=10)
 
         results = []
         for issue in issues:
@@ -71,39 +92,70 @@ def search_jira_tickets(username: str, query: str = ""):
         return []
 
 
-def get_all_jira_tickets():
-    """Fetches all tickets from the configured JIRA project."""
+TICKET_FIELDS = "summary,description,status,assignee,reporter,priority,created,updated,duedate"
+
+
+def _jql_string(value: str) -> str:
+    """Quotes a value as a JQL string literal."""
+    escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _ticket_to_dict(issue):
+    return {
+        "id": issue.key,
+        "summary": issue.fields.summary,
+        "description": issue.fields.description,
+        "status": issue.fields.status.name,
+        "assignee": (
+            issue.fields.assignee.displayName if issue.fields.assignee else "Unassigned"
+        ),
+        "reporter": (
+            issue.fields.reporter.displayName if issue.fields.reporter else "N/A"
+        ),
+        "priority": (issue.fields.priority.name if issue.fields.priority else "N/A"),
+        "created_at": issue.fields.created,
+        "updated_at": issue.fields.updated,
+        "due_date": issue.fields.duedate,
+    }
+
+
+def get_jira_tickets_page(
+    limit: int,
+    before_key: Optional[str] = None,
+    statuses: Optional[List[str]] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    """
+    Fetches one page of tickets from the configured JIRA project, newest first.
+
+    Issue keys increase with creation, so paging with `issuekey < <last key>`
+    keeps every page a bounded seek instead of an ever-growing startAt offset.
+
+    Args:
+        limit: Maximum number of tickets to return
+        before_key: Key of the last ticket on the previous page (e.g. 'KAN-120')
+        statuses: Only tickets in one of these statuses
+        created_from: Only tickets created on/after this date ('yyyy-MM-dd' or 'yyyy-MM-dd HH:mm')
+        created_to: Only tickets created on/before this date
+    """
     try:
-        jql_query = f'project = "{config.JIRA_PROJECT_KEY}" ORDER BY created DESC'
-        issues = jira_client.search_issues(jql_query, maxResults=False)
+        clauses = [f"project = {_jql_string(config.JIRA_PROJECT_KEY)}"]
+        if before_key:
+            clauses.append(f"issuekey < {_jql_string(before_key)}")
+        if statuses:
+            clauses.append(f"status in ({', '.join(_jql_string(s) for s in statuses)})")
+        if created_from:
+            clauses.append(f"created >= {_jql_string(created_from)}")
+        if created_to:
+            clauses.append(f"created <= {_jql_string(created_to)}")
+        jql_query = " AND ".join(clauses) + " ORDER BY key DESC"
 
-        results = []
-        for issue in issues:
-            results.append(
-                {
-                    "id": issue.key,
-                    "summary": issue.fields.summary,
-                    "description": issue.fields.description,
-                    "status": issue.fields.status.name,
-                    "assignee": (
-                        issue.fields.assignee.displayName
-                        if issue.fields.assignee
-                        else "Unassigned"
-                    ),
-                    "reporter": (
-                        issue.fields.reporter.displayName
-                        if issue.fields.reporter
-                        else "N/A"
-                    ),
-                    "priority": (
-                        issue.fields.priority.name if issue.fields.priority else "N/A"
-                    ),
-                    "created_at": issue.fields.created,
-                    "updated_at": issue.fields.updated,
-                    "due_date": issue.fields.duedate,
-                }
-            )
-        return results
+        issues = get_jira_client().search_issues(
+            jql_query, maxResults=limit, fields=TICKET_FIELDS
+        )
+        return [_ticket_to_dict(issue) for issue in issues]
     except Exception as e:
-        print(f"Error fetching all JIRA tickets: {e}")
+        print(f"Error fetching JIRA tickets page: {e}")
         return []
@@ -1,6 +1,7 @@
 # 9. services/ticket_service.py
 """Ticket management services."""
 from . import jira_service
+from utils.change_counters import change_counters
 
 
 def create_ticket(input_data):
@@ -22,6 +23,7 @@ def create_ticket(input_data):
     if not ticket_id:
         return "Failed to create ticket in jira."
 
+    change_counters.bump("tickets", user_id)
     return f'Ticket {ticket_id} created in JIRA for: "{summary}". Would you like me to send confirmation to your registered email? (Yes/No)'
 
 
@@ -54,14 +56,26 @@ def search_tickets(input_data):
     return "\n\n".join(formatted_results)
 
 
-def get_all_tickets():
+def get_tickets_page(
+    limit: int,
+    before_key=None,
+    statuses=None,
+    created_from=None,
+    created_to=None,
+):
     """
-    Fetch all tickets from JIRA.
+    Fetch one page of tickets from JIRA, newest first.
 
     Returns:
-        list: A list of all tickets.
+        list: Up to `limit` tickets created before `before_key`.
     """
-    results = jira_service.get_all_jira_tickets()
+    results = jira_service.get_jira_tickets_page(
+        limit,
+        before_key=before_key,
+        statuses=statuses,
+        created_from=created_from,
+        created_to=created_to,
+    )
     if not results:
         return []
     return results
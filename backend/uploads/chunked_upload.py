@@ -0,0 +1,462 @@
+# uploads/chunked_upload.py
+"""
+Resumable chunked PDF uploads.
+
+Protocol: create a session (init), PUT the parts in order, then complete.
+Parts are streamed straight into the spooled file while a SHA-256 of the
+whole file is updated incrementally, so completing an upload never re-reads
+it. When the finished hash matches an already indexed document the upload is
+discarded instead of being embedded again.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: development runs a single process anyway.
+    fcntl = None
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Optional
+
+import config
+
+STREAM_BUFFER_SIZE = 64 * 1024
+
+STATUS_OPEN = "open"
+STATUS_COMPLETED = "completed"
+STATUS_ABORTED = "aborted"
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    upload_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    user_id TEXT,
+    document_type TEXT,
+    metadata TEXT,
+    total_size INTEGER NOT NULL,
+    part_size INTEGER NOT NULL,
+    received_bytes INTEGER NOT NULL DEFAULT 0,
+    next_part INTEGER NOT NULL DEFAULT 1,
+    content_sha256 TEXT,
+    job_id TEXT,
+    deduplicated INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+class UploadError(Exception):
+    """A client-visible upload protocol error with its HTTP status."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def hash_stream_to_file(stream: BinaryIO, path: str, max_bytes: int) -> str:
+    """
+    Copies `stream` to `path`, hashing on the fly. Raises UploadError if the
+    stream is larger than `max_bytes`. Returns the hex SHA-256.
+    """
+    hasher = hashlib.sha256()
+    written = 0
+    with open(path, "wb") as out:
+        while True:
+            block = stream.read(STREAM_BUFFER_SIZE)
+            if not block:
+                break
+            written += len(block)
+            if written > max_bytes:
+                raise UploadError(
+                    f"File exceeds the maximum upload size of {max_bytes} bytes.", 413
+                )
+            hasher.update(block)
+            out.write(block)
+    return hasher.hexdigest()
+
+
+class _SessionLock:
+    """A session's lock in this process, shared by the requests using it."""
+
+    __slots__ = ("lock", "users", "finished")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.users = 0
+        # Set once the session is completed or aborted: its lock file goes.
+        self.finished = False
+
+
+class ChunkedUploadManager:
+    """Tracks upload sessions in SQLite and assembles their parts on disk."""
+
+    def __init__(
+        self,
+        db_path: str,
+        spool_dir: str,
+        part_size: int,
+        max_upload_bytes: int,
+        session_ttl_hours: float,
+    ):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.part_size = part_size
+        self.max_upload_bytes = max_upload_bytes
+        self.session_ttl_hours = session_ttl_hours
+        os.makedirs(spool_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Per-session locks serialize PUTs for the same upload in this
+        # process; dropped when no request is using them.
+        self._session_locks: Dict[str, _SessionLock] = {}
+        # Running hashes of open sessions as (bytes hashed, hasher). Rebuilt
+        # from disk after a restart or when another worker appended a part.
+        self._hashers: Dict[str, Any] = {}
+        with self._connect() as conn:
+            conn.executescript(CREATE_TABLE_SQL)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _session_lock(self, upload_id: str):
+        """
+        Serializes work on one upload session, across threads and across
+        server worker processes (parts of one upload may reach any worker).
+        """
+        with self._lock:
+            session_lock = self._session_locks.setdefault(upload_id, _SessionLock())
+            session_lock.users += 1
+        try:
+            with session_lock.lock:
+                if fcntl is None:
+                    yield
+                    return
+                lock_path = os.path.join(self.spool_dir, f"{upload_id}.lock")
+                with open(lock_path, "a") as lock_file:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    try:
+                        yield
+                    finally:
+                        if session_lock.finished and os.path.exists(lock_path):
+                            # The status is final, so a request that locks a
+                            # new file at this path only reads it.
+                            os.unlink(lock_path)
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            with self._lock:
+                session_lock.users -= 1
+                if session_lock.users == 0:
+                    self._session_locks.pop(upload_id, None)
+
+    def _load(self, upload_id: str) -> sqlite3.Row:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM upload_sessions WHERE upload_id = ?", (upload_id,)
+            ).fetchone()
+        if not row:
+            raise UploadError("Upload session not found.", 404)
+        return row
+
+    def _update(self, upload_id: str, **fields):
+        fields["updated_at"] = _now()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(
+                f"UPDATE upload_sessions SET {assignments} WHERE upload_id = ?",
+                (*fields.values(), upload_id),
+            )
+
+    def _describe(self, row: sqlite3.Row) -> Dict[str, Any]:
+        total_parts = max(1, -(-row["total_size"] // row["part_size"]))
+        return {
+            "upload_id": row["upload_id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "total_size": row["total_size"],
+            "part_size": row["part_size"],
+            "total_parts": total_parts,
+            "received_bytes": row["received_bytes"],
+            "next_part": row["next_part"],
+            "content_sha256": row["content_sha256"],
+            "job_id": row["job_id"],
+            "duplicate": bool(row["deduplicated"]),
+        }
+
+    def _forget(self, upload_id: str):
+        """
+        Drops per-session state once the session's status is completed or
+        aborted. Called with the session lock held; the lock file is removed
+        when that lock is released.
+        """
+        self._hashers.pop(upload_id, None)
+        with self._lock:
+            session_lock = self._session_locks.get(upload_id)
+            if session_lock is not None:
+                session_lock.finished = True
+
+    def _hasher_for(self, row: sqlite3.Row):
+        """Returns the running hash of a session, re-reading the file if needed."""
+        cached = self._hashers.get(row["upload_id"])
+        if cached and cached[0] == row["received_bytes"]:
+            hasher = cached[1]
+        else:
+            hasher = hashlib.sha256()
+            if os.path.exists(row["file_path"]):
+                with open(row["file_path"], "rb") as existing:
+                    remaining = row["received_bytes"]
+                    while remaining > 0:
+                        block = existing.read(min(STREAM_BUFFER_SIZE, remaining))
+                        if not block:
+                            break
+                        hasher.update(block)
+                        remaining -= len(block)
+            self._hashers[row["upload_id"]] = (row["received_bytes"], hasher)
+        return hasher
+
+    def create_session(
+        self,
+        filename: str,
+        total_size: int,
+        user_id: Optional[str] = None,
+        document_type: str = "policy",
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        if not filename or not filename.lower().endswith(".pdf"):
+            raise UploadError("Only PDF files are allowed")
+        if total_size <= 0:
+            raise UploadError("total_size must be a positive number of bytes.")
+        if total_size > self.max_upload_bytes:
+            raise UploadError(
+                f"File exceeds the maximum upload size of {self.max_upload_bytes} bytes.",
+                413,
+            )
+
+        self.expire_stale_sessions()
+        upload_id = uuid.uuid4().hex
+        file_path = os.path.join(self.spool_dir, f"{upload_id}.upload")
+        open(file_path, "wb").close()
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO upload_sessions (
+                    upload_id, status, filename, file_path, user_id, document_type,
+                    metadata, total_size, part_size, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    upload_id,
+                    STATUS_OPEN,
+                    filename,
+                    file_path,
+                    user_id,
+                    document_type,
+                    json.dumps(metadata or {}),
+                    total_size,
+                    self.part_size,
+                    now,
+                    now,
+                ),
+            )
+        print(f"📥 [INFO] Opened upload session {upload_id} for {filename}")
+        return self.get_session(upload_id)
+
+    def get_session(self, upload_id: str) -> Dict[str, Any]:
+        return self._describe(self._load(upload_id))
+
+    def write_part(
+        self, upload_id: str, part_number: int, stream: BinaryIO
+    ) -> Dict[str, Any]:
+        """
+        Appends part `part_number` (1-based) from `stream`. Parts must arrive
+        in order; re-sending an already stored part is acknowledged without
+        rewriting it, so clients can safely retry after a dropped connection.
+        """
+        with self._session_lock(upload_id):
+            row = self._load(upload_id)
+            if row["status"] != STATUS_OPEN:
+                self._forget(upload_id)
+                raise UploadError(f"Upload session is {row['status']}.", 409)
+            if part_number < row["next_part"]:
+                return self._describe(row)
+            if part_number > row["next_part"]:
+                raise UploadError(
+                    f"Expected part {row['next_part']}, got part {part_number}.", 409
+                )
+
+            offset = row["received_bytes"]
+            expected = min(row["part_size"], row["total_size"] - offset)
+            hasher = self._hasher_for(row)
+            part_hasher = hasher.copy()
+            written = 0
+
+            with open(row["file_path"], "r+b") as out:
+                out.seek(offset)
+                try:
+                    while True:
+                        block = stream.read(STREAM_BUFFER_SIZE)
+                        if not block:
+                            break
+                        written += len(block)
+                        if written > expected:
+                            raise UploadError(
+                                f"Part {part_number} is larger than {expected} bytes.",
+                                413,
+                            )
+                        part_hasher.update(block)
+                        out.write(block)
+                    if written != expected:
+                        raise UploadError(
+                            f"Part {part_number} is incomplete: received {written} of {expected} bytes."
+                        )
+                except BaseException:
+                    # Drop the partial part so the client can resend it.
+                    out.truncate(offset)
+                    raise
+
+            self._hashers[upload_id] = (offset + written, part_hasher)
+            self._update(
+                upload_id,
+                received_bytes=offset + written,
+                next_part=part_number + 1,
+            )
+            return self.get_session(upload_id)
+
+    def complete(
+        self, upload_id: str, ingestion_jobs, expected_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Finalizes the upload. Returns the session together with either the
+        existing indexed document (duplicate) or the queued ingestion job.
+        If the client sent `expected_sha256` and it does not match, the
+        upload is discarded. If the job cannot be queued, the file is put
+        back and the session stays open, so completing can be retried.
+        """
+        with self._session_lock(upload_id):
+            row = self._load(upload_id)
+            if row["status"] == STATUS_COMPLETED:
+                self._forget(upload_id)
+                return self._completion(row, ingestion_jobs)
+            if row["status"] != STATUS_OPEN:
+                self._forget(upload_id)
+                raise UploadError(f"Upload session is {row['status']}.", 409)
+            if row["received_bytes"] != row["total_size"]:
+                raise UploadError(
+                    f"Upload is incomplete: received {row['received_bytes']} of {row['total_size']} bytes.",
+                    409,
+                )
+
+            content_sha256 = self._hasher_for(row).hexdigest()
+            if expected_sha256 and expected_sha256.lower() != content_sha256:
+                self._update(
+                    upload_id, status=STATUS_ABORTED, content_sha256=content_sha256
+                )
+                self._forget(upload_id)
+                if os.path.exists(row["file_path"]):
+                    os.unlink(row["file_path"])
+                raise UploadError(
+                    f"Checksum mismatch: received content hashes to {content_sha256}.",
+                    422,
+                )
+
+            duplicate = ingestion_jobs.find_indexed_document(
+                content_sha256
+            ) or ingestion_jobs.find_active_job(content_sha256)
+            if duplicate:
+                print(
+                    f"♻️ [INFO] Upload {upload_id} matches already indexed content {content_sha256[:12]}; skipping ingestion"
+                )
+                job_id = duplicate.get("job_id")
+            else:
+                job_id = ingestion_jobs.new_job_id()
+                spool_path = ingestion_jobs.spool_path(job_id)
+                os.replace(row["file_path"], spool_path)
+                try:
+                    ingestion_jobs.submit(
+                        job_id,
+                        spool_path,
+                        row["filename"],
+                        user_id=row["user_id"],
+                        document_type=row["document_type"],
+                        metadata=json.loads(row["metadata"] or "{}"),
+                        content_sha256=content_sha256,
+                    )
+                except Exception:
+                    try:
+                        queued = ingestion_jobs.get_job(job_id) is not None
+                    except Exception:
+                        queued = False
+                    if not queued:
+                        # The session stays open, so the client can complete it again.
+                        os.replace(spool_path, row["file_path"])
+                        raise
+
+            self._update(
+                upload_id,
+                status=STATUS_COMPLETED,
+                content_sha256=content_sha256,
+                job_id=job_id,
+                deduplicated=int(bool(duplicate)),
+            )
+            self._forget(upload_id)
+            if duplicate and os.path.exists(row["file_path"]):
+                os.unlink(row["file_path"])
+            return self._completion(self._load(upload_id), ingestion_jobs)
+
+    def _completion(self, row: sqlite3.Row, ingestion_jobs) -> Dict[str, Any]:
+        indexed = ingestion_jobs.find_indexed_document(row["content_sha256"])
+        job = ingestion_jobs.get_job(row["job_id"]) if row["job_id"] else None
+        return {**self._describe(row), "document": indexed, "job": job}
+
+    def abort(self, upload_id: str) -> Dict[str, Any]:
+        with self._session_lock(upload_id):
+            row = self._load(upload_id)
+            if row["status"] == STATUS_OPEN:
+                self._update(upload_id, status=STATUS_ABORTED)
+                if os.path.exists(row["file_path"]):
+                    os.unlink(row["file_path"])
+            self._forget(upload_id)
+            return self.get_session(upload_id)
+
+    def expire_stale_sessions(self):
+        """Aborts open sessions that have not received data within the TTL."""
+        cutoff = (
+            datetime.now(timezone.utc) - timedelta(hours=self.session_ttl_hours)
+        ).isoformat()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT upload_id FROM upload_sessions WHERE status = ? AND updated_at < ?",
+                (STATUS_OPEN, cutoff),
+            ).fetchall()
+        for row in rows:
+            print(f"🧹 [INFO] Expiring stale upload session {row['upload_id']}")
+            self.abort(row["upload_id"])
+
+
+chunked_uploads = ChunkedUploadManager(
+    db_path=config.INGESTION_JOBS_DB_PATH,
+    spool_dir=config.UPLOAD_SPOOL_DIR,
+    part_size=config.UPLOAD_PART_SIZE,
+    max_upload_bytes=config.MAX_UPLOAD_BYTES,
+    session_ttl_hours=config.UPLOAD_SESSION_TTL_HOURS,
+)
@@ -0,0 +1,382 @@
+# uploads/ingestion_jobs.py
+"""
+Background PDF ingestion jobs.
+
+Uploads are spooled to disk and handed to a small worker pool that runs
+extraction, chunking and embedding outside the request. Job state is kept
+in SQLite so progress survives restarts and can be polled by job id.
+
+Any process can queue a job, but only one process at a time dispatches
+them: the holder of the ingestion leader lock. It claims queued jobs from
+the table, so several server workers never run the same job twice.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+import config
+from utils.leader_lock import LeaderLock
+
+# Job lifecycle: queued -> extracting -> embedding -> done | failed
+STATUS_QUEUED = "queued"
+STATUS_EXTRACTING = "extracting"
+STATUS_EMBEDDING = "embedding"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+ACTIVE_STATUSES = (STATUS_QUEUED, STATUS_EXTRACTING, STATUS_EMBEDDING)
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    job_id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    user_id TEXT,
+    document_type TEXT,
+    metadata TEXT,
+    chunks_total INTEGER NOT NULL DEFAULT 0,
+    chunks_done INTEGER NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status ON ingestion_jobs (status);
+CREATE TABLE IF NOT EXISTS indexed_documents (
+    content_sha256 TEXT PRIMARY KEY,
+    document_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    job_id TEXT,
+    indexed_at TEXT NOT NULL
+);
+"""
+
+# Columns added after the first release of the jobs table.
+MIGRATIONS = [
+    ("content_sha256", "ALTER TABLE ingestion_jobs ADD COLUMN content_sha256 TEXT"),
+]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IngestionJobManager:
+    """Persists ingestion jobs and runs them on a bounded worker pool."""
+
+    def __init__(
+        self,
+        db_path: str,
+        spool_dir: str,
+        max_workers: int,
+        poll_interval: float = 1.0,
+    ):
+        self.db_path = db_path
+        self.spool_dir = spool_dir
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        os.makedirs(spool_dir, exist_ok=True)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pdf-ingest"
+        )
+        self._leader = LeaderLock(f"{db_path}.lock")
+        self._wakeup = threading.Event()
+        self._started = False
+        self._in_flight = 0
+        with self._connect() as conn:
+            conn.executescript(CREATE_TABLE_SQL)
+            columns = {
+                row["name"]
+                for row in conn.execute("PRAGMA table_info(ingestion_jobs)")
+            }
+            for column, statement in MIGRATIONS:
+                if column not in columns:
+                    conn.execute(statement)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_sha256 ON ingestion_jobs (content_sha256)"
+            )
+
+    def start(self):
+        """
+        Starts the dispatcher thread in this process. Call it after forking;
+        it waits until this process becomes the ingestion leader.
+        """
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(
+            target=self._dispatch_loop, name="pdf-ingest-dispatch", daemon=True
+        ).start()
+
+    def _dispatch_loop(self):
+        while not self._leader.try_acquire():
+            time.sleep(self.poll_interval * 5)
+        print(f"✅ [SUCCESS] Process {os.getpid()} is dispatching PDF ingestion jobs")
+        self._resume_unfinished_jobs()
+        while True:
+            try:
+                self._dispatch_queued()
+            except Exception as e:
+                print(f"❌ [ERROR] Ingestion dispatch failed: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def _dispatch_queued(self):
+        while True:
+            with self._lock:
+                if self._in_flight >= self.max_workers:
+                    return
+            job_id = self._claim_next_job()
+            if not job_id:
+                return
+            with self._lock:
+                self._in_flight += 1
+            self._pool.submit(self._run_claimed_job, job_id)
+
+    def _claim_next_job(self) -> Optional[str]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT job_id FROM ingestion_jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (STATUS_QUEUED,),
+            ).fetchone()
+            if not row:
+                return None
+            claimed = conn.execute(
+                "UPDATE ingestion_jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (STATUS_EXTRACTING, _now(), row["job_id"], STATUS_QUEUED),
+            ).rowcount
+        return row["job_id"] if claimed else None
+
+    def _run_claimed_job(self, job_id: str):
+        try:
+            self._run_job(job_id)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._wakeup.set()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = _now()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                f"UPDATE ingestion_jobs SET {assignments} WHERE job_id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def spool_path(self, job_id: str) -> str:
+        return os.path.join(self.spool_dir, f"{job_id}.pdf")
+
+    def new_job_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def submit(
+        self,
+        job_id: str,
+        file_path: str,
+        filename: str,
+        user_id: Optional[str] = None,
+        document_type: str = "policy",
+        metadata: Optional[Dict[str, Any]] = None,
+        content_sha256: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Records a queued job for an already spooled file; the leader picks it up."""
+        now = _now()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO ingestion_jobs (
+                    job_id, status, filename, file_path, user_id, document_type,
+                    metadata, content_sha256, created_at, updated_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    STATUS_QUEUED,
+                    filename,
+                    file_path,
+                    user_id,
+                    document_type,
+                    json.dumps(metadata or {}),
+                    content_sha256,
+                    now,
+                    now,
+                ),
+            )
+        self.start()
+        self._wakeup.set()
+        print(f"📥 [INFO] Queued PDF ingestion job {job_id} for {filename}")
+        return self.get_job(job_id)
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the public view of a job, or None if it does not exist."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        return {
+            "job_id": row["job_id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "user_id": row["user_id"],
+            "document_type": row["document_type"],
+            "content_sha256": row["content_sha256"],
+            "chunks_total": row["chunks_total"],
+            "chunks_done": row["chunks_done"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def find_indexed_document(self, content_sha256: str) -> Optional[Dict[str, Any]]:
+        """Returns the already indexed document with this content hash, if any."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT * FROM indexed_documents WHERE content_sha256 = ?",
+                (content_sha256,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_active_job(self, content_sha256: str) -> Optional[Dict[str, Any]]:
+        """Returns an unfinished job ingesting the same content, if any."""
+        placeholders = ", ".join("?" * len(ACTIVE_STATUSES))
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT job_id FROM ingestion_jobs WHERE content_sha256 = ? AND status IN ({placeholders})",
+                (content_sha256, *ACTIVE_STATUSES),
+            ).fetchone()
+        return self.get_job(row["job_id"]) if row else None
+
+    def _resume_unfinished_jobs(self):
+        """
+        Re-queues jobs interrupted by the previous leader, or fails them if the
+        file is gone. Only the leader runs this, so no live process owns them.
+        """
+        interrupted = (STATUS_EXTRACTING, STATUS_EMBEDDING)
+        placeholders = ", ".join("?" * len(interrupted))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT job_id, file_path FROM ingestion_jobs WHERE status IN ({placeholders})",
+                interrupted,
+            ).fetchall()
+        for row in rows:
+            if os.path.exists(row["file_path"]):
+                print(f"🔄 [INFO] Resuming PDF ingestion job {row['job_id']}")
+                self._update(
+                    row["job_id"], status=STATUS_QUEUED, chunks_done=0, error=None
+                )
+            else:
+                self._update(
+                    row["job_id"],
+                    status=STATUS_FAILED,
+                    error="Uploaded file was lost before ingestion finished.",
+                )
+
+    def _record_indexed_document(self, job: sqlite3.Row, result: Dict[str, Any]):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO indexed_documents (
+                    content_sha256, document_id, filename, chunk_count, job_id, indexed_at
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job["content_sha256"],
+                    result["document_id"],
+                    job["filename"],
+                    result["chunk_count"],
+                    job["job_id"],
+                    _now(),
+                ),
+            )
+
+    def _run_job(self, job_id: str):
+        from uploads.pdf_processor import pdf_processor
+
+        with self._connect() as conn:
+            job = conn.execute(
+                "SELECT * FROM ingestion_jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        if not job:
+            return
+
+        def on_progress(stage: str, done: int, total: int):
+            self._update(job_id, status=stage, chunks_done=done, chunks_total=total)
+
+        try:
+            self._update(job_id, status=STATUS_EXTRACTING)
+            result = pdf_processor.process_pdf(
+                pdf_path=job["file_path"],
+                filename=job["filename"],
+                user_id=job["user_id"],
+                document_type=job["document_type"],
+                metadata={
+                    **json.loads(job["metadata"] or "{}"),
+                    "content_sha256": job["content_sha256"],
+                },
+                progress_callback=on_progress,
+            )
+            if result["success"]:
+                print(
+                    f"✅ [SUCCESS] Ingestion job {job_id} finished: {job['filename']}"
+                )
+                self._update(
+                    job_id,
+                    status=STATUS_DONE,
+                    chunks_done=result["chunk_count"],
+                    chunks_total=result["chunk_count"],
+                    result=json.dumps(result),
+                )
+                if job["content_sha256"]:
+                    self._record_indexed_document(job, result)
+            else:
+                print(
+                    f"❌ [ERROR] Ingestion job {job_id} failed: {result.get('error', 'Unknown error')}"
+                )
+                self._update(
+                    job_id,
+                    status=STATUS_FAILED,
+                    error=result.get("error", "Unknown error"),
+                )
+        except Exception as e:
+            print(f"❌ [ERROR] Ingestion job {job_id} crashed: {e}")
+            traceback.print_exc()
+            self._update(job_id, status=STATUS_FAILED, error=str(e))
+        finally:
+            # The spooled upload is only needed until ingestion ends.
+            if os.path.exists(job["file_path"]):
+                os.unlink(job["file_path"])
+
+
+ingestion_jobs = IngestionJobManager(
+    db_path=config.INGESTION_JOBS_DB_PATH,
+    spool_dir=config.UPLOAD_SPOOL_DIR,
+    max_workers=config.INGESTION_WORKERS,
+    poll_interval=config.INGESTION_POLL_SECONDS,
+)
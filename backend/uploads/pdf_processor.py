@@ -8,7 +8,7 @@ import os
 import uuid
 import hashlib
 import gc
-from typing import List, Dict, Any, Optional
+from typing import Callable, List, Dict, Any, Optional
 import PyPDF2
 import pdfplumber
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -17,7 +17,7 @@ import chromadb
 from langchain_chroma import Chroma
 import config
 import logging
-from sentence_transformers import SentenceTransformer
+from ai.embeddings import get_embeddings
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -87,35 +87,8 @@ class PDFProcessor:
     def _initialize_embeddings(self):
         """Initialize SentenceTransformers embeddings with custom model path"""
         try:
-            logger.info(
-                "Initializing SentenceTransformers embeddings for PDF processing..."
-            )
-
-            # Define custom model path
-            model_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), "ai", "Embedding_models"
-            )
-
-            # Use a lightweight, fast model with custom cache directory
-            model = SentenceTransformer("all-MiniLM-L6-v2", cache_folder=model_path)
-
-            # Create a wrapper class to make it compatible with ChromaDB
-            class SentenceTransformerEmbeddings:
-                def __init__(self, model):
-                    self.model = model
-
-                def embed_query(self, text):
-                    return self.model.encode(text).tolist()
-
-                def embed_documents(self, texts):
-                    return [self.model.encode(text).tolist() for text in texts]
-
-            embeddings = SentenceTransformerEmbeddings(model)
-            logger.info(
-                "✅ SentenceTransformers embeddings initialized successfully for PDF processing"
-            )
-            logger.info(f"📁 Model cached at: {model_path}")
-            return embeddings
+            # Shares the model already loaded for the FAQ retriever, if any.
+            return get_embeddings()
 
         except Exception as e:
             logger.error(
@@ -206,6 +179,7 @@ class PDFProcessor:
         user_id: str = None,
         document_type: str = "policy",
         metadata: Dict[str, Any] = None,
+        progress_callback: Optional[Callable[[str, int, int], None]] = None,
     ) -> Dict[str, Any]:
         """
         Process PDF file and store vectors in ChromaDB.
@@ -216,6 +190,7 @@ class PDFProcessor:
             user_id: User who uploaded the document
             document_type: Type of document (policy, claim, manual, etc.)
             metadata: Additional metadata
+            progress_callback: Optional callable receiving (stage, chunks_done, chunks_total)
 
         Returns:
             Processing result with document ID and chunk count
@@ -244,6 +219,8 @@ class PDFProcessor:
                 }
 
             print(f"✅ Created {len(chunks)} text chunks")
+            if progress_callback:
+                progress_callback("embedding", 0, len(chunks))
 
             # For very large documents, use smaller batch size to avoid memory issues
             if len(chunks) > 20:
@@ -310,6 +287,8 @@ class PDFProcessor:
                     print(
                         f"✅ Batch {batch_idx + 1}/{total_batches}: Stored {len(batch_chunks)} chunks"
                     )
+                    if progress_callback:
+                        progress_callback("embedding", end_idx, len(chunks))
 
                     # Clear batch data to free memory
                     del batch_chunks, batch_metadata, batch_ids
@@ -0,0 +1,119 @@
+# utils/change_counters.py
+"""
+Change counters used to version read-heavy API responses and caches.
+
+Writers call `bump(scope, key)` after they change data; readers build a
+cheap version string from `version(scope, key)` instead of hashing a
+payload. Counters live in a small SQLite file so every server worker
+process sees the same versions. They only see writes made through this
+app, so readers that can be changed from elsewhere (the Supabase
+dashboard, JIRA) combine them with a short revalidation window.
+"""
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+import config
+from utils.process_resources import after_fork, before_fork
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS change_counters (
+    scope TEXT NOT NULL,
+    key TEXT NOT NULL,
+    counter INTEGER NOT NULL,
+    PRIMARY KEY (scope, key)
+);
+CREATE TABLE IF NOT EXISTS change_counters_meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+BUMP_SQL = """
+INSERT INTO change_counters (scope, key, counter) VALUES (?, ?, 1)
+ON CONFLICT (scope, key) DO UPDATE SET counter = counter + 1
+"""
+
+
+class ChangeCounters:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.executescript(CREATE_TABLE_SQL)
+            # The epoch changes if the counters file is ever recreated, so
+            # versions handed out before can never be reused.
+            conn.execute(
+                "INSERT OR IGNORE INTO change_counters_meta (name, value) VALUES ('epoch', ?)",
+                (uuid.uuid4().hex[:8],),
+            )
+        self.epoch = conn.execute(
+            "SELECT value FROM change_counters_meta WHERE name = 'epoch'"
+        ).fetchone()[0]
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def bump(self, scope: str, key: Optional[str] = None) -> str:
+        """
+        Records a change to `scope`, and to `scope`/`key` if a key is given.
+        Returns the new version of the most specific counter.
+        """
+        conn = self._conn()
+        with conn:
+            conn.execute(BUMP_SQL, (scope, ""))
+            if key is not None:
+                conn.execute(BUMP_SQL, (scope, str(key)))
+        return self.version(scope, key)
+
+    def version(self, scope: str, key: Optional[str] = None) -> str:
+        row = (
+            self._conn()
+            .execute(
+                "SELECT counter FROM change_counters WHERE scope = ? AND key = ?",
+                (scope, "" if key is None else str(key)),
+            )
+            .fetchone()
+        )
+        return f"{self.epoch}.{row[0] if row else 0}"
+
+
+def time_bucket(seconds: float) -> int:
+    """Index of the current `seconds`-long window; changes once per window."""
+    return int(time.time() // seconds) if seconds > 0 else 0
+
+
+change_counters = ChangeCounters(config.CHANGE_COUNTERS_DB_PATH)
+
+
+@before_fork("change counters")
+def _close_change_counters():
+    change_counters.close()
+
+
+@after_fork("change counters")
+def _reset_change_counters():
+    # Connections are opened lazily per thread in the worker.
+    change_counters.close()
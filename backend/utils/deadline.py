@@ -0,0 +1,141 @@
+# utils/deadline.py
+"""
+Request deadlines carried through the graph.
+
+A chat request's deadline (a `time.monotonic()` timestamp) is put into the
+graph config, from where LangChain passes it down to every node, agent,
+tool and LLM call of the run. Those consult the remaining budget to stop
+ReAct iterations early, skip LLM retries and skip tool calls when the
+budget is nearly spent, so the user gets a short partial answer instead of
+the request timing out.
+"""
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+# Keys starting with "__" are passed down the run but not saved in
+# checkpoint metadata or traced as run metadata.
+DEADLINE_KEY = "__request_deadline"
+
+# Configurable fields of the agents' LLM clients (see Level1_agent.py and
+# Level2_agent.py), set per call from the remaining budget.
+LLM_MAX_RETRIES_FIELD = "llm_max_retries"
+LLM_TIMEOUT_FIELD = "llm_timeout"
+
+# What AgentExecutor answers when max_execution_time stops it.
+AGENT_STOPPED_OUTPUT = "Agent stopped due to iteration limit or time limit."
+
+OUT_OF_TIME_ANSWER = (
+    "I'm sorry, but I couldn't finish looking into this in time. "
+    "Please try again in a moment or rephrase your question."
+)
+
+
+def with_deadline(run_config: Dict[str, Any], deadline: float) -> Dict[str, Any]:
+    """Returns a copy of a graph config that carries `deadline`."""
+    configurable = dict(run_config.get("configurable") or {})
+    configurable[DEADLINE_KEY] = deadline
+    return {**run_config, "configurable": configurable}
+
+
+def _current_configurable() -> Dict[str, Any]:
+    from langgraph.config import get_config
+
+    try:
+        return get_config().get("configurable") or {}
+    except RuntimeError:
+        # Called outside of a graph run.
+        return {}
+
+
+def remaining_seconds() -> Optional[float]:
+    """Seconds left for the current run, or None if it has no deadline."""
+    deadline = _current_configurable().get(DEADLINE_KEY)
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def budget_nearly_spent(reserve_seconds: float) -> bool:
+    remaining = remaining_seconds()
+    return remaining is not None and remaining < reserve_seconds
+
+
+def agent_run_config() -> Optional[Dict[str, Any]]:
+    """
+    Config for invoking an agent within the remaining budget: each LLM call
+    times out when the budget runs out, and is not retried if a retry could
+    not finish in time. None when the run has no deadline.
+    """
+    configurable = _current_configurable()
+    deadline = configurable.get(DEADLINE_KEY)
+    if deadline is None:
+        return None
+    remaining = max(deadline - time.monotonic(), 0.1)
+    retries = config.LLM_MAX_RETRIES if remaining > 2 * config.DEADLINE_STEP_RESERVE_SECONDS else 0
+    # An explicit configurable replaces the inherited one, so keep the rest.
+    return {
+        "configurable": {
+            **configurable,
+            LLM_MAX_RETRIES_FIELD: retries,
+            LLM_TIMEOUT_FIELD: min(config.LLM_REQUEST_TIMEOUT, remaining),
+        }
+    }
+
+
+def limit_agent_time(agent_executor: Any) -> Any:
+    """
+    Returns the agent executor limited to the remaining budget minus one
+    step's reserve, so the ReAct loop stops starting new iterations in
+    time. The shared executor itself is not modified.
+    """
+    remaining = remaining_seconds()
+    if remaining is None:
+        return agent_executor
+    limit = max(remaining - config.DEADLINE_STEP_RESERVE_SECONDS, 0.1)
+    # The agent factories return the executor wrapped by .with_config().
+    bound = getattr(agent_executor, "bound", None)
+    if bound is None:
+        return agent_executor.model_copy(update={"max_execution_time": limit})
+    return agent_executor.model_copy(
+        update={"bound": bound.model_copy(update={"max_execution_time": limit})}
+    )
+
+
+def stopped_early(output: str) -> bool:
+    return output.strip() == AGENT_STOPPED_OUTPUT
+
+
+def partial_answer(intermediate_steps: Optional[List[Tuple[Any, Any]]]) -> str:
+    """
+    Answer for an agent run cut short by the deadline, including the last
+    tool result it obtained, if any.
+    """
+    observations = [
+        str(observation)
+        for _, observation in intermediate_steps or []
+        if observation and not str(observation).startswith("Skipped:")
+    ]
+    if not observations:
+        return OUT_OF_TIME_ANSWER
+    return (
+        "I'm sorry, I ran out of time before I could finish. "
+        "Here is what I found so far:\n\n"
+        f"{observations[-1][:1500]}"
+    )
+
+
+def deadline_guard(tool_name: str, func):
+    """Wraps a tool function so it is skipped when the budget is nearly spent."""
+
+    def guarded(*args, **kwargs):
+        if budget_nearly_spent(config.DEADLINE_MIN_TOOL_SECONDS):
+            print(f"---DEADLINE: skipping tool {tool_name}---")
+            return (
+                "Skipped: the time budget for this request is nearly spent. "
+                "Give your final answer now with the information you already have."
+            )
+        return func(*args, **kwargs)
+
+    return guarded
@@ -0,0 +1,41 @@
+# utils/fast_json.py
+"""
+JSON decoding for stored blobs (chat history). Uses orjson when it is
+installed and falls back to the standard library otherwise.
+"""
+import ast
+import json
+from typing import Any, List, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def loads_history(raw: Any) -> List[Any]:
+    """
+    Decodes a stored history value into a list of turns. Old rows written as
+    Python literals (single quotes) are read with ast.literal_eval, which
+    only accepts literals and never executes code.
+    """
+    if not raw:
+        return []
+    if isinstance(raw, list):
+        return raw
+    try:
+        history = loads(raw)
+    except ValueError:
+        try:
+            history = ast.literal_eval(raw)
+        except (ValueError, SyntaxError) as e:
+            raise ValueError("Stored history is not valid JSON") from e
+    if not isinstance(history, list):
+        raise ValueError("Stored history is not a list")
+    return history
@@ -0,0 +1,165 @@
+# utils/graph_executor.py
+"""Bounded worker pool with admission control for graph executions.
+
+Every chat turn can run several LLM round trips, so instead of letting each
+Flask request thread call `app_graph.invoke` inline, graph runs are handed to
+a fixed number of workers behind a bounded queue. When the queue is full new
+work is rejected immediately, and work whose deadline passes while it is
+still queued is dropped before it ever reaches the LLM providers.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the executor cannot admit more work."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Graph executor queue is full. Retry after {retry_after}s.")
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(Exception):
+    """Raised when a request's deadline passes before its graph run finishes."""
+
+
+class GraphExecutor:
+    """
+    Runs graph invocations on `max_workers` threads with at most `max_queue`
+    requests waiting behind them.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, stats_window: int = 200):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="graph-worker"
+        )
+        # One slot per running or queued request.
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._expired = 0
+        self._wait_times = deque(maxlen=stats_window)
+        self._run_times = deque(maxlen=stats_window)
+
+    def submit(
+        self, fn: Callable[..., Any], *args, deadline: float, **kwargs
+    ) -> Future:
+        """
+        Admits `fn` for execution or raises QueueFullError straight away.
+        `deadline` is an absolute `time.monotonic()` timestamp; work that is
+        still queued when it passes is skipped.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError(self._estimate_retry_after())
+
+        with self._lock:
+            self._queued += 1
+            self._admitted += 1
+        enqueued_at = time.monotonic()
+
+        def task():
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._wait_times.append(started_at - enqueued_at)
+                if started_at >= deadline:
+                    self._expired += 1
+                    expired = True
+                else:
+                    self._active += 1
+                    expired = False
+            try:
+                if expired:
+                    raise DeadlineExceededError(
+                        "Request deadline passed while waiting in the queue."
+                    )
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    with self._lock:
+                        self._active -= 1
+                        self._run_times.append(time.monotonic() - started_at)
+            finally:
+                self._slots.release()
+
+        def release_if_cancelled(future: Future):
+            # A cancelled task never runs, so its slot is returned here.
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+                    self._expired += 1
+                self._slots.release()
+
+        try:
+            future = self._pool.submit(task)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(release_if_cancelled)
+        return future
+
+    def run(self, fn: Callable[..., Any], *args, deadline: float, **kwargs) -> Any:
+        """Submits `fn` and waits for its result until `deadline`."""
+        future = self.submit(fn, *args, deadline=deadline, **kwargs)
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0))
+        except FutureTimeoutError:
+            # A queued run can still be dropped; a running one finishes in the
+            # background but nobody is waiting for it any more.
+            future.cancel()
+            raise DeadlineExceededError("Request deadline exceeded.")
+
+    def _estimate_retry_after(self) -> int:
+        """Rough time until a slot frees up, based on recent run durations."""
+        with self._lock:
+            avg_run = (
+                sum(self._run_times) / len(self._run_times) if self._run_times else 1.0
+            )
+            backlog = self._queued + self._active
+        return max(1, int(round(avg_run * backlog / self.max_workers)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth, utilization and recent wait/run times."""
+        with self._lock:
+            waits = sorted(self._wait_times)
+            runs = sorted(self._run_times)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queue_depth": self._queued,
+                "admitted_total": self._admitted,
+                "rejected_total": self._rejected,
+                "expired_total": self._expired,
+                "wait_ms": _summarize(waits),
+                "run_ms": _summarize(runs),
+            }
+
+
+def _summarize(sorted_seconds) -> Dict[str, Optional[float]]:
+    if not sorted_seconds:
+        return {"avg": None, "p50": None, "p95": None, "max": None}
+
+    def pick(q):
+        index = min(int(q * len(sorted_seconds)), len(sorted_seconds) - 1)
+        return round(sorted_seconds[index] * 1000, 1)
+
+    return {
+        "avg": round(sum(sorted_seconds) / len(sorted_seconds) * 1000, 1),
+        "p50": pick(0.50),
+        "p95": pick(0.95),
+        "max": round(sorted_seconds[-1] * 1000, 1),
+    }
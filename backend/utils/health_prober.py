@@ -0,0 +1,265 @@
+# utils/health_prober.py
+"""
+Background health probes with cached results.
+
+Registered checks run on their own schedule in a background thread, and
+`/health` returns the cached snapshot, so health polling never adds load to
+a dependency and never waits on a slow one. Every check runs with a
+timeout; a check that is still hanging from an earlier round is reported as
+timed out rather than started again.
+
+With a `snapshot_path`, the background rounds run in one process per host,
+the holder of a lock file next to it, and every process serves the snapshot
+it writes there. Every round, including on-demand ones, runs under a
+second, host-wide lock, so concurrent rounds from different workers are
+shared and the on-demand limit holds for the host.
+
+Checks are tiered: a failing "core" check (database, vector stores,
+checkpointer) makes the process unhealthy, a failing "external" check
+(JIRA, LangSmith) only degrades it.
+"""
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.leader_lock import LeaderLock
+
+try:
+    import fcntl
+except ImportError:  # Windows: development runs a single process anyway.
+    fcntl = None
+
+CORE = "core"
+EXTERNAL = "external"
+# How often a round waiting for another process's round checks the lock.
+ROUND_LOCK_POLL_SECONDS = 0.05
+
+
+class HealthProber:
+    def __init__(
+        self,
+        interval_seconds: float,
+        timeout_seconds: float,
+        deep_min_interval_seconds: float = 0,
+        snapshot_path: Optional[str] = None,
+    ):
+        self.interval_seconds = interval_seconds
+        self.timeout_seconds = timeout_seconds
+        self.deep_min_interval_seconds = deep_min_interval_seconds
+        self.snapshot_path = snapshot_path
+        self._leader = LeaderLock(f"{snapshot_path}.lock") if snapshot_path else None
+        self._checks: List[Tuple[str, str, Callable[[], Optional[str]]]] = []
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh: Optional[float] = None
+        self._pool = None
+        self._thread = None
+
+    def check(self, name: str, tier: str = CORE):
+        """
+        Registers a health check. The function raises on failure and may
+        return a short note (e.g. "not configured") reported with the result.
+        """
+
+        def decorator(fn: Callable[[], Optional[str]]):
+            self._checks.append((name, tier, fn))
+            return fn
+
+        return decorator
+
+    def start(self):
+        """Starts the background probe loop, once per process."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._probe_loop, name="health-prober", daemon=True
+            )
+            self._thread.start()
+
+    def _probe_loop(self):
+        if self._leader is not None:
+            while not self._leader.try_acquire():
+                time.sleep(self.interval_seconds)
+            print(f"✅ [SUCCESS] Process {os.getpid()} is running the health probes")
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"❌ [ERROR] Health probe round failed: {e}")
+            time.sleep(self.interval_seconds)
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # At most one run of each check is in flight at a time.
+                self._pool = ThreadPoolExecutor(
+                    max_workers=max(len(self._checks), 1),
+                    thread_name_prefix="health-check",
+                )
+            return self._pool
+
+    @contextmanager
+    def _round_lock(self) -> Iterator[None]:
+        """Held while a round runs, in this process and (with a snapshot_path) on the host."""
+        with self._refresh_lock:
+            if self.snapshot_path is None or fcntl is None:
+                yield
+                return
+            os.makedirs(os.path.dirname(self.snapshot_path) or ".", exist_ok=True)
+            fd = os.open(f"{self.snapshot_path}.round.lock", os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                # A round takes at most the check timeout, so the wait is bounded.
+                while True:
+                    try:
+                        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        time.sleep(ROUND_LOCK_POLL_SECONDS)
+                yield
+            finally:
+                # Closing the descriptor releases the lock.
+                os.close(fd)
+
+    def _read_shared(self) -> Optional[Dict[str, Any]]:
+        """The snapshot the probing process last wrote, or None."""
+        if self.snapshot_path is None:
+            return None
+        try:
+            with open(self.snapshot_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_shared(self, results: Dict[str, Dict[str, Any]], refreshed_at: float):
+        path = self.snapshot_path
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"refreshed_at": refreshed_at, "pid": os.getpid(), "services": results}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"❌ [ERROR] Could not write the health snapshot: {e}")
+
+    def _refreshed_at(self) -> Optional[float]:
+        """Wall-clock time of the last round on this host (or in this process)."""
+        shared = self._read_shared()
+        if shared is not None:
+            return shared.get("refreshed_at")
+        with self._lock:
+            return self._last_refresh
+
+    def refresh(self) -> Dict[str, Any]:
+        """
+        Runs every check now (each bounded by the timeout) and returns the new
+        snapshot. Concurrent callers, in any process of the host, share one
+        round instead of each probing.
+        """
+        requested_at = time.time()
+        with self._round_lock():
+            last = self._refreshed_at()
+            if last is not None and last >= requested_at:
+                # Another caller finished a round while we waited.
+                return self.snapshot()
+
+            pool = self._executor()
+            started = {}
+            for name, tier, fn in self._checks:
+                future = self._in_flight.get(name)
+                if future is None or future.done():
+                    future = pool.submit(self._timed, fn)
+                    self._in_flight[name] = future
+                    started[name] = True
+                else:
+                    started[name] = False
+
+            deadline = time.monotonic() + self.timeout_seconds
+            for name, tier, fn in self._checks:
+                future = self._in_flight[name]
+                result = {"tier": tier}
+                try:
+                    outcome = future.result(timeout=max(deadline - time.monotonic(), 0))
+                    result.update(outcome)
+                except TimeoutError:
+                    result["status"] = "timeout"
+                    result["error"] = (
+                        f"no response within {self.timeout_seconds:g}s"
+                        if started[name]
+                        else "previous check still running"
+                    )
+                else:
+                    self._in_flight.pop(name, None)
+                result["checked_at"] = datetime.now(timezone.utc).isoformat()
+                with self._lock:
+                    self._results[name] = result
+
+            with self._lock:
+                self._last_refresh = time.time()
+                results = {name: dict(result) for name, result in self._results.items()}
+            if self.snapshot_path is not None:
+                self._write_shared(results, self._last_refresh)
+        return self.snapshot()
+
+    def deep_retry_after(self) -> int:
+        """
+        Seconds until an on-demand round may run, 0 if it may run now. On-demand
+        rounds (/health?deep=1) are limited to one per
+        `deep_min_interval_seconds` per host, counting background rounds too.
+        """
+        last = self._refreshed_at()
+        if last is None or self.deep_min_interval_seconds <= 0:
+            return 0
+        wait = self.deep_min_interval_seconds - (time.time() - last)
+        return max(math.ceil(wait), 0)
+
+    @staticmethod
+    def _timed(fn: Callable[[], Optional[str]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        outcome: Dict[str, Any] = {}
+        try:
+            note = fn()
+            outcome["status"] = "ok"
+            if note:
+                outcome["note"] = note
+        except Exception as e:
+            outcome["status"] = "error"
+            outcome["error"] = str(e)[:200]
+        outcome["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        return outcome
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The cached results and an overall status; never runs a check."""
+        shared = self._read_shared()
+        if shared is not None:
+            services = shared.get("services") or {}
+            last = shared.get("refreshed_at")
+        else:
+            with self._lock:
+                services = {name: dict(result) for name, result in self._results.items()}
+                last = self._last_refresh
+        age = None if last is None else round(max(time.time() - last, 0), 1)
+
+        if not services:
+            status = "unknown"
+        elif any(
+            s["status"] != "ok" for s in services.values() if s["tier"] == CORE
+        ):
+            status = "unhealthy"
+        elif any(s["status"] != "ok" for s in services.values()):
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {
+            "status": status,
+            "timestamp": str(datetime.now()),
+            "snapshot_age_seconds": age,
+            "services": services,
+        }
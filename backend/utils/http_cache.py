@@ -0,0 +1,122 @@
+# utils/http_cache.py
+"""
+Conditional GET and response compression for polled read endpoints.
+
+`conditional(version_fn)` tags a view's response with a strong ETag derived
+from a cheap version string (change counters, cache timestamps) that is
+computed *before* the view runs, so a matching `If-None-Match` is answered
+with 304 without querying any backend or serializing anything.
+
+`install_compression(app, ...)` gzip- or brotli-encodes large JSON bodies
+for clients that accept it. Brotli is used only if the optional `brotli`
+package is installed.
+"""
+import gzip
+import hashlib
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from flask import Flask, Response, make_response, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {"application/json"}
+
+
+def _etag_for(version: str) -> str:
+    # The full path (with query string) is part of the tag so differently
+    # filtered or paginated views of the same data never share an ETag.
+    digest = hashlib.sha1(f"{request.full_path}|{version}".encode()).hexdigest()
+    return digest[:32]
+
+
+def conditional(version_fn: Callable[..., Optional[str]]):
+    """
+    Decorator for Flask GET views. `version_fn` receives the view's keyword
+    arguments and returns a string that changes whenever the response would,
+    or None to skip caching for this request.
+    """
+
+    def decorator(view: Callable[..., Any]):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                version = version_fn(**kwargs)
+            except Exception as e:
+                print(f"⚠️ [WARNING] Could not compute response version: {e}")
+                version = None
+            if version is None:
+                return view(*args, **kwargs)
+
+            etag = _etag_for(version)
+            # Compressed representations carry a suffixed tag (see
+            # compress_response), so accept those as a match too.
+            candidates = [etag, f"{etag}-gzip", f"{etag}-br"]
+            if any(request.if_none_match.contains(tag) for tag in candidates):
+                response = Response(status=304)
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = "no-cache"
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers["Cache-Control"] = "no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _choose_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted["br"]:
+        return "br"
+    if accepted["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress_response(response: Response, min_bytes: int, level: int) -> Response:
+    """Compresses a buffered JSON response in place when it is worth it."""
+    if (
+        response.direct_passthrough
+        or response.is_streamed
+        or response.status_code != 200
+        or response.mimetype not in COMPRESSIBLE_MIMETYPES
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    body = response.get_data()
+    if len(body) < min_bytes:
+        return response
+
+    encoding = _choose_encoding()
+    if encoding is None:
+        return response
+
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=min(level, 11))
+    else:
+        compressed = gzip.compress(body, compresslevel=min(level, 9))
+
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = encoding
+    etag, is_weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak=is_weak)
+    return response
+
+
+def install_compression(app: Flask, min_bytes: int, level: int):
+    """Registers an after_request hook that compresses large JSON responses."""
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, min_bytes, level)
@@ -0,0 +1,295 @@
+# utils/idempotency.py
+"""Idempotency-Key support for endpoints that run the LLM graph.
+
+A retried request carrying the same `Idempotency-Key` header as an earlier
+one either waits for the execution that is still in flight or gets the
+stored response replayed, so the graph never runs twice for the same
+logical request. Keys live in a small SQLite file, so a retry is
+deduplicated whichever worker process of the host it reaches.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import Response, jsonify, make_response, request
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+# Retryable outcomes are not stored, so a retry gets a fresh attempt.
+NON_CACHEABLE_STATUSES = {408, 409, 425, 429}
+
+# How often a waiting request checks whether the execution it waits for
+# has stored its response.
+POLL_INTERVAL_SECONDS = 0.1
+MAX_POLL_INTERVAL_SECONDS = 0.5
+# Expired keys are deleted at most this often per process.
+PURGE_INTERVAL_SECONDS = 30
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    state TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    status INTEGER,
+    headers TEXT,
+    body BLOB
+);
+CREATE INDEX IF NOT EXISTS idempotency_keys_expiry
+    ON idempotency_keys (state, expires_at);
+"""
+
+# (body, status code, headers) of a response.
+Snapshot = Tuple[bytes, int, List[Tuple[str, str]]]
+
+
+class IdempotencyConflictError(Exception):
+    """Raised when a key is reused with a different request body."""
+
+
+class IdempotencyStore:
+    """
+    Keys of in-flight executions and completed responses, shared by the
+    worker processes through a SQLite file. The first request claims its
+    key with an insert that does nothing if the key exists; later requests
+    with the key poll until its response is stored. An in-flight claim
+    expires after the wait timeout (its worker died), completed responses
+    after `ttl_seconds`, and the oldest completed ones are evicted beyond
+    `max_entries`.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float, max_entries: int):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        self._counts_lock = threading.Lock()
+        self._next_purge = 0.0
+        self._executions = 0
+        self._joins = 0
+        self._replays = 0
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._conn().executescript(CREATE_TABLE_SQL)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _count(self, name: str):
+        with self._counts_lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def _purge(self, conn: sqlite3.Connection):
+        now = time.time()
+        if now < self._next_purge:
+            return
+        self._next_purge = now + PURGE_INTERVAL_SECONDS
+        conn.execute("DELETE FROM idempotency_keys WHERE expires_at <= ?", (now,))
+        conn.execute(
+            "DELETE FROM idempotency_keys WHERE key IN ("
+            "SELECT key FROM idempotency_keys WHERE state = 'done' "
+            "ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def _claim(self, conn: sqlite3.Connection, key: str, fingerprint: str, lease: float) -> bool:
+        """Claims `key` for this request; False if another request holds it."""
+        now = time.time()
+        # A claim whose execution outlived its lease was abandoned.
+        conn.execute(
+            "DELETE FROM idempotency_keys WHERE key = ? AND expires_at <= ?", (key, now)
+        )
+        return (
+            conn.execute(
+                "INSERT INTO idempotency_keys (key, fingerprint, state, expires_at) "
+                "VALUES (?, ?, 'running', ?) ON CONFLICT (key) DO NOTHING",
+                (key, fingerprint, now + lease),
+            ).rowcount
+            == 1
+        )
+
+    def _stored(self, conn: sqlite3.Connection, key: str) -> Optional[Tuple[str, str, Optional[Snapshot]]]:
+        """(fingerprint, state, snapshot if done) of a key, or None."""
+        row = conn.execute(
+            "SELECT fingerprint, state, status, headers, body FROM idempotency_keys "
+            "WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        fingerprint, state, status, headers, body = row
+        if state != "done":
+            return fingerprint, state, None
+        return fingerprint, state, (bytes(body), status, [tuple(h) for h in json.loads(headers)])
+
+    def run(
+        self,
+        key: str,
+        fingerprint: str,
+        fn: Callable[[], Snapshot],
+        cacheable: Callable[[Snapshot], bool],
+        wait_timeout: float,
+    ) -> Tuple[Snapshot, str]:
+        """
+        Returns `(snapshot, source)` where source is "executed", "joined" or
+        "replayed". Only snapshots for which `cacheable(snapshot)` is true
+        are kept; a request waiting on one that is not runs again itself.
+        Raises TimeoutError if the execution it waits for is still running
+        after `wait_timeout`.
+        """
+        conn = self._conn()
+        self._purge(conn)
+        waited_until = time.monotonic() + wait_timeout
+        interval = POLL_INTERVAL_SECONDS
+        joined = False
+        while True:
+            # The lease covers the longest execution a request waits for.
+            if self._claim(conn, key, fingerprint, wait_timeout + 60):
+                break
+            stored = self._stored(conn, key)
+            if stored is not None:
+                stored_fingerprint, state, snapshot = stored
+                if stored_fingerprint != fingerprint:
+                    raise IdempotencyConflictError(key)
+                if snapshot is not None:
+                    self._count("_joins" if joined else "_replays")
+                    return snapshot, "joined" if joined else "replayed"
+                joined = True
+            if time.monotonic() >= waited_until:
+                raise FutureTimeoutError(key)
+            time.sleep(interval)
+            interval = min(interval * 2, MAX_POLL_INTERVAL_SECONDS)
+
+        self._count("_executions")
+        try:
+            snapshot = fn()
+        except BaseException:
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+            raise
+        if cacheable(snapshot):
+            body, status, headers = snapshot
+            conn.execute(
+                "UPDATE idempotency_keys SET state = 'done', expires_at = ?, "
+                "status = ?, headers = ?, body = ? WHERE key = ?",
+                (time.time() + self.ttl_seconds, status, json.dumps(headers), body, key),
+            )
+        else:
+            conn.execute("DELETE FROM idempotency_keys WHERE key = ?", (key,))
+        return snapshot, "executed"
+
+    def stats(self) -> Dict[str, int]:
+        rows = dict(
+            self._conn()
+            .execute(
+                "SELECT state, COUNT(*) FROM idempotency_keys WHERE expires_at > ? GROUP BY state",
+                (time.time(),),
+            )
+            .fetchall()
+        )
+        with self._counts_lock:
+            return {
+                "in_flight": rows.get("running", 0),
+                "stored": rows.get("done", 0),
+                "executions_total": self._executions,
+                "joins_total": self._joins,
+                "replays_total": self._replays,
+            }
+
+
+def idempotent(store: IdempotencyStore, wait_timeout: float):
+    """
+    Decorator for Flask views. Requests without an Idempotency-Key header
+    run as usual; requests with one are deduplicated per method, path and
+    key through `store`, across the host's worker processes.
+    """
+
+    def decorator(view: Callable[..., Any]):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not key:
+                return view(*args, **kwargs)
+
+            scoped_key = f"{request.method}:{request.path}:{key}"
+            fingerprint = hashlib.sha256(request.get_data()).hexdigest()
+
+            def execute():
+                response = make_response(view(*args, **kwargs))
+                # Snapshot the response so it can be rebuilt for other requests.
+                return (
+                    response.get_data(),
+                    response.status_code,
+                    [
+                        (name, value)
+                        for name, value in response.headers.items()
+                        if name.lower() not in ("content-length", "set-cookie")
+                    ],
+                )
+
+            def cacheable(snapshot) -> bool:
+                status = snapshot[1]
+                return status < 500 and status not in NON_CACHEABLE_STATUSES
+
+            try:
+                snapshot, source = store.run(
+                    scoped_key, fingerprint, execute, cacheable, wait_timeout
+                )
+            except IdempotencyConflictError:
+                return (
+                    jsonify(
+                        {
+                            "error": "Idempotency-Key was already used with a different request body."
+                        }
+                    ),
+                    422,
+                )
+            except FutureTimeoutError:
+                return (
+                    jsonify(
+                        {
+                            "error": "A request with this Idempotency-Key is still being processed."
+                        }
+                    ),
+                    409,
+                )
+
+            if source != "executed":
+                print(f"---IDEMPOTENCY: {source.upper()} {scoped_key}---")
+            body, status, headers = snapshot
+            response = Response(body, status=status, headers=headers)
+            response.headers[REPLAYED_HEADER] = (
+                "false" if source == "executed" else "true"
+            )
+            return response
+
+        return wrapper
+
+    return decorator
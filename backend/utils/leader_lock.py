@@ -0,0 +1,48 @@
+# utils/leader_lock.py
+"""
+Single-process leadership across forked workers.
+
+Background work that must run in exactly one process (dispatching ingestion
+jobs, warming the metrics cache) is guarded by an exclusive, non-blocking
+`flock` on a lock file. The lock is released by the kernel when its holder
+exits, so another worker can take over. Acquire it only after forking: a
+lock held by the master would be shared by every child.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: development runs a single process anyway.
+    fcntl = None
+
+
+class LeaderLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+        self._lock = threading.Lock()
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def try_acquire(self) -> bool:
+        """Returns True if this process holds (or just acquired) the lock."""
+        with self._lock:
+            if self._fd is not None:
+                return True
+            if fcntl is None:
+                self._fd = -1
+                return True
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode())
+            self._fd = fd
+            return True
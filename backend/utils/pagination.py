@@ -0,0 +1,47 @@
+# utils/pagination.py
+"""
+Helpers for keyset (cursor) pagination.
+
+A cursor is the sort key of the last row on a page, encoded as an opaque
+URL-safe string. The next page starts strictly after that key, so the cost
+of a page does not grow with how far the client has paged.
+"""
+import base64
+import json
+from typing import Any, List, Optional
+
+import config
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor that cannot be decoded."""
+
+
+def encode_cursor(values: List[Any]) -> str:
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List[Any]]:
+    """Decodes a cursor holding a sort key of `size` values, or None if absent."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+
+def parse_limit(value: Optional[str]) -> int:
+    """Clamps a requested page size to 1..PAGE_SIZE_MAX (default PAGE_SIZE_DEFAULT)."""
+    if value in (None, ""):
+        return config.PAGE_SIZE_DEFAULT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError("limit must be an integer")
+    return max(1, min(limit, config.PAGE_SIZE_MAX))
@@ -0,0 +1,111 @@
+# utils/process_memory.py
+"""
+Memory usage of the server processes, read from /proc (Linux).
+
+RSS counts shared pages in full for every process, so under the pre-fork
+server the sum of worker RSS overstates real usage. PSS splits each shared
+page between the processes mapping it, and the shared/private split shows
+how much of the master's preloaded state (embedding model, FAQ index) is
+still shared copy-on-write.
+"""
+import os
+from typing import Any, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SMAPS_FIELDS = {
+    "Rss": "rss_kb",
+    "Pss": "pss_kb",
+    "Shared_Clean": "shared_clean_kb",
+    "Shared_Dirty": "shared_dirty_kb",
+    "Private_Clean": "private_clean_kb",
+    "Private_Dirty": "private_dirty_kb",
+}
+
+
+def _read_smaps_rollup(pid: int) -> Optional[Dict[str, int]]:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    usage = {}
+    for line in lines:
+        parts = line.split()
+        if len(parts) >= 2 and parts[0].rstrip(":") in SMAPS_FIELDS:
+            usage[SMAPS_FIELDS[parts[0].rstrip(":")]] = int(parts[1])
+    return usage
+
+
+def _read_status_rss(pid: int) -> Optional[Dict[str, int]]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return {"rss_kb": int(line.split()[1])}
+    except OSError:
+        pass
+    return None
+
+
+def process_memory(pid: int) -> Dict[str, Any]:
+    """Memory usage of one process in KiB (RSS, PSS, shared and private)."""
+    usage = _read_smaps_rollup(pid) or _read_status_rss(pid)
+    if usage is None and pid == os.getpid() and resource is not None:
+        # No /proc (macOS/Windows): peak RSS of this process is all we have.
+        usage = {"max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}
+    usage = usage or {}
+    if "shared_clean_kb" in usage:
+        usage["shared_kb"] = usage["shared_clean_kb"] + usage["shared_dirty_kb"]
+        usage["private_kb"] = usage["private_clean_kb"] + usage["private_dirty_kb"]
+    return {"pid": pid, **usage}
+
+
+def child_pids(parent_pid: int) -> List[int]:
+    """Direct children of `parent_pid`, found by scanning /proc."""
+    children = []
+    try:
+        entries = os.listdir("/proc")
+    except OSError:
+        return children
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after ')'.
+        fields = stat[stat.rfind(")") + 2 :].split()
+        if len(fields) > 1 and int(fields[1]) == parent_pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def server_memory_report(master_pid: Optional[int]) -> Dict[str, Any]:
+    """
+    Memory of the master and all of its workers when running pre-forked,
+    otherwise of this process alone.
+    """
+    if master_pid is None:
+        workers = [process_memory(os.getpid())]
+        master = None
+    else:
+        workers = [process_memory(pid) for pid in child_pids(master_pid)]
+        master = process_memory(master_pid)
+
+    totals = {}
+    for key in ("rss_kb", "pss_kb", "shared_kb", "private_kb"):
+        values = [w[key] for w in workers if key in w]
+        if values:
+            totals[key] = sum(values)
+    return {
+        "current_pid": os.getpid(),
+        "master": master,
+        "workers": workers,
+        "worker_totals": totals,
+    }
@@ -0,0 +1,67 @@
+# utils/process_resources.py
+"""
+Fork hooks for per-process resources.
+
+Under the pre-fork server (see gunicorn.conf.py) the app is imported once in
+the master and workers are forked from it. Read-only objects such as the
+embedding model and the FAQ index are then shared copy-on-write, but
+connections, pools and HTTP clients must not cross a fork. Modules that own
+such resources register a `before_fork` hook to release them in the master
+and an `after_fork` hook to recreate them in each worker.
+"""
+import os
+from typing import Callable, List, Optional, Tuple
+
+from utils.startup_timeline import startup_timeline
+
+_before_fork_hooks: List[Tuple[str, Callable[[], None]]] = []
+_after_fork_hooks: List[Tuple[str, Callable[[], None]]] = []
+_master_pid: Optional[int] = None
+
+
+def before_fork(name: str):
+    """Registers a function that releases a per-process resource in the master."""
+
+    def decorator(fn: Callable[[], None]):
+        _before_fork_hooks.append((name, fn))
+        return fn
+
+    return decorator
+
+
+def after_fork(name: str):
+    """Registers a function that (re)creates a per-process resource in a worker."""
+
+    def decorator(fn: Callable[[], None]):
+        _after_fork_hooks.append((name, fn))
+        return fn
+
+    return decorator
+
+
+def _run(hooks: List[Tuple[str, Callable[[], None]]], phase: str):
+    for name, fn in hooks:
+        try:
+            with startup_timeline.step(f"{phase}: {name}"):
+                fn()
+        except Exception as e:
+            print(f"❌ [ERROR] {phase} hook '{name}' failed in pid {os.getpid()}: {e}")
+            raise
+
+
+def run_before_fork_hooks():
+    _run(_before_fork_hooks, "before_fork")
+
+
+def run_after_fork_hooks():
+    global _master_pid
+    _master_pid = os.getppid()
+    # The worker's timeline starts at the fork.
+    startup_timeline.reset()
+    _run(_after_fork_hooks, "after_fork")
+    startup_timeline.log()
+
+
+def master_pid() -> Optional[int]:
+    """Pid of the pre-fork master, or None when not running as a forked worker."""
+    return _master_pid
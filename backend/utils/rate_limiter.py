@@ -0,0 +1,285 @@
+# utils/rate_limiter.py
+"""
+Token-bucket rate limiting for the LLM-backed endpoints.
+
+Every chat turn can make several LLM round trips, so requests are limited
+both by count and by an estimate of the LLM tokens they will use, per user
+and globally. A request is admitted only if all four buckets (user
+requests, user tokens, global requests, global tokens) can pay for it, and
+then it is charged to all of them at once. A bucket of capacity `burst`
+refills continuously at `per_minute / 60` per second.
+
+Buckets live in a small SQLite file so the limits hold across all server
+worker processes, not per worker.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from flask import jsonify, make_response
+
+import config
+from utils.process_resources import after_fork, before_fork
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+    key TEXT PRIMARY KEY,
+    level REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class BucketLimit:
+    """`per_minute` refill rate and `burst` capacity; a rate of 0 disables it."""
+
+    def __init__(self, per_minute: float, burst: float):
+        self.per_minute = per_minute
+        self.burst = burst
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_minute > 0 and self.burst > 0
+
+    @property
+    def per_second(self) -> float:
+        return self.per_minute / 60.0
+
+
+class RateLimitDecision:
+    def __init__(
+        self,
+        allowed: bool,
+        remaining_requests: Optional[int],
+        remaining_tokens: Optional[int],
+    ):
+        self.allowed = allowed
+        self.remaining_requests = remaining_requests
+        self.remaining_tokens = remaining_tokens
+        self.retry_after = 0
+        self.limited_by: Optional[str] = None
+
+    def headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.remaining_requests is not None:
+            headers["X-RateLimit-Remaining-Requests"] = str(self.remaining_requests)
+        if self.remaining_tokens is not None:
+            headers["X-RateLimit-Remaining-Tokens"] = str(self.remaining_tokens)
+        if not self.allowed:
+            headers["Retry-After"] = str(self.retry_after)
+        return headers
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        db_path: str,
+        user_requests: BucketLimit,
+        user_tokens: BucketLimit,
+        global_requests: BucketLimit,
+        global_tokens: BucketLimit,
+    ):
+        self.db_path = db_path
+        self.limits = {
+            "user_requests": user_requests,
+            "user_tokens": user_tokens,
+            "global_requests": global_requests,
+            "global_tokens": global_tokens,
+        }
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.executescript(CREATE_TABLE_SQL)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=30,
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def close(self):
+        """Closes every connection opened by this process."""
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+    def _buckets(self, user_id: str, tokens: int) -> List[Tuple[str, str, BucketLimit, float]]:
+        """(name, bucket key, limit, cost) for every enabled bucket."""
+        costs = {
+            "user_requests": (f"user:{user_id}:requests", 1),
+            "user_tokens": (f"user:{user_id}:tokens", tokens),
+            "global_requests": ("global:requests", 1),
+            "global_tokens": ("global:tokens", tokens),
+        }
+        return [
+            (name, key, self.limits[name], cost)
+            for name, (key, cost) in costs.items()
+            if self.limits[name].enabled
+        ]
+
+    def acquire(self, user_id: str, tokens: int) -> RateLimitDecision:
+        """
+        Charges one request and `tokens` estimated LLM tokens to the user's
+        and the global buckets, or charges nothing and reports how long to
+        wait if any of them cannot pay.
+        """
+        buckets = self._buckets(user_id, tokens)
+        if not buckets:
+            return RateLimitDecision(True, None, None)
+
+        conn = self._conn()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            levels = {}
+            for name, key, limit, cost in buckets:
+                row = conn.execute(
+                    "SELECT level, updated_at FROM rate_limit_buckets WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if row is None:
+                    level = limit.burst
+                else:
+                    elapsed = max(now - row[1], 0)
+                    level = min(limit.burst, row[0] + elapsed * limit.per_second)
+                levels[name] = level
+
+            short = [
+                (name, limit, cost)
+                for name, key, limit, cost in buckets
+                if levels[name] < min(cost, limit.burst)
+            ]
+            allowed = not short
+            if allowed:
+                # A request costing more than the whole burst is still let
+                # through when the bucket is full, leaving it in debt.
+                for name, key, limit, cost in buckets:
+                    levels[name] -= cost
+                    conn.execute(
+                        "INSERT INTO rate_limit_buckets (key, level, updated_at) VALUES (?, ?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET level = excluded.level, updated_at = excluded.updated_at",
+                        (key, levels[name], now),
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+        remaining = {
+            kind: [
+                max(int(levels[name]), 0)
+                for name, _, _, _ in buckets
+                if name.endswith(kind)
+            ]
+            for kind in ("requests", "tokens")
+        }
+        decision = RateLimitDecision(
+            allowed,
+            min(remaining["requests"]) if remaining["requests"] else None,
+            min(remaining["tokens"]) if remaining["tokens"] else None,
+        )
+        if not allowed:
+            waits = {
+                name: (min(cost, limit.burst) - levels[name]) / limit.per_second
+                for name, limit, cost in short
+            }
+            decision.limited_by = max(waits, key=waits.get)
+            decision.retry_after = max(1, math.ceil(max(waits.values())))
+        return decision
+
+
+def estimate_llm_tokens(query: str, tokens_per_turn: int) -> int:
+    """
+    Rough LLM token cost of one chat turn: a fixed allowance for prompts,
+    history, tool results and the answer, plus about 4 characters per token
+    for the query itself.
+    """
+    return tokens_per_turn + math.ceil(len(query or "") / 4)
+
+
+def rate_limited(limiter: RateLimiter, cost_fn: Callable[[], Optional[Tuple[str, int]]]):
+    """
+    Decorator for Flask views that run the graph. `cost_fn` reads the request
+    and returns (user_id, estimated tokens), or None to let the view handle
+    an invalid request itself. Rejected requests get 429 with Retry-After;
+    all responses carry the remaining-budget headers.
+    """
+
+    def decorator(view: Callable[..., Any]):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cost = cost_fn()
+            if cost is None:
+                return view(*args, **kwargs)
+            user_id, tokens = cost
+            try:
+                decision = limiter.acquire(user_id, tokens)
+            except sqlite3.Error as e:
+                # Never turn a limiter outage into a chat outage.
+                print(f"⚠️ [WARNING] Rate limiter unavailable, request not limited: {e}")
+                return view(*args, **kwargs)
+
+            if not decision.allowed:
+                print(
+                    f"---RATE LIMITED {user_id}: {decision.limited_by}, retry after {decision.retry_after}s---"
+                )
+                response = jsonify(
+                    {
+                        "response": "You are sending messages too quickly. Please wait a moment and try again.",
+                        "retry_after": decision.retry_after,
+                        "limited_by": decision.limited_by,
+                    }
+                )
+                response.status_code = 429
+            else:
+                response = make_response(view(*args, **kwargs))
+            response.headers.update(decision.headers())
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+def _limit(prefix: str) -> BucketLimit:
+    return BucketLimit(
+        getattr(config, f"{prefix}_PER_MINUTE"), getattr(config, f"{prefix}_BURST")
+    )
+
+
+rate_limiter = RateLimiter(
+    config.RATE_LIMIT_DB_PATH,
+    user_requests=_limit("RATE_LIMIT_USER_REQUESTS"),
+    user_tokens=_limit("RATE_LIMIT_USER_TOKENS"),
+    global_requests=_limit("RATE_LIMIT_GLOBAL_REQUESTS"),
+    global_tokens=_limit("RATE_LIMIT_GLOBAL_TOKENS"),
+)
+
+
+@before_fork("rate limiter")
+def _close_rate_limiter():
+    rate_limiter.close()
+
+
+@after_fork("rate limiter")
+def _reset_rate_limiter():
+    # Connections are opened lazily per thread in the worker.
+    rate_limiter.close()
@@ -0,0 +1,110 @@
+# utils/readiness.py
+"""
+Readiness gating with a warm-up phase.
+
+`/health` only says the process is up. A process is *ready* once its
+registered warm-up steps have run: the first embedding forward pass, the
+first FAQ retrieval, opening database connections and priming the
+checkpointer. Each of these otherwise lands on the first real chat request.
+Warm-up runs in a background thread of each serving process (after the
+fork under the pre-fork server); failed steps are retried until they pass.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.startup_timeline import startup_timeline
+
+
+class Readiness:
+    def __init__(self, retry_seconds: float):
+        self.retry_seconds = retry_seconds
+        self._steps: List[Tuple[str, Callable[[], Optional[str]]]] = []
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._state = "pending"
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._started_at = None
+        self._ready_after_ms = None
+        self._thread = None
+
+    def warmup_step(self, name: str):
+        """
+        Registers a warm-up step. The function may return a short note
+        (e.g. "not configured") that is reported with the step.
+        """
+
+        def decorator(fn: Callable[[], Optional[str]]):
+            self._steps.append((name, fn))
+            return fn
+
+        return decorator
+
+    def start(self):
+        """Starts warm-up in the background, once per process."""
+        with self._lock:
+            if self._pid != os.getpid():
+                # Forked from a process that already started: warm up again.
+                self._reset()
+            if self._thread is not None:
+                return
+            self._state = "warming"
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(
+                target=self._warm_up, name="warmup", daemon=True
+            )
+            self._thread.start()
+
+    def _run_step(self, name: str, fn: Callable[[], Optional[str]]) -> bool:
+        started = time.perf_counter()
+        result: Dict[str, Any] = {}
+        try:
+            with startup_timeline.step(f"warmup: {name}"):
+                note = fn()
+            result["status"] = "ok"
+            if note:
+                result["note"] = note
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = str(e)[:200]
+            print(f"⚠️ [WARNING] Warm-up step '{name}' failed: {e}")
+        result["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        with self._lock:
+            self._results[name] = result
+        return result["status"] == "ok"
+
+    def _warm_up(self):
+        pending = list(self._steps)
+        while True:
+            pending = [(name, fn) for name, fn in pending if not self._run_step(name, fn)]
+            if not pending:
+                break
+            with self._lock:
+                self._state = "failed"
+            time.sleep(self.retry_seconds)
+
+        with self._lock:
+            self._state = "ready"
+            self._ready_after_ms = round(
+                (time.perf_counter() - self._started_at) * 1000, 1
+            )
+        print(
+            f"✅ [SUCCESS] Warm-up finished in {self._ready_after_ms} ms (pid {os.getpid()})"
+        )
+
+    @property
+    def is_ready(self) -> bool:
+        return self._state == "ready" and self._pid == os.getpid()
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "status": self._state if self._pid == os.getpid() else "pending",
+                "pid": os.getpid(),
+                "warmup_ms": self._ready_after_ms,
+                "steps": dict(self._results),
+            }
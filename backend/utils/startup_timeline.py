@@ -0,0 +1,100 @@
+# utils/startup_timeline.py
+"""
+Timing of the steps that make up server startup.
+
+Each step records when it started (relative to the first import of this
+module, which app.py does first, or to the fork for a worker), how long it
+took, the thread it ran on and whether it failed, so a slow cold start can
+be traced to the subsystem responsible. Independent steps can be run
+concurrently with `run_parallel`; most of their time is spent on disk and
+network I/O (model files, SQLite, Chroma), which overlaps well in threads.
+"""
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List
+
+
+class StartupTimeline:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Starts a new timeline, e.g. in a freshly forked worker."""
+        with self._lock:
+            self._origin = time.perf_counter()
+            self._steps: List[Dict[str, Any]] = []
+
+    def _now_ms(self) -> float:
+        return round((time.perf_counter() - self._origin) * 1000, 1)
+
+    @contextmanager
+    def step(self, name: str):
+        """Times the enclosed block as one startup step."""
+        entry = {
+            "name": name,
+            "start_ms": self._now_ms(),
+            "thread": threading.current_thread().name,
+            "pid": os.getpid(),
+        }
+        try:
+            yield
+            entry["status"] = "ok"
+        except Exception as e:
+            entry["status"] = "error"
+            entry["error"] = str(e)
+            raise
+        finally:
+            entry["duration_ms"] = round(self._now_ms() - entry["start_ms"], 1)
+            with self._lock:
+                self._steps.append(entry)
+
+    def mark(self, name: str):
+        """Records a zero-length milestone, e.g. "ready"."""
+        with self.step(name):
+            pass
+
+    def run_parallel(self, steps: Dict[str, Callable[[], Any]]) -> Dict[str, Any]:
+        """
+        Runs independent steps concurrently and returns their results by name.
+        Waits for all of them; the first failure is re-raised afterwards.
+        """
+
+        def timed(name, fn):
+            with self.step(name):
+                return fn()
+
+        with ThreadPoolExecutor(
+            max_workers=len(steps), thread_name_prefix="startup"
+        ) as pool:
+            futures = {name: pool.submit(timed, name, fn) for name, fn in steps.items()}
+            errors = []
+            results = {}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors.append(e)
+        if errors:
+            raise errors[0]
+        return results
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            steps = sorted(self._steps, key=lambda s: s["start_ms"])
+        return {
+            "pid": os.getpid(),
+            "total_ms": self._now_ms(),
+            "steps": steps,
+        }
+
+    def log(self):
+        """Prints the timeline as one structured JSON line."""
+        print(f"🚀 [STARTUP] {json.dumps(self.report())}")
+
+
+startup_timeline = StartupTimeline()
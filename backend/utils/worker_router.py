@@ -0,0 +1,781 @@
+# utils/worker_router.py
+"""
+Thread-affine routing of requests onto server worker processes.
+
+Under the plain pre-fork server the kernel hands each connection to any
+worker. Two requests for the same conversation thread can then run at the
+same time in different workers. Both load the thread's checkpoint and the
+later write wins, so a message sent while the previous turn is still
+running can lose the sticky Level2 state the dispatcher relies on.
+`router.py` puts a small front router in front of the workers instead:
+
+- every worker claims a numbered slot with a file lock, so a replacement
+  worker takes over the slot of one that died, and also listens on that
+  slot's unix socket;
+- requests for a thread are hashed onto a consistent-hash ring of the live
+  slots. The thread is the `user_id` of a chat request, or the id in the
+  path of the approval and history endpoints. A thread always lands on the
+  same worker, so its checkpoint stays in that worker's cache;
+- requests that change a thread's state are forwarded one at a time, in
+  the order they arrived; reads are not held back. A bulk approval is split
+  by worker, and each part waits its turn on every thread it decides. A
+  login resets the user's thread, so it waits its turn too: the router
+  learns each email's user_id from the login responses;
+- a slot whose socket refuses connections is taken off the ring and only
+  its threads move; it is put back once it accepts connections again;
+- every other request goes to the live worker with the fewest requests in
+  flight.
+
+The router only reads the bodies it routes by (chat, login and bulk
+approval requests); every other body, e.g. a PDF upload, is streamed to the
+worker as it arrives. Chunked request bodies are accepted on both paths.
+"""
+import bisect
+import errno
+import hashlib
+import http.client
+import json
+import os
+import re
+import socket
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.leader_lock import LeaderLock
+
+# Endpoints about one thread, with the thread id in the path.
+THREAD_PATHS = (
+    re.compile(r"^/api/approve-update/(?!bulk$)([^/]+)$"),
+    re.compile(r"^/api/pending-approvals/([^/]+)$"),
+    re.compile(r"^/api/chat/history/([^/]+)$"),
+    re.compile(r"^/api/user/policies/([^/]+)$"),
+)
+# Endpoints about one thread, with the thread id as `user_id` in the JSON body.
+THREAD_BODY_PATHS = ("/api/chat", "/api/chat/stream")
+# Methods that only read a thread's state and are never held back.
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+# Decisions on many threads; split by worker (see RouterHandler._bulk_approvals).
+BULK_APPROVAL_PATH = "/api/approve-update/bulk"
+# Resets the user's thread; the body has the email, not the user_id.
+LOGIN_PATHS = ("/api/login", "/api/login/")
+# Emails whose user_id the router remembers from login responses.
+LOGIN_CACHE_SIZE = 100_000
+ROUTER_STATS_PATH = "/api/system/router"
+# Request bodies that are not read by the router are relayed in blocks of this size.
+STREAM_BLOCK_SIZE = 65536
+# Longest chunk-size or trailer line accepted in a chunked request body.
+MAX_CHUNK_LINE = 4096
+QUEUE_RETRY_AFTER_SECONDS = 5
+
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+}
+# Errors connecting to a slot socket that mean its worker is not running.
+WORKER_DOWN_ERRNOS = (errno.ECONNREFUSED, errno.ENOENT, errno.ECONNRESET)
+
+_slot_locks: List[LeaderLock] = []
+
+
+def slot_socket_path(socket_dir: str, slot: int) -> str:
+    return os.path.join(socket_dir, f"worker-{slot}.sock")
+
+
+def claim_worker_slot(socket_dir: str, slots: int) -> Optional[int]:
+    """
+    Claims the first free slot for this worker process and returns it, or
+    None if every slot is held. The lock is released by the kernel when the
+    worker exits, so the worker that replaces it gets the same slot.
+    """
+    for slot in range(slots):
+        lock = LeaderLock(os.path.join(socket_dir, f"worker-{slot}.lock"))
+        if lock.try_acquire():
+            # Held for the life of the process.
+            _slot_locks.append(lock)
+            return slot
+    return None
+
+
+def ring_version_path(socket_dir: str) -> str:
+    return os.path.join(socket_dir, "ring.version")
+
+
+def read_ring_version(socket_dir: str) -> Optional[str]:
+    """
+    The version of the ring the router routes by, which changes whenever
+    threads move between workers, or None before the router has written one.
+    """
+    try:
+        with open(ring_version_path(socket_dir)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def slot_pid(socket_dir: str, slot: int) -> Optional[int]:
+    """Pid written to a slot's lock file by the worker that claimed it."""
+    try:
+        with open(os.path.join(socket_dir, f"worker-{slot}.lock")) as f:
+            return int(f.read().strip() or 0) or None
+    except (OSError, ValueError):
+        return None
+
+
+def thread_key(method: str, path: str, body: bytes) -> Optional[str]:
+    """The conversation thread a request is about, or None."""
+    for pattern in THREAD_PATHS:
+        match = pattern.match(path)
+        if match:
+            return match.group(1)
+    if method == "POST" and path in THREAD_BODY_PATHS and body:
+        try:
+            user_id = json.loads(body).get("user_id")
+        except (ValueError, AttributeError):
+            return None
+        return str(user_id) if user_id else None
+    return None
+
+
+def login_email(body: bytes) -> Optional[str]:
+    """The normalized email of a login request, or None."""
+    try:
+        email = json.loads(body).get("email")
+    except (ValueError, AttributeError):
+        return None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def bulk_decisions(body: bytes, max_items: int) -> Optional[List[Dict[str, Any]]]:
+    """
+    The decisions of a bulk approval request, or None if the router should
+    not split it (the worker then answers with the validation error).
+    """
+    try:
+        decisions = json.loads(body).get("decisions")
+    except (ValueError, AttributeError):
+        return None
+    if not isinstance(decisions, list) or not decisions or len(decisions) > max_items:
+        return None
+    if not all(isinstance(item, dict) and isinstance(item.get("thread_id"), str) for item in decisions):
+        return None
+    if len({item["thread_id"] for item in decisions}) != len(decisions):
+        return None
+    return decisions
+
+
+def _hash(value: str) -> int:
+    # Stable across processes and restarts, unlike hash().
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+class HashRing:
+    """Consistent-hash ring of slots, each placed at `vnodes` points."""
+
+    def __init__(self, vnodes: int):
+        self.vnodes = max(1, vnodes)
+        self._points: List[int] = []
+        self._slots: List[int] = []
+
+    def rebuild(self, slots: Iterable[int]):
+        points = sorted(
+            (_hash(f"slot-{slot}-{vnode}"), slot)
+            for slot in slots
+            for vnode in range(self.vnodes)
+        )
+        self._points = [point for point, _ in points]
+        self._slots = [slot for _, slot in points]
+
+    def lookup(self, key: str) -> Optional[int]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._slots[index]
+
+
+class BadRequestBodyError(Exception):
+    """Raised when a client's request body is malformed or cut short."""
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a request waits too long behind earlier ones for its thread."""
+
+
+class KeyQueue:
+    """Lets requests for the same key through one at a time, oldest first."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, Deque[threading.Event]] = {}
+
+    @contextmanager
+    def turn(self, key: str, timeout: float):
+        ticket = threading.Event()
+        with self._lock:
+            queue = self._waiters.setdefault(key, deque())
+            queue.append(ticket)
+            if len(queue) == 1:
+                ticket.set()
+        if not ticket.wait(timeout):
+            with self._lock:
+                # The ticket may have been handed the turn just now.
+                if not ticket.is_set():
+                    queue.remove(ticket)
+                    raise QueueTimeoutError(f"Timed out waiting for earlier requests on {key}")
+        try:
+            yield
+        finally:
+            with self._lock:
+                queue.popleft()
+                if queue:
+                    queue[0].set()
+                else:
+                    del self._waiters[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "threads": len(self._waiters),
+                "waiting": sum(len(queue) - 1 for queue in self._waiters.values()),
+            }
+
+
+def _failed(items: List[Dict[str, Any]], error: str) -> List[Dict[str, Any]]:
+    return [
+        {"thread_id": item["thread_id"], "decision": item.get("decision"), "status": "error", "error": error}
+        for item in items
+    ]
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection to a worker's slot socket."""
+
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self.sock = sock
+
+
+class WorkerRouter:
+    def __init__(
+        self,
+        socket_dir: str,
+        slots: int,
+        vnodes: int,
+        queue_timeout: float,
+        upstream_timeout: float,
+        probe_seconds: float,
+        bulk_max_items: int,
+    ):
+        self.socket_dir = socket_dir
+        self.slots = slots
+        self.queue_timeout = queue_timeout
+        self.upstream_timeout = upstream_timeout
+        self.probe_seconds = probe_seconds
+        self.bulk_max_items = bulk_max_items
+        self.queue = KeyQueue()
+        self._login_users: "OrderedDict[str, str]" = OrderedDict()
+        self._ring = HashRing(vnodes)
+        self._lock = threading.Lock()
+        self._alive = set()
+        self._load = {
+            slot: {"in_flight": 0, "requests": 0, "errors": 0, "down_events": 0}
+            for slot in range(slots)
+        }
+
+    # --- Liveness ---
+
+    def _set_alive(self, slot: int, alive: bool):
+        with self._lock:
+            if alive == (slot in self._alive):
+                return
+            if alive:
+                self._alive.add(slot)
+            else:
+                self._alive.discard(slot)
+                self._load[slot]["down_events"] += 1
+            self._ring.rebuild(self._alive)
+            self._publish_ring_version()
+        if alive:
+            print(f"✅ [SUCCESS] Router: worker slot {slot} is up")
+        else:
+            print(f"⚠️ [WARNING] Router: worker slot {slot} is down, its threads move to other workers")
+
+    def _publish_ring_version(self):
+        # Caller holds self._lock, so no request is routed by the new ring
+        # before the workers can see that it changed.
+        path = ring_version_path(self.socket_dir)
+        try:
+            with open(f"{path}.tmp", "w") as f:
+                f.write(str(time.time_ns()))
+            os.replace(f"{path}.tmp", path)
+        except OSError as e:
+            print(f"❌ [ERROR] Router: could not write the ring version: {e}")
+
+    def probe(self):
+        """Checks every slot's socket and updates the ring."""
+        for slot in range(self.slots):
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(1)
+            try:
+                sock.connect(slot_socket_path(self.socket_dir, slot))
+                alive = True
+            except OSError:
+                alive = False
+            finally:
+                sock.close()
+            self._set_alive(slot, alive)
+
+    def start(self):
+        self.probe()
+        threading.Thread(target=self._probe_loop, name="router-probe", daemon=True).start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_seconds)
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"❌ [ERROR] Router probe failed: {e}")
+
+    # --- Routing ---
+
+    def pick(self, key: Optional[str], exclude: Iterable[int] = ()) -> Optional[int]:
+        """The slot for `key`, or the least busy live slot for requests without one."""
+        with self._lock:
+            if key is not None:
+                return self._ring.lookup(key)
+            candidates = [slot for slot in self._alive if slot not in exclude]
+            if not candidates:
+                return None
+            return min(candidates, key=lambda slot: self._load[slot]["in_flight"])
+
+    def connect(self, key: Optional[str]) -> Tuple[Optional[int], Optional[UnixHTTPConnection]]:
+        """
+        Connects to the worker for `key`. A slot that refuses the connection
+        is marked down and the next pick is tried; nothing has been sent to
+        it yet, so this is safe for every request.
+        """
+        tried = []
+        for _ in range(self.slots):
+            slot = self.pick(key, exclude=tried)
+            if slot is None or slot in tried:
+                break
+            tried.append(slot)
+            conn = UnixHTTPConnection(slot_socket_path(self.socket_dir, slot), self.upstream_timeout)
+            try:
+                conn.connect()
+                return slot, conn
+            except OSError as e:
+                conn.close()
+                if e.errno not in WORKER_DOWN_ERRNOS:
+                    raise
+                self._set_alive(slot, False)
+        return None, None
+
+    def login_key(self, email: str) -> str:
+        """
+        The thread a login resets: the user_id learned from an earlier login
+        with this email. Until then, logins for the email queue on their own.
+        """
+        with self._lock:
+            user_id = self._login_users.get(email)
+            if user_id is not None:
+                self._login_users.move_to_end(email)
+        return user_id or f"login:{email}"
+
+    def learn_login(self, email: str, status: int, body: bytes):
+        if status != 200:
+            return
+        try:
+            user_id = (json.loads(body).get("user") or {}).get("user_id")
+        except (ValueError, AttributeError):
+            return
+        if user_id is None:
+            return
+        with self._lock:
+            self._login_users[email] = str(user_id)
+            self._login_users.move_to_end(email)
+            while len(self._login_users) > LOGIN_CACHE_SIZE:
+                self._login_users.popitem(last=False)
+
+    def call(
+        self, key: Optional[str], method: str, path: str, headers: Dict[str, str], body: bytes
+    ) -> Tuple[int, Dict[str, str], bytes]:
+        """
+        Sends a request to the worker for `key` and returns its whole
+        response as (status, headers, body). Used for the parts of a split
+        request; the router answers 503 itself if no worker is up.
+        """
+        slot, conn = self.connect(key)
+        if conn is None:
+            return 503, {}, json.dumps({"error": "No server worker is available."}).encode()
+        try:
+            with self.in_flight(slot):
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                return response.status, dict(response.getheaders()), response.read()
+        except (OSError, http.client.HTTPException) as e:
+            print(f"❌ [ERROR] Router: worker slot {slot} failed {method} {path}: {e}")
+            return 502, {}, json.dumps({"error": "The server worker failed to respond."}).encode()
+        finally:
+            conn.close()
+
+    @contextmanager
+    def in_flight(self, slot: int):
+        with self._lock:
+            self._load[slot]["in_flight"] += 1
+            self._load[slot]["requests"] += 1
+        try:
+            yield
+        except Exception:
+            with self._lock:
+                self._load[slot]["errors"] += 1
+            raise
+        finally:
+            with self._lock:
+                self._load[slot]["in_flight"] -= 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            alive = set(self._alive)
+            load = {slot: dict(counts) for slot, counts in self._load.items()}
+        return {
+            "slots": self.slots,
+            "alive": len(alive),
+            "queue": self.queue.stats(),
+            "known_logins": len(self._login_users),
+            "workers": [
+                {
+                    "slot": slot,
+                    "pid": slot_pid(self.socket_dir, slot),
+                    "alive": slot in alive,
+                    **load[slot],
+                }
+                for slot in range(self.slots)
+            ],
+        }
+
+
+class RouterHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "HelpdeskRouter"
+
+    @property
+    def router(self) -> WorkerRouter:
+        return self.server.router
+
+    def log_message(self, format, *args):
+        # The workers write the access log.
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _content_length(self) -> Optional[int]:
+        """The request's Content-Length (0 if absent), or None if it is malformed."""
+        values = {value.strip() for value in self.headers.get_all("Content-Length", [])}
+        if not values:
+            return 0
+        if len(values) > 1:
+            return None
+        value = values.pop()
+        return int(value) if re.fullmatch(r"[0-9]{1,18}", value) else None
+
+    def _read_chunks(self) -> Iterator[bytes]:
+        """Decodes a chunked request body from the client, block by block."""
+        while True:
+            line = self.rfile.readline(MAX_CHUNK_LINE + 1)
+            size = line.split(b";", 1)[0].strip()
+            if not re.fullmatch(rb"[0-9a-fA-F]{1,15}", size):
+                raise BadRequestBodyError("Malformed chunked request body.")
+            remaining = int(size, 16)
+            if remaining == 0:
+                # Trailers are not passed on.
+                while True:
+                    line = self.rfile.readline(MAX_CHUNK_LINE + 1)
+                    if not line or len(line) > MAX_CHUNK_LINE:
+                        raise BadRequestBodyError("Malformed chunked request body.")
+                    if line in (b"\r\n", b"\n"):
+                        return
+            while remaining:
+                data = self.rfile.read(min(remaining, STREAM_BLOCK_SIZE))
+                if not data:
+                    raise BadRequestBodyError("The request body was cut short.")
+                remaining -= len(data)
+                yield data
+            if self.rfile.readline(3) not in (b"\r\n", b"\n"):
+                raise BadRequestBodyError("Malformed chunked request body.")
+
+    def _read_body(self) -> bytes:
+        """Reads the whole request body, for the requests the router routes by it."""
+        if self._body_chunked:
+            body = b"".join(self._read_chunks())
+        else:
+            body = self.rfile.read(self._body_length) if self._body_length else b""
+            if len(body) != self._body_length:
+                raise BadRequestBodyError("The request body was cut short.")
+        self._body_pending = False
+        return body
+
+    def _send_body(self, conn: UnixHTTPConnection, body: Optional[bytes]):
+        """
+        Ends the request headers sent to the worker and sends the body:
+        `body` if the router already read it, else the client's body as it
+        arrives.
+        """
+        if body is not None:
+            conn.putheader("Content-Length", str(len(body)))
+            conn.endheaders(body)
+            return
+        if self._body_chunked:
+            conn.putheader("Transfer-Encoding", "chunked")
+            conn.endheaders()
+            for data in self._read_chunks():
+                conn.send(b"%x\r\n%s\r\n" % (len(data), data))
+            conn.send(b"0\r\n\r\n")
+        else:
+            conn.putheader("Content-Length", str(self._body_length))
+            conn.endheaders()
+            remaining = self._body_length
+            while remaining:
+                data = self.rfile.read(min(remaining, STREAM_BLOCK_SIZE))
+                if not data:
+                    raise BadRequestBodyError("The request body was cut short.")
+                remaining -= len(data)
+                conn.send(data)
+        self._body_pending = False
+
+    def _proxy(self):
+        self._body_chunked = "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        self._body_length = 0 if self._body_chunked else self._content_length()
+        if self._body_length is None:
+            self.close_connection = True
+            return self._send_json(400, {"error": "Invalid Content-Length header."})
+        self._body_pending = self._body_chunked or self._body_length > 0
+        try:
+            self._route(self.path.split("?", 1)[0])
+        finally:
+            if self._body_pending:
+                # The unread rest of the body is still on the connection.
+                self.close_connection = True
+
+    def _route(self, path: str):
+        if path == ROUTER_STATS_PATH and self.command == "GET":
+            return self._send_json(200, self.router.report())
+
+        reads_body = self.command == "POST" and (
+            path in THREAD_BODY_PATHS or path in LOGIN_PATHS or path == BULK_APPROVAL_PATH
+        )
+        if not reads_body:
+            # Streamed to the worker; the thread, if any, is in the path.
+            return self._dispatch(thread_key(self.command, path, b""), None)
+
+        try:
+            body = self._read_body()
+        except BadRequestBodyError as e:
+            return self._send_json(400, {"error": str(e)})
+        if path == BULK_APPROVAL_PATH:
+            return self._bulk_approvals(body)
+
+        key = thread_key(self.command, path, body)
+        email = login_email(body) if path in LOGIN_PATHS else None
+        if email is not None:
+            key = self.router.login_key(email)
+        self._dispatch(key, body, email)
+
+    def _dispatch(self, key: Optional[str], body: Optional[bytes], email: Optional[str] = None):
+        try:
+            if key is not None and self.command not in READ_METHODS:
+                with self.router.queue.turn(key, self.router.queue_timeout):
+                    self._forward(key, body, email)
+            else:
+                self._forward(key, body)
+        except QueueTimeoutError as e:
+            print(f"⚠️ [WARNING] Router: {e}")
+            self._send_json(
+                503,
+                {
+                    "response": "Your previous message is still being processed. Please try again in a few moments.",
+                    "retry_after": QUEUE_RETRY_AFTER_SECONDS,
+                },
+                {"Retry-After": str(QUEUE_RETRY_AFTER_SECONDS)},
+            )
+
+    def _bulk_approvals(self, body: bytes):
+        """
+        Splits a bulk approval by the worker that owns each thread. Every
+        part waits its turn on all of its threads (taken in sorted order, so
+        two bulk requests never wait on each other), then runs as a bulk
+        request of its own on that worker. The per-item results are merged
+        in the original order.
+        """
+        decisions = bulk_decisions(body, self.router.bulk_max_items)
+        if decisions is None:
+            return self._forward(None, body)
+
+        started = time.perf_counter()
+        payload = json.loads(body)
+        groups: Dict[Optional[int], List[int]] = {}
+        for index, item in enumerate(decisions):
+            groups.setdefault(self.router.pick(item["thread_id"]), []).append(index)
+        headers = {
+            name: value
+            for name, value in self.headers.items()
+            if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "content-length"
+        }
+        idempotency_key = self.headers.get("Idempotency-Key")
+
+        def run_part(indexes: List[int]) -> Tuple[List[Dict[str, Any]], bool]:
+            items = [decisions[index] for index in indexes]
+            thread_ids = sorted(item["thread_id"] for item in items)
+            part_headers = dict(headers)
+            if idempotency_key:
+                # A retry splits the same way, so each part replays its own result.
+                digest = hashlib.blake2b("\n".join(thread_ids).encode(), digest_size=8).hexdigest()
+                part_headers["Idempotency-Key"] = f"{idempotency_key}:{digest}"
+            try:
+                with ExitStack() as turns:
+                    for thread_id in thread_ids:
+                        turns.enter_context(self.router.queue.turn(thread_id, self.router.queue_timeout))
+                    status, response_headers, data = self.router.call(
+                        items[0]["thread_id"],
+                        "POST",
+                        self.path,
+                        part_headers,
+                        json.dumps({**payload, "decisions": items}).encode(),
+                    )
+            except QueueTimeoutError as e:
+                print(f"⚠️ [WARNING] Router: {e}")
+                return _failed(items, "Timed out waiting for earlier requests on this thread; nothing was applied."), False
+            try:
+                results = json.loads(data).get("results") if status == 200 else None
+            except (ValueError, AttributeError):
+                results = None
+            if not isinstance(results, list) or len(results) != len(items):
+                try:
+                    error = json.loads(data).get("error")
+                except (ValueError, AttributeError):
+                    error = None
+                return _failed(items, error or f"The server worker answered {status}."), False
+            return results, response_headers.get("Idempotent-Replayed") == "true"
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(decisions)
+        replayed = []
+        with ThreadPoolExecutor(max_workers=len(groups), thread_name_prefix="router-bulk") as pool:
+            parts = list(groups.values())
+            for indexes, (part_results, part_replayed) in zip(parts, pool.map(run_part, parts)):
+                for index, result in zip(indexes, part_results):
+                    results[index] = result
+                replayed.append(part_replayed)
+
+        summary = {"total": len(results)}
+        for status in ("ok", "applied_not_resumed", "not_found", "error"):
+            summary[status] = sum(1 for r in results if r["status"] == status)
+        summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        extra_headers = {"Idempotent-Replayed": "true"} if idempotency_key and all(replayed) else {}
+        self._send_json(200, {"results": results, "summary": summary}, extra_headers)
+
+    def _forward(self, key: Optional[str], body: Optional[bytes], email: Optional[str] = None):
+        """Sends the request to the worker for `key`; a `body` of None is streamed from the client."""
+        slot, conn = self.router.connect(key)
+        if conn is None:
+            return self._send_json(503, {"error": "No server worker is available."}, {"Retry-After": "2"})
+        try:
+            with self.router.in_flight(slot):
+                conn.putrequest(self.command, self.path, skip_host=True, skip_accept_encoding=True)
+                for name, value in self.headers.items():
+                    if name.lower() not in HOP_BY_HOP_HEADERS and name.lower() != "content-length":
+                        conn.putheader(name, value)
+                try:
+                    self._send_body(conn, body)
+                except BadRequestBodyError as e:
+                    self.close_connection = True
+                    return self._send_json(400, {"error": str(e)})
+                except (OSError, http.client.HTTPException):
+                    # The worker may have answered early (e.g. 413) and closed
+                    # its end; relay that answer if there is one.
+                    self.close_connection = True
+                try:
+                    response = conn.getresponse()
+                except (OSError, http.client.HTTPException) as e:
+                    print(f"❌ [ERROR] Router: worker slot {slot} failed {self.command} {self.path}: {e}")
+                    self.close_connection = True
+                    return self._send_json(502, {"error": "The server worker failed to respond."})
+                if email is not None:
+                    # Small and never streamed; read it to learn the user_id.
+                    data = response.read()
+                    self.router.learn_login(email, response.status, data)
+                    return self._relay(response, data)
+                self._relay(response)
+        finally:
+            conn.close()
+
+    def _relay(self, response: http.client.HTTPResponse, data: Optional[bytes] = None):
+        # The worker's own Server and Date headers are passed on as they are.
+        self.send_response_only(response.status, response.reason)
+        length = response.getheader("Content-Length")
+        for name, value in response.getheaders():
+            if name.lower() not in HOP_BY_HOP_HEADERS:
+                self.send_header(name, value)
+        # Streamed responses (SSE) have no length; re-chunk them.
+        chunked = length is None and self.command != "HEAD" and response.status not in (204, 304)
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        if data is not None:
+            # Already read by the caller.
+            self.wfile.write(data)
+            return
+        try:
+            while True:
+                data = response.read1(65536)
+                if not data:
+                    break
+                if chunked:
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                else:
+                    self.wfile.write(data)
+                self.wfile.flush()
+            if chunked:
+                self.wfile.write(b"0\r\n\r\n")
+        except (OSError, http.client.HTTPException):
+            # The client went away (the worker still finishes the request),
+            # or the worker failed mid-response.
+            self.close_connection = True
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = do_OPTIONS = _proxy
+
+
+class RouterServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], router: WorkerRouter):
+        self.router = router
+        super().__init__(address, RouterHandler)
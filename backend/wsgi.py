@@ -0,0 +1,16 @@
+# wsgi.py
+"""
+WSGI entry point for the production server:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app the app (embedding model, FAQ index, prompts) is imported
+once in the master; per-process resources are recreated in each worker by
+the fork hooks in utils/process_resources.py.
+"""
+from app import app
+from database.postgre import init_db
+
+init_db()
+
+__all__ = ["app"]
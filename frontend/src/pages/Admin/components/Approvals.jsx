@@ -9,6 +9,8 @@ const Approvals = () => {
   const [pendingApprovals, setPendingApprovals] = useState([]);
   const [approvedApprovals, setApprovedApprovals] = useState([]);
   const [declinedApprovals, setDeclinedApprovals] = useState([]);
+  // Totals per status; the lists hold only the newest page of each.
+  const [counts, setCounts] = useState({ pending: 0, approved: 0, declined: 0 });
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(null);
   const [processingDecision, setProcessingDecision] = useState(null);
@@ -25,6 +27,11 @@ const Approvals = () => {
         setPendingApprovals(Array.isArray(response.data.pending) ? response.data.pending : []);
         setApprovedApprovals(Array.isArray(response.data.approved) ? response.data.approved : []);
         setDeclinedApprovals(Array.isArray(response.data.declined) ? response.data.declined : []);
+        setCounts(response.data.counts || {
+          pending: response.data.pending?.length || 0,
+          approved: response.data.approved?.length || 0,
+          declined: response.data.declined?.length || 0,
+        });
       } else {
         // Fallback for unexpected response structure
         setPendingApprovals([]);
@@ -62,6 +69,7 @@ const Approvals = () => {
           // Remove from pending and add to appropriate list
           setPendingApprovals(prev => prev.filter(approval => approval.thread_id !== threadId));
           
+          setCounts(prev => ({ ...prev, pending: prev.pending - 1, [decision]: prev[decision] + 1 }));
           if (decision === 'approved') {
             setApprovedApprovals(prev => [...prev, processedApproval]);
           } else if (decision === 'declined') {
@@ -126,7 +134,7 @@ const Approvals = () => {
             Approval Inbox
           </h1>
           <p className="text-gray-600 dark:text-gray-400 mt-2">
-            Review and approve pending user requests • Total: {pendingApprovals.length + approvedApprovals.length + declinedApprovals.length}
+            Review and approve pending user requests • Total: {counts.pending + counts.approved + counts.declined}
             {lastUpdated && (
               <span className="block text-xs text-gray-500 dark:text-gray-400 mt-1">
                 Last updated: {lastUpdated.toLocaleString()}
@@ -152,7 +160,7 @@ const Approvals = () => {
                 Pending Approvals
               </p>
               <p className="text-4xl font-bold text-gray-900 dark:text-white mt-2">
-                {pendingApprovals.length}
+                {counts.pending}
               </p>
             </div>
             <div className="p-4 bg-blue-500/10 rounded-2xl">
@@ -168,7 +176,7 @@ const Approvals = () => {
                 Approved Requests
               </p>
               <p className="text-4xl font-bold text-gray-900 dark:text-white mt-2">
-                {approvedApprovals.length}
+                {counts.approved}
               </p>
             </div>
             <div className="p-4 bg-green-500/10 rounded-2xl">
@@ -184,7 +192,7 @@ const Approvals = () => {
                 Declined Requests
               </p>
               <p className="text-4xl font-bold text-gray-900 dark:text-white mt-2">
-                {declinedApprovals.length}
+                {counts.declined}
               </p>
             </div>
             <div className="p-4 bg-red-500/10 rounded-2xl">
@@ -203,7 +211,7 @@ const Approvals = () => {
           <p className="text-gray-600 dark:text-gray-400 mt-2">
             {pendingApprovals.length === 0
               ? "No pending approvals"
-              : `${pendingApprovals.length} request${pendingApprovals.length !== 1 ? 's' : ''} waiting for review`
+              : `${counts.pending} request${counts.pending !== 1 ? 's' : ''} waiting for review`
             }
           </p>
         </div>
@@ -238,7 +246,7 @@ const Approvals = () => {
                         <div className="flex items-center gap-1 mt-1">
                           <Calendar className="h-3 w-3 text-gray-400" />
                           <span className="text-xs text-gray-500 dark:text-gray-400">
-                            {formatTimestamp(approval.timestamp)}
+                            {formatTimestamp(approval.requested_at || approval.timestamp)}
                           </span>
                         </div>
                       </div>
@@ -328,7 +336,7 @@ const Approvals = () => {
               Approved Requests
             </h2>
             <p className="text-gray-600 dark:text-gray-400 mt-2">
-              {approvedApprovals.length} request{approvedApprovals.length !== 1 ? 's' : ''} have been approved
+              {counts.approved} request{counts.approved !== 1 ? 's' : ''} have been approved
             </p>
           </div>
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 p-6">
@@ -347,7 +355,7 @@ const Approvals = () => {
                         <div className="flex items-center gap-1 mt-1">
                           <Calendar className="h-3 w-3 text-gray-400" />
                           <span className="text-xs text-gray-500 dark:text-gray-400">
-                            {formatTimestamp(approval.timestamp)}
+                            {formatTimestamp(approval.requested_at || approval.timestamp)}
                           </span>
                         </div>
                       </div>
@@ -402,7 +410,7 @@ const Approvals = () => {
               Declined Requests
             </h2>
             <p className="text-gray-600 dark:text-gray-400 mt-2">
-              {declinedApprovals.length} request{declinedApprovals.length !== 1 ? 's' : ''} have been declined
+              {counts.declined} request{counts.declined !== 1 ? 's' : ''} have been declined
             </p>
           </div>
           <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6 p-6">
@@ -421,7 +429,7 @@ const Approvals = () => {
                         <div className="flex items-center gap-1 mt-1">
                           <Calendar className="h-3 w-3 text-gray-400" />
                           <span className="text-xs text-gray-500 dark:text-gray-400">
-                            {formatTimestamp(approval.timestamp)}
+                            {formatTimestamp(approval.requested_at || approval.timestamp)}
                           </span>
                         </div>
                       </div>
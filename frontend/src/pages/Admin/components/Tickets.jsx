@@ -25,6 +25,8 @@ const Tickets = () => {
   const [priorityFilter, setPriorityFilter] = useState("all");
   const [assigneeFilter, setAssigneeFilter] = useState("all");
   const [viewMode, setViewMode] = useState("board"); // "board" or "list"
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchTickets();
@@ -35,6 +37,7 @@ const Tickets = () => {
       setLoading(true);
       const response = await axios.get('http://localhost:8001/api/tickets/all');
       setTicketsData(response.data.tickets || []);
+      setNextCursor(response.data.next_cursor || null);
     } catch (err) {
       setError(err.response?.data?.error || err.message || 'Failed to fetch tickets');
       console.error('Error fetching tickets:', err);
@@ -43,6 +46,23 @@ const Tickets = () => {
     }
   };
 
+  const loadMoreTickets = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get('http://localhost:8001/api/tickets/all', {
+        params: { cursor: nextCursor },
+      });
+      setTicketsData(prev => [...prev, ...(response.data.tickets || [])]);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      setError(err.response?.data?.error || err.message || 'Failed to fetch tickets');
+      console.error('Error fetching more tickets:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const formatDate = (dateString) => {
     if (!dateString) return 'N/A';
     const date = new Date(dateString);
@@ -641,6 +661,19 @@ const Tickets = () => {
       <div>
         {viewMode === "board" ? <BoardView /> : viewMode === "list" ? <ListView /> : <SummaryView />}
       </div>
+
+      {/* Load More */}
+      {nextCursor && (
+        <div className="text-center">
+          <button
+            onClick={loadMoreTickets}
+            disabled={loadingMore}
+            className="px-4 py-2 bg-blue-600 text-white rounded-lg hover:bg-blue-700 transition-colors disabled:opacity-50"
+          >
+            {loadingMore ? 'Loading...' : 'Load older tickets'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
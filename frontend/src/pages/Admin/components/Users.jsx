@@ -7,6 +7,8 @@ const Users = () => {
   const [usersData, setUsersData] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
 
   const fetchUsers = async () => {
     try {
@@ -14,6 +16,7 @@ const Users = () => {
       setError(null);
       const response = await axios.get('http://localhost:8001/api/admin/users');
       setUsersData(response.data.users || []);
+      setNextCursor(response.data.next_cursor || null);
       console.log('Fetched users:', response.data);
     } catch (err) {
       setError(err.response?.data?.error || err.message || 'Failed to fetch users');
@@ -23,6 +26,23 @@ const Users = () => {
     }
   };
 
+  const loadMoreUsers = async () => {
+    if (!nextCursor) return;
+    try {
+      setIsLoadingMore(true);
+      const response = await axios.get('http://localhost:8001/api/admin/users', {
+        params: { cursor: nextCursor },
+      });
+      setUsersData(prev => [...prev, ...(response.data.users || [])]);
+      setNextCursor(response.data.next_cursor || null);
+    } catch (err) {
+      setError(err.response?.data?.error || err.message || 'Failed to fetch users');
+      console.error('Error fetching more users:', err);
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     fetchUsers();
   }, []);
@@ -232,6 +252,19 @@ const Users = () => {
             ))}
           </div>
 
+          {/* Load More */}
+          {nextCursor && (
+            <div className="px-6 py-4 text-center border-t-2 border-white/30 dark:border-gray-700/30">
+              <button
+                onClick={loadMoreUsers}
+                disabled={isLoadingMore}
+                className="px-6 py-2 bg-gradient-to-r from-blue-500 to-blue-600 text-white rounded-xl hover:from-blue-600 hover:to-blue-700 transition-all duration-200 shadow-lg disabled:opacity-50"
+              >
+                {isLoadingMore ? 'Loading...' : 'Load More'}
+              </button>
+            </div>
+          )}
+
           {/* Empty State */}
           {processedUsersData.length === 0 && (
             <div className="px-6 py-12 text-center">
@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { MessageSquare, User, ArrowLeft, MessageCircle } from 'lucide-react';
 import axios from 'axios';
 import { useOutletContext } from 'react-router-dom';
@@ -12,6 +12,8 @@ function ChatHistory() {
   const [error, setError] = useState(null);
   const { showChatHistory } = useOutletContext();
   const baseURL = "http://localhost:8001";
+  // Turns already fetched; later fetches only ask for turns after these.
+  const rawTurnsRef = useRef([]);
 
   const fetchChatHistory = async () => {
     try {
@@ -25,10 +27,16 @@ function ChatHistory() {
         return;
       }
 
-      const historyResponse = await axios.get(`${baseURL}/api/chat/history/${userId}`);
+      const historyResponse = await axios.get(`${baseURL}/api/chat/history/${userId}`, {
+        params: { since: rawTurnsRef.current.length },
+      });
       console.log("History Response: ", historyResponse);
-      
-      const rawHistory = historyResponse.data.history || [];
+
+      const newTurns = historyResponse.data.history || [];
+      rawTurnsRef.current = historyResponse.data.reset
+        ? newTurns
+        : [...rawTurnsRef.current, ...newTurns];
+      const rawHistory = rawTurnsRef.current;
       console.log("Raw History: ", rawHistory);
       const parsedHistory = rawHistory.map(item => {
         if (typeof item === 'string') {
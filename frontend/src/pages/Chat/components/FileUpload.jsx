@@ -182,8 +182,23 @@ const FileUpload = () => {
         throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
       }
 
-      const result = await response.json();
-      return result;
+      const accepted = await response.json();
+
+      // Ingestion runs in the background; poll the job until it finishes.
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const jobResponse = await fetch(`http://localhost:8001/api/upload/jobs/${accepted.job_id}`);
+        if (!jobResponse.ok) {
+          throw new Error(`HTTP error! status: ${jobResponse.status}`);
+        }
+        const job = await jobResponse.json();
+        if (job.status === 'done') {
+          return job.result;
+        }
+        if (job.status === 'failed') {
+          throw new Error(`PDF processing failed: ${job.error || 'Unknown error'}`);
+        }
+      }
     } catch (error) {
       console.error('Upload error:', error);
       throw error;